@@ -0,0 +1,35 @@
+"""add composite index on games(name, id) for keyset pagination
+
+Revision ID: 5f1e2a9c7b30
+Revises: 2c13db88e4a1
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5f1e2a9c7b30"
+down_revision: Union[str, None] = "2c13db88e4a1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_exists(table: str, name: str) -> bool:
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert der Index also schon.
+    inspector = sa.inspect(op.get_bind())
+    return name in {ix["name"] for ix in inspector.get_indexes(table)}
+
+
+def upgrade():
+    if not _index_exists("games", "ix_games_name_id"):
+        op.create_index("ix_games_name_id", "games", ["name", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_games_name_id", table_name="games")
@@ -0,0 +1,67 @@
+"""add trigram / full-text search indexes for game names
+
+Revision ID: 8d4b6c1e2f57
+Revises: 5f1e2a9c7b30
+Create Date: 2026-10-18 10:00:00.000000
+
+PostgreSQL: pg_trgm + GIN index, damit ILIKE '%text%' nicht mehr sequenziell läuft.
+SQLite: FTS5-Schattentabelle `games_fts` (trigram tokenizer) inkl. Sync-Triggern.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8d4b6c1e2f57"
+down_revision: Union[str, None] = "5f1e2a9c7b30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_games_name_trgm "
+            "ON games USING gin (name gin_trgm_ops)"
+        )
+
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5("
+            "name, content='games', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS games_fts_ai AFTER INSERT ON games BEGIN "
+            "INSERT INTO games_fts(rowid, name) VALUES (new.id, new.name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS games_fts_ad AFTER DELETE ON games BEGIN "
+            "INSERT INTO games_fts(games_fts, rowid, name) "
+            "VALUES ('delete', old.id, old.name); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS games_fts_au AFTER UPDATE OF name ON games "
+            "BEGIN "
+            "INSERT INTO games_fts(games_fts, rowid, name) "
+            "VALUES ('delete', old.id, old.name); "
+            "INSERT INTO games_fts(rowid, name) VALUES (new.id, new.name); END"
+        )
+        op.execute("INSERT INTO games_fts(games_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_games_name_trgm")
+
+    elif dialect == "sqlite":
+        op.execute("DROP TRIGGER IF EXISTS games_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS games_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS games_fts_ai")
+        op.execute("DROP TABLE IF EXISTS games_fts")
@@ -0,0 +1,58 @@
+"""make game_borrows unique per (event_id, game_id)
+
+Revision ID: a7b9d2e4f160
+Revises: f6a1c3e5b028
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a7b9d2e4f160"
+down_revision: Union[str, None] = "f6a1c3e5b028"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    indexes = {
+        index["name"] for index in sa.inspect(op.get_bind()).get_indexes("game_borrows")
+    }
+    # Der Unique-Index ersetzt den einfachen Index aus d5e8f1a3b947
+    if "ix_game_borrows_event_id_game_id" in indexes:
+        op.drop_index("ix_game_borrows_event_id_game_id", table_name="game_borrows")
+    if "uq_game_borrows_event_id_game_id" in indexes:
+        return
+
+    # Doppelte Zeilen (parallele Ausleihen ohne Constraint) zusammenführen:
+    # Summe in die älteste Zeile, Rest löschen
+    op.execute(
+        "UPDATE game_borrows SET count = ("
+        "SELECT SUM(COALESCE(b.count, 0)) FROM game_borrows b "
+        "WHERE b.event_id = game_borrows.event_id "
+        "AND b.game_id = game_borrows.game_id) "
+        "WHERE id IN (SELECT MIN(id) FROM game_borrows "
+        "GROUP BY event_id, game_id HAVING COUNT(*) > 1)"
+    )
+    op.execute(
+        "DELETE FROM game_borrows WHERE id NOT IN ("
+        "SELECT MIN(id) FROM game_borrows GROUP BY event_id, game_id)"
+    )
+    op.create_index(
+        "uq_game_borrows_event_id_game_id",
+        "game_borrows",
+        ["event_id", "game_id"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("uq_game_borrows_event_id_game_id", table_name="game_borrows")
+    op.create_index(
+        "ix_game_borrows_event_id_game_id", "game_borrows", ["event_id", "game_id"]
+    )
@@ -0,0 +1,78 @@
+"""add catalog revisions and game tombstones for delta sync
+
+Revision ID: b3a7e4d19c02
+Revises: 8d4b6c1e2f57
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b3a7e4d19c02"
+down_revision: Union[str, None] = "8d4b6c1e2f57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert alles schon.
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    game_columns = {column["name"] for column in inspector.get_columns("games")}
+    game_indexes = {index["name"] for index in inspector.get_indexes("games")}
+
+    if "revision" not in game_columns:
+        op.add_column(
+            "games",
+            sa.Column("revision", sa.BigInteger(), nullable=False, server_default="0"),
+        )
+    if "updated_at" not in game_columns:
+        op.add_column(
+            "games", sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True)
+        )
+    if "ix_games_revision_id" not in game_indexes:
+        op.create_index("ix_games_revision_id", "games", ["revision", "id"])
+
+    if "catalog_revision" not in tables:
+        op.create_table(
+            "catalog_revision",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("value", sa.BigInteger(), nullable=False),
+        )
+    op.execute(
+        "INSERT INTO catalog_revision (id, value) "
+        "SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM catalog_revision WHERE id = 1)"
+    )
+
+    if "game_tombstones" not in tables:
+        op.create_table(
+            "game_tombstones",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("game_id", sa.Integer(), nullable=False),
+            sa.Column("bgg_id", sa.Integer(), nullable=True),
+            sa.Column("revision", sa.BigInteger(), nullable=False),
+            sa.Column(
+                "deleted_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+            ),
+        )
+        op.create_index("ix_game_tombstones_id", "game_tombstones", ["id"])
+        op.create_index("ix_game_tombstones_game_id", "game_tombstones", ["game_id"])
+        op.create_index(
+            "ix_game_tombstones_revision", "game_tombstones", ["revision"]
+        )
+
+
+def downgrade():
+    op.drop_table("game_tombstones")
+    op.drop_table("catalog_revision")
+    op.drop_index("ix_games_revision_id", table_name="games")
+    op.drop_column("games", "updated_at")
+    op.drop_column("games", "revision")
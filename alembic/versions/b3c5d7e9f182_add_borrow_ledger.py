@@ -0,0 +1,100 @@
+"""add borrow_events ledger and borrow stats rollups
+
+Revision ID: b3c5d7e9f182
+Revises: a7b9d2e4f160
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b3c5d7e9f182"
+down_revision: Union[str, None] = "a7b9d2e4f160"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _fk(column, target, ondelete, nullable=False):
+    return sa.Column(
+        column,
+        sa.Integer(),
+        sa.ForeignKey(target, ondelete=ondelete),
+        nullable=nullable,
+    )
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existieren die Tabellen also schon.
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if "borrow_events" not in tables:
+        op.create_table(
+            "borrow_events",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            _fk("game_id", "games.id", "CASCADE"),
+            _fk("event_id", "events.id", "CASCADE"),
+            _fk("user_id", "users.id", "SET NULL", nullable=True),
+            sa.Column("action", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        )
+        op.create_index(
+            "ix_borrow_events_game_id_created_at",
+            "borrow_events",
+            ["game_id", "created_at"],
+        )
+        op.create_index(
+            "ix_borrow_events_event_id_created_at",
+            "borrow_events",
+            ["event_id", "created_at"],
+        )
+
+    if "borrow_stats_hourly" not in tables:
+        op.create_table(
+            "borrow_stats_hourly",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            _fk("event_id", "events.id", "CASCADE"),
+            sa.Column("hour", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("borrows", sa.Integer(), nullable=False),
+            sa.Column("returns", sa.Integer(), nullable=False),
+        )
+        op.create_index(
+            "uq_borrow_stats_hourly_event_id_hour",
+            "borrow_stats_hourly",
+            ["event_id", "hour"],
+            unique=True,
+        )
+
+    if "borrow_stats_games" not in tables:
+        op.create_table(
+            "borrow_stats_games",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            _fk("event_id", "events.id", "CASCADE"),
+            _fk("game_id", "games.id", "CASCADE"),
+            sa.Column("borrows", sa.Integer(), nullable=False),
+            sa.Column("returns", sa.Integer(), nullable=False),
+            sa.Column("borrowed_seconds", sa.BigInteger(), nullable=False),
+            sa.Column("returned_seconds", sa.BigInteger(), nullable=False),
+        )
+        op.create_index(
+            "uq_borrow_stats_games_event_id_game_id",
+            "borrow_stats_games",
+            ["event_id", "game_id"],
+            unique=True,
+        )
+        op.create_index(
+            "ix_borrow_stats_games_event_id_borrows",
+            "borrow_stats_games",
+            ["event_id", "borrows"],
+        )
+
+
+def downgrade():
+    op.drop_table("borrow_stats_games")
+    op.drop_table("borrow_stats_hourly")
+    op.drop_table("borrow_events")
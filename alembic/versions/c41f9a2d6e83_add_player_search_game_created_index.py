@@ -0,0 +1,39 @@
+"""add composite index on player_search(game_id, created_at)
+
+Revision ID: c41f9a2d6e83
+Revises: b3a7e4d19c02
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c41f9a2d6e83"
+down_revision: Union[str, None] = "b3a7e4d19c02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_exists(table: str, name: str) -> bool:
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert der Index also schon.
+    inspector = sa.inspect(op.get_bind())
+    return name in {ix["name"] for ix in inspector.get_indexes(table)}
+
+
+def upgrade():
+    if not _index_exists("player_search", "ix_player_search_game_id_created_at"):
+        op.create_index(
+            "ix_player_search_game_id_created_at",
+            "player_search",
+            ["game_id", "created_at"],
+        )
+
+
+def downgrade():
+    op.drop_index("ix_player_search_game_id_created_at", table_name="player_search")
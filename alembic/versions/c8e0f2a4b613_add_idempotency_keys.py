@@ -0,0 +1,54 @@
+"""add idempotency_keys table
+
+Revision ID: c8e0f2a4b613
+Revises: b3c5d7e9f182
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c8e0f2a4b613"
+down_revision: Union[str, None] = "b3c5d7e9f182"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert die Tabelle also schon.
+    if "idempotency_keys" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "idempotency_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("fingerprint", sa.String(), nullable=False),
+        sa.Column("response", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "uq_idempotency_keys_user_id_key",
+        "idempotency_keys",
+        ["user_id", "key"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_idempotency_keys_created_at", "idempotency_keys", ["created_at"]
+    )
+
+
+def downgrade():
+    op.drop_table("idempotency_keys")
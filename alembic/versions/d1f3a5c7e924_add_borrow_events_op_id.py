@@ -0,0 +1,42 @@
+"""add op_id to borrow_events for offline sync
+
+Revision ID: d1f3a5c7e924
+Revises: c8e0f2a4b613
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d1f3a5c7e924"
+down_revision: Union[str, None] = "c8e0f2a4b613"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert die Spalte also schon.
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("borrow_events")}
+    if "op_id" not in columns:
+        op.add_column("borrow_events", sa.Column("op_id", sa.String(), nullable=True))
+
+    indexes = {index["name"] for index in inspector.get_indexes("borrow_events")}
+    if "uq_borrow_events_user_id_op_id" not in indexes:
+        op.create_index(
+            "uq_borrow_events_user_id_op_id",
+            "borrow_events",
+            ["user_id", "op_id"],
+            unique=True,
+        )
+
+
+def downgrade():
+    op.drop_index("uq_borrow_events_user_id_op_id", table_name="borrow_events")
+    op.drop_column("borrow_events", "op_id")
@@ -0,0 +1,47 @@
+"""add expression indexes for catalog sort options
+
+Revision ID: d5e8f1a3b947
+Revises: c41f9a2d6e83
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d5e8f1a3b947"
+down_revision: Union[str, None] = "c41f9a2d6e83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (Index, Ausdruck) – identisch zu `sort_expression` in utils/sorting.py
+SORT_INDEXES = [
+    ("ix_games_sort_rating", "coalesce(rating, 0)"),
+    ("ix_games_sort_playing_time", "coalesce(playing_time, 99999)"),
+    ("ix_games_sort_complexity", "coalesce(complexity, 99.0)"),
+    ("ix_games_sort_year_published", "coalesce(year_published, 0)"),
+]
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existieren die Indizes also schon.
+    # Ausdrucksindizes werden nicht überall reflektiert → IF NOT EXISTS.
+    for name, expression in SORT_INDEXES:
+        op.create_index(name, "games", [sa.text(expression), "id"], if_not_exists=True)
+    op.create_index(
+        "ix_game_borrows_event_id_game_id",
+        "game_borrows",
+        ["event_id", "game_id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_game_borrows_event_id_game_id", table_name="game_borrows")
+    for name, _ in reversed(SORT_INDEXES):
+        op.drop_index(name, table_name="games")
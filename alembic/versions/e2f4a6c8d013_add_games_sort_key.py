@@ -0,0 +1,65 @@
+"""add precomputed name sort key to games
+
+Revision ID: e2f4a6c8d013
+Revises: d5e8f1a3b947
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from utils.text import name_sort_key
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e2f4a6c8d013"
+down_revision: Union[str, None] = "d5e8f1a3b947"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+games = sa.table(
+    "games",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("sort_key", sa.String),
+)
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert alles schon.
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    game_columns = {column["name"] for column in inspector.get_columns("games")}
+    game_indexes = {index["name"] for index in inspector.get_indexes("games")}
+
+    if "sort_key" not in game_columns:
+        op.add_column(
+            "games",
+            sa.Column("sort_key", sa.String(), nullable=False, server_default=""),
+        )
+
+    # Bestehende Spiele nachberechnen (neue bekommen den Schlüssel beim Import)
+    rows = bind.execute(
+        sa.select(games.c.id, games.c.name).where(games.c.sort_key == "")
+    ).all()
+    for game_id, name in rows:
+        bind.execute(
+            games.update()
+            .where(games.c.id == game_id)
+            .values(sort_key=name_sort_key(name))
+        )
+
+    if "ix_games_sort_key_id" not in game_indexes:
+        op.create_index("ix_games_sort_key_id", "games", ["sort_key", "id"])
+    if "ix_games_name_id" in game_indexes:
+        op.drop_index("ix_games_name_id", table_name="games")
+
+
+def downgrade():
+    op.create_index("ix_games_name_id", "games", ["name", "id"])
+    op.drop_index("ix_games_sort_key_id", table_name="games")
+    op.drop_column("games", "sort_key")
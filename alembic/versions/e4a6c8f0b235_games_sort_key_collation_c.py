@@ -0,0 +1,32 @@
+"""use collation "C" for games.sort_key on postgres
+
+Revision ID: e4a6c8f0b235
+Revises: d1f3a5c7e924
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e4a6c8f0b235"
+down_revision: Union[str, None] = "d1f3a5c7e924"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # SQLite vergleicht Strings ohnehin binär (wie Python), nur Postgres folgt
+    # sonst der Locale der Datenbank. ALTER ... TYPE baut ix_games_sort_key_id neu.
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute('ALTER TABLE games ALTER COLUMN sort_key TYPE varchar COLLATE "C"')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            'ALTER TABLE games ALTER COLUMN sort_key TYPE varchar COLLATE "default"'
+        )
@@ -0,0 +1,65 @@
+"""add sync_operation_outcomes
+
+Revision ID: f3b5d7e9a146
+Revises: e4a6c8f0b235
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b5d7e9a146"
+down_revision: Union[str, None] = "e4a6c8f0b235"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert die Tabelle also schon.
+    if "sync_operation_outcomes" in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        "sync_operation_outcomes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("op_id", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column(
+            "game_id",
+            sa.Integer(),
+            sa.ForeignKey("games.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.Column("error_code", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "uq_sync_operation_outcomes_user_id_op_id",
+        "sync_operation_outcomes",
+        ["user_id", "op_id"],
+        unique=True,
+    )
+
+    # Bisher angewendete Operationen stehen nur im Journal
+    op.execute(
+        "INSERT INTO sync_operation_outcomes "
+        "(user_id, op_id, status, game_id, created_at) "
+        "SELECT user_id, op_id, 'applied', game_id, created_at FROM borrow_events "
+        "WHERE op_id IS NOT NULL AND user_id IS NOT NULL"
+    )
+
+
+def downgrade():
+    op.drop_table("sync_operation_outcomes")
@@ -0,0 +1,53 @@
+"""add game_names table for alternate titles
+
+Revision ID: f6a1c3e5b028
+Revises: e2f4a6c8d013
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f6a1c3e5b028"
+down_revision: Union[str, None] = "e2f4a6c8d013"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    # Die Baseline-Revision legt das Schema per create_all() aus den aktuellen
+    # Modellen an – auf frischen Datenbanken existiert die Tabelle also schon.
+    bind = op.get_bind()
+    if "game_names" not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            "game_names",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column(
+                "game_id",
+                sa.Integer(),
+                sa.ForeignKey("games.id", ondelete="CASCADE"),
+                nullable=False,
+            ),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.UniqueConstraint("game_id", "name", name="uq_game_names_game_id_name"),
+        )
+        op.create_index("ix_game_names_id", "game_names", ["id"])
+        op.create_index("ix_game_names_game_id", "game_names", ["game_id"])
+
+    # Teilstringsuche über alternative Titel (wie ix_games_name_trgm)
+    if bind.dialect.name == "postgresql":
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_game_names_name_trgm "
+            "ON game_names USING gin (name gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_game_names_name_trgm")
+    op.drop_table("game_names")
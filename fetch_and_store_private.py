@@ -2,14 +2,16 @@ import requests
 from bs4 import BeautifulSoup
 import time
 from collections import defaultdict
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload, undefer_group
 from database import SessionLocal
-from models import Game
+from models import Game, GameName
 from utils.filters import assign_complexity_label
+from utils.text import name_sort_key
+from utils.revisions import mark_referencing_games_changed
 import os
 import json
 import html
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 api_token = os.environ["BGG_API_TOKEN"]
 
@@ -109,6 +111,7 @@ def fetch_game_details(
                                     recommended_players
                                 )
 
+                        data["alternate_names"] = parse_alternate_names(item)
                         details[bgg_id] = data
                     break
                 else:
@@ -125,6 +128,35 @@ def fetch_game_details(
     return details
 
 
+def parse_alternate_names(item) -> List[str]:
+    """
+    Alternative Titel eines `<item>` aus der /thing-API (u. a. deutsche
+    Ausgaben), ohne Duplikate und in BGG-Reihenfolge.
+    """
+    names = []
+    for element in item.find_all("name", {"type": "alternate"}):
+        name = html.unescape(element.get("value", "")).strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def set_alternate_names(game: Game, names: Optional[List[str]]) -> bool:
+    """
+    Gleicht `game.alternate_names` mit `names` ab (None = unverändert lassen,
+    z. B. wenn die Details nicht geladen werden konnten). True bei Änderungen.
+    """
+    if names is None:
+        return False
+    primary = game.name
+    names = [name for name in names if name != primary]
+    current = {alternate.name: alternate for alternate in game.alternate_names}
+    if set(current) == set(names):
+        return False
+    game.alternate_names = [current.get(name) or GameName(name=name) for name in names]
+    return True
+
+
 def parse_safe_int(element, attribute):
     """
     Sicheres Parsen eines Integer-Werts aus einem XML-Element.
@@ -193,6 +225,7 @@ def parse_collection(xml_data):
         lambda: {
             "bgg_id": None,
             "name": None,
+            "sort_key": None,
             "description": None,
             "german_description": None,
             "year_published": None,
@@ -226,6 +259,7 @@ def parse_collection(xml_data):
         game = grouped_games[bgg_id]
         game["bgg_id"] = bgg_id
         game["name"] = item.find("name").text
+        game["sort_key"] = name_sort_key(game["name"])
         game["year_published"] = (
             int(item.find("yearpublished").text)
             if item.find("yearpublished")
@@ -321,7 +355,12 @@ def add_games_to_db(games):
         new_games_by_bgg_id = {game["bgg_id"]: game for game in games}
 
         # Alle existierenden Spiele aus der DB abrufen
-        existing_games = db.query(Game).all()
+        # Detail-Spalten mitladen, da unten alle Felder verglichen werden
+        existing_games = (
+            db.query(Game)
+            .options(undefer_group("details"), selectinload(Game.alternate_names))
+            .all()
+        )
         existing_games_by_bgg_id = {game.bgg_id: game for game in existing_games}
 
         all_game_ids = list(new_games_by_bgg_id.keys())
@@ -332,10 +371,11 @@ def add_games_to_db(games):
                 new_game_data.update(details[bgg_id])
 
             assign_complexity_label(new_game_data)
+            alternate_names = new_game_data.pop("alternate_names", None)
 
             if bgg_id in existing_games_by_bgg_id:
                 existing_game = existing_games_by_bgg_id[bgg_id]
-                updated = False
+                updated = set_alternate_names(existing_game, alternate_names)
 
                 for key, value in new_game_data.items():
                     if (
@@ -356,6 +396,7 @@ def add_games_to_db(games):
                 try:
                     new_game_data.pop("id", None)
                     new_game = Game(**new_game_data)
+                    set_alternate_names(new_game, alternate_names)
                     db.add(new_game)
                     added_count += 1
                     print(
@@ -369,6 +410,9 @@ def add_games_to_db(games):
         # Lösche Spiele, die nicht mehr in der aktuellen Sammlung enthalten sind
         for existing_game in existing_games:
             if existing_game.bgg_id not in new_games_by_bgg_id:
+                # Spiele, deren Similarities auf das gelöschte Spiel zeigen,
+                # ändern sich mit (Delta-Sync)
+                mark_referencing_games_changed(db, existing_game.id)
                 db.delete(existing_game)
                 deleted_count += 1
                 print(
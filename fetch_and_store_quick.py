@@ -8,7 +8,12 @@ from sqlalchemy.orm import Session
 from database import SessionLocal
 from models import Game, GameSimilarity
 from utils.filters import assign_complexity_label
-from fetch_and_store_private import parse_collection
+from fetch_and_store_private import (
+    parse_alternate_names,
+    parse_collection,
+    set_alternate_names,
+)
+from utils.revisions import mark_referencing_games_changed
 
 api_token = os.environ["BGG_API_TOKEN"]
 
@@ -97,6 +102,7 @@ def fetch_game_details(
                             "complexity": (
                                 float(averageweight["value"]) if averageweight else None
                             ),
+                            "alternate_names": parse_alternate_names(item),
                         }
                         details[bgg_id] = data
 
@@ -207,7 +213,9 @@ def add_games_to_db_quick(games):
             if bgg_id not in existing_by_id:
                 # Nur Felder, die auch existieren
                 game_data.pop("id", None)
+                alternate_names = game_data.pop("alternate_names", None)
                 new_game = Game(**game_data)
+                set_alternate_names(new_game, alternate_names)
 
                 db.add(new_game)
                 added_count += 1
@@ -219,6 +227,8 @@ def add_games_to_db_quick(games):
         for existing_game in existing_games:
             if existing_game.bgg_id not in new_games_by_bgg_id:
                 # 1️⃣ Erst alle GameSimilarity-Einträge löschen
+                # (Spiele, die darauf verweisen, bekommen eine neue Revision)
+                mark_referencing_games_changed(db, existing_game.id)
                 db.query(GameSimilarity).filter(
                     (GameSimilarity.game_id == existing_game.id)
                     | (GameSimilarity.similar_game_id == existing_game.id)
@@ -1,4 +1,6 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from database import engine, Base
 from routes.auth import router as auth_router
@@ -6,10 +8,22 @@ from routes.games import router as games_router
 from routes.admin import router as admin_router
 from routes.helper import router as helper_router
 from routes.player_search import router as player_search_router
+from utils.borrow_counter import BORROW_WRITE_BEHIND, borrow_buffer
 
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Write-behind der Ausleihzähler: periodisch schreiben, Rest beim Shutdown
+    if BORROW_WRITE_BEHIND:
+        borrow_buffer.start()
+    yield
+    if BORROW_WRITE_BEHIND:
+        borrow_buffer.stop()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
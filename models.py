@@ -1,18 +1,23 @@
 from sqlalchemy import (
     Table,
     Column,
+    BigInteger,
     Integer,
     String,
     Boolean,
     Float,
     ForeignKey,
     DateTime,
+    Index,
+    LargeBinary,
+    UniqueConstraint,
     func,
+    literal_column,
 )
 from database import Base
-from sqlalchemy.orm import relationship
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional, Literal
+from sqlalchemy.orm import deferred, relationship
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 
 
@@ -160,6 +165,83 @@ class AddEANRequest(BaseModel):
     ean: str
 
 
+class ScanBatchItem(BaseModel):
+    ean: str
+    # "auto" wie /games/game/scan_by_ean: alle da → Ausleihe, keins da → Rückgabe
+    action: Literal["borrow", "return", "auto"] = "auto"
+
+
+class ScanBatchRequest(BaseModel):
+    items: List[ScanBatchItem] = Field(..., min_length=1, max_length=200)
+
+
+class ScanBatchResult(BaseModel):
+    """Ergebnis je Scan, in der Reihenfolge der Anfrage."""
+
+    ean: str
+    action: Optional[Literal["borrow", "return", "inconclusive"]]
+    error_code: Optional[str] = None
+    message: Optional[str] = None
+    game_id: Optional[int] = None
+    name: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    # Bestand direkt nach diesem Scan
+    available: Optional[int] = None
+    quantity: Optional[int] = None
+    # Ausleihen im aktuellen Event (Stand nach dem ganzen Stapel)
+    borrow_count: Optional[int] = None
+
+
+class ScanBatchResponse(BaseModel):
+    results: List[ScanBatchResult]
+    borrowed: int
+    returned: int
+    failed: int
+
+
+class SyncOperation(BaseModel):
+    """Offline am Scanner erfasste Ausleihe/Rückgabe (per EAN oder Spiel-ID)."""
+
+    op_id: str = Field(..., min_length=1, max_length=64)
+    action: Literal["borrow", "return"]
+    ean: Optional[str] = None
+    game_id: Optional[int] = None
+    client_timestamp: datetime
+
+    @model_validator(mode="after")
+    def _check_game(self):
+        if self.ean is None and self.game_id is None:
+            raise ValueError("ean oder game_id angeben")
+        return self
+
+
+class SyncOperationsRequest(BaseModel):
+    operations: List[SyncOperation] = Field(..., min_length=1, max_length=1000)
+
+
+class SyncOperationResult(BaseModel):
+    op_id: str
+    status: Literal["applied", "conflict"]
+    game_id: Optional[int] = None
+    error_code: Optional[str] = None
+    message: Optional[str] = None
+    # Ergebnis eines früheren Syncs (bzw. derselben op_id weiter vorn)
+    replayed: bool = False
+
+
+class SyncGameState(BaseModel):
+    game_id: int
+    available: int
+    quantity: int
+    borrow_count: int
+
+
+class SyncOperationsResponse(BaseModel):
+    results: List[SyncOperationResult]
+    # Bestand der betroffenen Spiele nach dem Sync
+    games: List[SyncGameState]
+
+
 class TagResponse(BaseModel):
     id: int
     normalized_tag: str
@@ -245,11 +327,93 @@ class GameResponse(BaseModel):
 class GamesWithCountResponse(BaseModel):
     games: List[GameResponse]
     total: int
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
 
 
+class GameFacetsResponse(BaseModel):
+    total: int
+    complexities: Dict[str, int]
+    player_counts: Dict[int, int]
+    available: int
+    missing_ean: int
+
+
+class GameSuggestionResponse(BaseModel):
+    """Treffer aus /games/suggest, `score` zwischen 0 und 1."""
+
+    score: float
+    game: GameResponse
+
+
+class BorrowHourResponse(BaseModel):
+    hour: datetime
+    borrows: int
+    returns: int
+
+
+class BorrowGameStatsResponse(BaseModel):
+    game_id: int
+    name: str
+    borrows: int
+    returns: int
+    # Aktuell ausgeliehene Exemplare laut Journal
+    out_now: int
+    # Durchschnittliche Ausleihdauer in Minuten (offene Ausleihen bis jetzt)
+    avg_minutes_out: Optional[float]
+
+
+class BorrowLedgerEntryResponse(BaseModel):
+    id: int
+    game_id: int
+    event_id: int
+    user_id: Optional[int]
+    action: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class GameChangeResponse(BaseModel):
+    """Katalogzeile für die Delta-Synchronisation (ohne Verfügbarkeit)."""
+
+    id: int
+    bgg_id: int
+    name: str
+    description: Optional[str]
+    german_description: Optional[str]
+    tags: List[TagResponse]
+    similar_games: List[int]
+    year_published: Optional[int]
+    min_players: Optional[int]
+    max_players: Optional[int]
+    min_playtime: Optional[int]
+    max_playtime: Optional[int]
+    playing_time: Optional[int]
+    rating: Optional[float]
+    ean: Optional[str]
+    quantity: int
+    img_url: Optional[str]
+    thumbnail_url: Optional[str]
+    player_age: Optional[int]
+    complexity: Optional[float]
+    complexity_label: Optional[str]
+    best_playercount: Optional[int]
+    min_recommended_playercount: Optional[int]
+    max_recommended_playercount: Optional[int]
+    revision: int
+    updated_at: Optional[datetime]
+
+
+class GameChangesResponse(BaseModel):
+    revision: int
+    games: List[GameChangeResponse]
+    deleted: List[int]
+    next_cursor: Optional[str] = None
+
+
 class GameSimilarity(Base):
     __tablename__ = "game_similarities"
 
@@ -273,11 +437,23 @@ class GameSimilarity(Base):
 class Game(Base):
     __tablename__ = "games"
 
+    # Beschreibungen und Kommentare (Gruppe "details") werden nur bei Bedarf
+    # geladen, z. B. per `undefer_group("details")` in der Detailansicht.
+
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     bgg_id = Column(Integer, nullable=False, unique=True, index=True)
     name = Column(String, nullable=False, index=True)
-    description = Column(String, nullable=True)
-    german_description = Column(String, nullable=True)
+    # Vorberechneter Sortierschlüssel (utils/text.py: name_sort_key). Collation
+    # "C" auf Postgres: Byte-/Codepoint-Reihenfolge wie in Python und SQLite
+    # (BINARY), sonst überspringen/wiederholen Keyset-Cursor Zeilen
+    sort_key = Column(
+        String().with_variant(String(collation="C"), "postgresql"),
+        nullable=False,
+        default="",
+        server_default="",
+    )
+    description = deferred(Column(String, nullable=True), group="details")
+    german_description = deferred(Column(String, nullable=True), group="details")
     year_published = Column(Integer, nullable=True)
     min_players = Column(Integer, nullable=True)
     max_players = Column(Integer, nullable=True)
@@ -290,7 +466,7 @@ class Game(Base):
     quantity = Column(Integer, default=1)
     acquired_from = Column(String, nullable=True)
     inventory_location = Column(String, nullable=True)
-    private_comment = Column(String, nullable=True)
+    private_comment = deferred(Column(String, nullable=True), group="details")
     img_url = Column(String, nullable=True)
     thumbnail_url = Column(String, nullable=True)
     player_age = Column(Integer, nullable=True)
@@ -299,6 +475,10 @@ class Game(Base):
     best_playercount = Column(Integer, nullable=True)
     min_recommended_playercount = Column(Integer, nullable=True)
     max_recommended_playercount = Column(Integer, nullable=True)
+    # Katalog-Revision der letzten inhaltlichen Änderung (nicht `available`),
+    # gesetzt in utils/revisions.py
+    revision = Column(BigInteger, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), nullable=True)
 
     user_knowledge = relationship(
         "UserGameKnowledge", back_populates="game", cascade="all, delete-orphan"
@@ -315,6 +495,77 @@ class Game(Base):
         overlaps="game,similarities_from",
         cascade="all, delete-orphan",
     )
+    # Alternative Titel aus BGG (z. B. deutsche Ausgaben), für die Suche
+    alternate_names = relationship(
+        "GameName", cascade="all, delete-orphan", order_by="GameName.id"
+    )
+
+    __table_args__ = (
+        # Standardsortierung + Keyset-Pagination über (sort_key, id)
+        Index("ix_games_sort_key_id", "sort_key", "id"),
+        # Delta-Sync: WHERE revision > :since ORDER BY revision, id
+        Index("ix_games_revision_id", "revision", "id"),
+        # Sortierungen (Wert, id) – Ausdrücke wie `sort_expression` in
+        # utils/sorting.py, NULL-Ersatzwerte landen immer am Ende
+        Index(
+            "ix_games_sort_rating", func.coalesce(rating, literal_column("0")), id
+        ),
+        Index(
+            "ix_games_sort_playing_time",
+            func.coalesce(playing_time, literal_column("99999")),
+            id,
+        ),
+        Index(
+            "ix_games_sort_complexity",
+            func.coalesce(complexity, literal_column("99.0")),
+            id,
+        ),
+        Index(
+            "ix_games_sort_year_published",
+            func.coalesce(year_published, literal_column("0")),
+            id,
+        ),
+    )
+
+
+class CatalogRevision(Base):
+    """
+    Revisionszähler: id = 1 Katalog-Revision (Delta-Sync), id = 2 Revision der
+    Benutzerdaten (Familiarity, Spielergesuche) für die ETags aller Worker.
+    """
+
+    __tablename__ = "catalog_revision"
+
+    id = Column(Integer, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class GameTombstone(Base):
+    """Gelöschte Spiele, damit Clients sie per Delta-Sync entfernen können."""
+
+    __tablename__ = "game_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(Integer, nullable=False, index=True)
+    bgg_id = Column(Integer, nullable=True)
+    revision = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class GameName(Base):
+    """Alternativer Titel eines Spiels (BGG `<name type="alternate">`)."""
+
+    __tablename__ = "game_names"
+
+    id = Column(Integer, primary_key=True, index=True)
+    game_id = Column(
+        Integer, ForeignKey("games.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    name = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("game_id", "name", name="uq_game_names_game_id_name"),
+    )
 
 
 class Event(Base):
@@ -342,6 +593,147 @@ class GameBorrow(Base):
     event = relationship("Event", backref="borrows")
     game = relationship("Game", backref="borrows")
 
+    __table_args__ = (
+        # Eine Zeile je (Event, Spiel): Ziel des Upserts in utils/inventory.py,
+        # außerdem Ausleihzahlen je Event (sort=popularity)
+        Index(
+            "uq_game_borrows_event_id_game_id", "event_id", "game_id", unique=True
+        ),
+    )
+
+
+class BorrowEvent(Base):
+    """
+    Ausleih-Journal: eine Zeile je Ausleihe/Rückgabe, wird nur angehängt.
+    Geschrieben in derselben Transaktion wie die Änderung von `available`.
+    """
+
+    __tablename__ = "borrow_events"
+
+    id = Column(Integer, primary_key=True)
+    game_id = Column(
+        Integer, ForeignKey("games.id", ondelete="CASCADE"), nullable=False
+    )
+    event_id = Column(
+        Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False
+    )
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    action = Column(String, nullable=False)  # "borrow" | "return"
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    # Operations-ID des Scanners bei Offline-Sync (/games/sync_operations)
+    op_id = Column(String, nullable=True)
+
+    __table_args__ = (
+        # Verlauf je Spiel bzw. je Event, jeweils zeitlich sortiert
+        Index("ix_borrow_events_game_id_created_at", "game_id", "created_at"),
+        Index("ix_borrow_events_event_id_created_at", "event_id", "created_at"),
+        # Jede Offline-Operation nur einmal anwenden (NULL = Online-Ausleihe)
+        Index("uq_borrow_events_user_id_op_id", "user_id", "op_id", unique=True),
+    )
+
+
+class BorrowHourlyStat(Base):
+    """Rollup des Journals: Ausleihen/Rückgaben je Event und Stunde (UTC)."""
+
+    __tablename__ = "borrow_stats_hourly"
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(
+        Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False
+    )
+    hour = Column(DateTime(timezone=True), nullable=False)
+    borrows = Column(Integer, nullable=False, default=0)
+    returns = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index(
+            "uq_borrow_stats_hourly_event_id_hour", "event_id", "hour", unique=True
+        ),
+    )
+
+
+class BorrowGameStat(Base):
+    """
+    Rollup des Journals je Event und Spiel. `borrowed_seconds`/`returned_seconds`
+    sind Summen der Unix-Zeitstempel – ihre Differenz ist die Gesamtausleihdauer,
+    ohne Ausleihen und Rückgaben einander zuordnen zu müssen.
+    """
+
+    __tablename__ = "borrow_stats_games"
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(
+        Integer, ForeignKey("events.id", ondelete="CASCADE"), nullable=False
+    )
+    game_id = Column(
+        Integer, ForeignKey("games.id", ondelete="CASCADE"), nullable=False
+    )
+    borrows = Column(Integer, nullable=False, default=0)
+    returns = Column(Integer, nullable=False, default=0)
+    borrowed_seconds = Column(BigInteger, nullable=False, default=0)
+    returned_seconds = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index(
+            "uq_borrow_stats_games_event_id_game_id", "event_id", "game_id", unique=True
+        ),
+        # Meistgeliehene Spiele je Event
+        Index("ix_borrow_stats_games_event_id_borrows", "event_id", "borrows"),
+    )
+
+
+class IdempotencyKey(Base):
+    """
+    Idempotency-Key je Benutzer für Ausleih-Endpunkte (siehe utils/idempotency.py).
+    Wird samt Antwort in der Transaktion der Ausleihe geschrieben.
+    """
+
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    key = Column(String, nullable=False)
+    # Hash aus Methode, Pfad, Query und Body – gleicher Key, andere Anfrage → Fehler
+    fingerprint = Column(String, nullable=False)
+    response = Column(LargeBinary, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("uq_idempotency_keys_user_id_key", "user_id", "key", unique=True),
+        Index("ix_idempotency_keys_created_at", "created_at"),
+    )
+
+
+class SyncOperationOutcome(Base):
+    """
+    Ergebnis jeder Offline-Operation je Benutzer (/games/sync_operations),
+    auch abgelehnter: ein erneut gesendetes op_id bekommt dasselbe Ergebnis.
+    """
+
+    __tablename__ = "sync_operation_outcomes"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    op_id = Column(String, nullable=False)
+    status = Column(String, nullable=False)  # "applied" | "conflict"
+    game_id = Column(
+        Integer, ForeignKey("games.id", ondelete="SET NULL"), nullable=True
+    )
+    error_code = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index(
+            "uq_sync_operation_outcomes_user_id_op_id", "user_id", "op_id", unique=True
+        ),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -388,6 +780,11 @@ class PlayerSearch(Base):
 
     game = relationship("Game", back_populates="player_searches")
 
+    __table_args__ = (
+        # Detailansicht: heutige Gesuche eines Spiels
+        Index("ix_player_search_game_id_created_at", "game_id", "created_at"),
+    )
+
 
 class ChangePasswordRequest(BaseModel):
     current_password: str
@@ -1,5 +1,7 @@
 import os
 import threading
+from datetime import datetime, timezone
+from typing import Optional
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from database import get_db
@@ -10,6 +12,11 @@ from similar_games import update_similar_games
 from auth import require_role, hash_password
 from fetch_and_store_quick import fetch_and_store_quick
 from utils.errors import create_error
+from utils.pagination import total_count_cache
+from utils.catalog import availability, rebuild_catalog
+from utils.events import event_calendar
+from utils.inventory import change_available_many
+from utils.ledger import open_loans, rebuild_rollups
 
 # BGG-Credentials aus Umgebungsvariablen
 bgg_username = os.getenv("BGG_USERNAME")
@@ -34,6 +41,8 @@ def fetch_private_collection_quick(
         )
     try:
         result = fetch_and_store_quick(bgg_username, fastMode=True)
+        total_count_cache.clear()
+        rebuild_catalog()
         return result
     except Exception as e:
         create_error(
@@ -56,6 +65,8 @@ def fetch_complete_collection(
         result = fetch_and_store_private(bgg_username, bgg_password)
         changes = update_tags_logic(only_missing_tags=True)
         similarities = update_similar_games(max_similar_games=10)
+        total_count_cache.clear()
+        rebuild_catalog()
         return {"result": result, "changes": changes, "similarities": similarities}
     except Exception as e:
         create_error(
@@ -76,6 +87,8 @@ def fetch_private_collection(
         )
     try:
         result = fetch_and_store_private(bgg_username, bgg_password)
+        total_count_cache.clear()
+        rebuild_catalog()
         return result
     except Exception as e:
         create_error(
@@ -99,6 +112,7 @@ def fetch_tags_endpoint(
         )
     try:
         changes = update_tags_logic(only_missing_tags=False)
+        rebuild_catalog()
         return {"message": "Tags fetched and saved successfully.", "changes": changes}
     except Exception as e:
         create_error(
@@ -142,12 +156,74 @@ def reset_available_for_all_games(
         {Game.available: Game.quantity}, synchronize_session=False
     )
     db.commit()
+    total_count_cache.clear()
+    availability.invalidate()
     return {
         "message": "For all games, 'available' has been reset to match 'quantity'.",
         "updated_rows": updated_rows,
     }
 
 
+@router.put("/reconstruct_available")
+def reconstruct_available_from_ledger(
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin")),
+):
+    """
+    Setzt `available` auf quantity minus die laut Ausleih-Journal offenen
+    Ausleihen des Events (z. B. nach einem versehentlichen reset_available).
+    """
+    target_year = year or datetime.now(timezone.utc).year
+    event = event_calendar.get(db, target_year)
+    if event is None:
+        create_error(status_code=404, error_code="EVENT_NOT_FOUND")
+
+    loans = open_loans(db, event.id)
+    updated_rows = db.query(Game).update(
+        {Game.available: Game.quantity}, synchronize_session=False
+    )
+    change_available_many(db, {game_id: -out for game_id, out in loans.items()})
+    db.query(Game).filter(Game.available < 0).update(
+        {Game.available: 0}, synchronize_session=False
+    )
+    db.commit()
+    total_count_cache.clear()
+    availability.invalidate()
+    return {
+        "message": "'available' has been reconstructed from the borrow ledger.",
+        "updated_rows": updated_rows,
+        "open_loans": sum(loans.values()),
+    }
+
+
+@router.put("/rebuild_borrow_stats")
+def rebuild_borrow_stats(
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("admin")),
+):
+    """Baut die Statistiken je Stunde und je Spiel aus dem Ausleih-Journal neu auf."""
+    target_year = year or datetime.now(timezone.utc).year
+    event = event_calendar.get(db, target_year)
+    if event is None:
+        create_error(status_code=404, error_code="EVENT_NOT_FOUND")
+
+    entries = rebuild_rollups(db, event.id)
+    db.commit()
+    return {
+        "message": "Borrow statistics have been rebuilt from the borrow ledger.",
+        "ledger_entries": entries,
+    }
+
+
+@router.post("/events/invalidate_cache")
+def invalidate_event_cache(current_user: User = Depends(require_role("admin"))):
+    # Nach direkten Änderungen an `events` in der DB (kein Schreib-Endpunkt)
+    event_calendar.invalidate()
+    return {"message": "Event-Cache wird beim nächsten Zugriff neu geladen."}
+
+
 @router.put("/reset-password")
 def reset_user_password(
     username_or_email: str,
@@ -1,64 +1,250 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session, joinedload, selectinload
-from sqlalchemy import asc, desc, func
+from fastapi import APIRouter, Depends, Header, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, selectinload, undefer_group
+from sqlalchemy import asc, desc, exists, func, or_
 from database import get_db
 from models import (
     Game,
+    GameChangeResponse,
+    GameChangesResponse,
+    GameFacetsResponse,
     GameResponse,
     GameSearchResponse,
+    GameSuggestionResponse,
     GamesWithCountResponse,
     GameResponseWithDetails,
     User,
     UserGameKnowledge,
     AddEANRequest,
+    PlayerSearch,
     PlayerSearchResponse,
-    Event,
+    BorrowGameStatsResponse,
+    BorrowHourResponse,
+    BorrowLedgerEntryResponse,
+    ScanBatchRequest,
+    ScanBatchResponse,
+    SyncOperationsRequest,
+    SyncOperationsResponse,
     GameBorrow,
+    GameTombstone,
 )
-from utils.filters import apply_game_filters
-from typing import List, Optional
-from similar_games import get_top_similar_game_ids
-from utils.errors import create_error
+from utils.filters import apply_game_filters, load_tag_lookup, resolve_tag_ids
+from utils.search import get_search_backend
+from utils.catalog import (
+    availability,
+    get_catalog,
+    load_catalog_snapshot,
+    update_catalog_ean,
+)
+from utils.autocomplete import get_autocomplete_index
+from utils.text import fold
+from utils.projection import project, refresh_all_columns
+from utils.etag import catalog_version, conditional_get
+from utils.revisions import current_revision
+from utils.serialization import (
+    game_fragments,
+    games_array,
+    games_page,
+    json_response,
+)
+from utils.suggest import get_suggestion_index, tag_weights
+from utils.sorting import (
+    SORT_OPTIONS,
+    SORT_PATTERN,
+    apply_sort,
+    cursor_values,
+    decode_sort_cursor,
+)
+from utils.popularity import popularity
+from utils.events import EventWindow, as_utc, event_calendar
+from utils.borrow_counter import read_borrow_counts, record_borrows
+from utils.ledger import (
+    game_stats,
+    hourly_stats,
+    latest_entries,
+    ledger_entries,
+    record_lending,
+    record_sync_outcomes,
+    sync_outcomes,
+)
+from utils.idempotency import idempotency, request_fingerprint
+from utils.inventory import (
+    LENDING_FIELDS,
+    lending_fields,
+    change_available_many,
+    load_game_row,
+    lock_games,
+    lock_games_by_ean,
+    return_copy,
+    scan_action,
+    scan_copy,
+    take_copy,
+)
+from utils.export import export_csv, export_ndjson
+from utils.game_details import game_details, similar_seed, top_similar_ids
+from utils.facets import compute_facets_from_catalog, compute_facets_sql
+from utils.pagination import (
+    apply_keyset,
+    decode_cursor,
+    encode_cursor,
+    filter_cache_key,
+    total_count_cache,
+)
+from typing import Callable, Dict, Iterable, List, Optional
+from utils.errors import ERROR_CODES, create_error
 from auth import require_role
 from datetime import datetime, timezone, timedelta
+from bisect import bisect_right
+from functools import partial
+import orjson
 
 
 router = APIRouter()
 
+# Spalten aus `games`, die /games/changes pro Spiel ausliefert
+CHANGE_COLUMNS = [
+    field
+    for field in GameChangeResponse.model_fields
+    if field not in ("tags", "similar_games")
+]
+
 
-def get_current_event(db: Session, year: Optional[int] = None) -> Event:
+def get_current_event(db: Session, year: Optional[int] = None) -> EventWindow:
     """Gibt das Event des angegebenen Jahres zurück, default current year."""
-    now = datetime.now(timezone.utc)
-    target_year = year or now.year
+    target_year = year or datetime.now(timezone.utc).year
 
-    event = db.query(Event).filter(Event.year == target_year).first()
+    # ⚡ Aus dem Event-Kalender im Speicher statt einer Abfrage pro Ausleihe
+    event = event_calendar.get(db, target_year)
     if not event:
         raise ValueError(f"Kein Event für {target_year} gefunden in der DB!")
 
     return event
 
 
-def is_event_active(event: Event) -> bool:
-    """Prüft, ob das Event gerade stattfindet."""
-    now = datetime.now(timezone.utc)
+def is_event_active(event: EventWindow) -> bool:
+    """Prüft, ob das Event gerade stattfindet (Zeitfenster ist vorberechnet)."""
+    return event.is_active()
+
+
+def _resolve_tags(
+    db: Session, catalog, tags: Optional[List[str]], match_all_tags: bool
+) -> Optional[List[int]]:
+    """Tag-Namen → Tag-IDs (aus dem Snapshot, sonst aus der Datenbank)."""
+    if not tags:
+        return None
+    tag_lookup = catalog.tag_lookup if catalog is not None else load_tag_lookup(db)
+    return resolve_tag_ids(tags, tag_lookup, match_all_tags)
+
+
+def _query_games_page(
+    db: Session,
+    is_ean_lookup: bool,
+    limit: int,
+    offset: int,
+    cursor: Optional[list],
+    filter_text: Optional[str],
+    show_available_only: bool,
+    min_player_count: int,
+    player_age: int,
+    show_missing_ean_only: bool,
+    complexities: Optional[List[str]],
+    tag_ids: Optional[List[int]] = None,
+    match_all_tags: bool = True,
+    sort: str = "name",
+    popularity_counts: Optional[Dict[int, int]] = None,
+):
+    """Datenbank-Pfad für `read_all_games`, falls kein Katalog-Snapshot aktiv ist."""
+    query = db.query(Game).options(project(GameResponse, Game.revision, Game.sort_key))
 
-    # Falls das Event-naive Datetimes hat, als UTC interpretieren
-    start = (
-        event.start_date.replace(tzinfo=timezone.utc)
-        if event.start_date.tzinfo is None
-        else event.start_date
+    if is_ean_lookup:
+        # Eindeutige EAN → Suche direkt
+        query = query.filter(Game.ean == filter_text)
+    else:
+        # Normale Filterlogik
+        query = apply_game_filters(
+            query,
+            filter_text,
+            show_available_only,
+            min_player_count,
+            player_age,
+            show_missing_ean_only,
+            complexities,
+            tag_ids,
+            match_all_tags,
+        )
+
+    # 🔹 Gesamtanzahl nur einmal pro Filterkombination berechnen
+    cache_key = filter_cache_key(
+        is_ean_lookup,
+        filter_text,
+        show_available_only,
+        min_player_count,
+        player_age,
+        show_missing_ean_only,
+        complexities,
+        tag_ids,
+        match_all_tags,
     )
-    end = (
-        event.end_date.replace(tzinfo=timezone.utc)
-        if event.end_date.tzinfo is None
-        else event.end_date
+    total_games = total_count_cache.get_or_compute(cache_key, query.count)
+
+    if sort == "popularity":
+        games = _popularity_page(query, limit, offset, cursor, popularity_counts or {})
+        return games, total_games
+
+    if sort == "name":
+        query = query.order_by(asc(Game.sort_key), asc(Game.id))
+        if cursor:
+            query = apply_keyset(query, (Game.sort_key, Game.id), cursor)
+    else:
+        query = apply_sort(query, SORT_OPTIONS[sort], cursor)
+
+    # 🔹 Cursor-Modus: direkt hinter der letzten Zeile weiterlesen (kein OFFSET)
+    if cursor:
+        games = query.limit(limit).all()
+    else:
+        games = query.offset(offset).limit(limit).all()
+
+    return games, total_games
+
+
+def _popularity_page(
+    query,
+    limit: int,
+    offset: int,
+    cursor: Optional[list],
+    popularity_counts: Dict[int, int],
+) -> List[Game]:
+    """
+    `sort=popularity` ohne Snapshot: sortiert nur die IDs der Treffer nach den
+    vorberechneten Ausleihzahlen (kein JOIN auf game_borrows) und lädt dann
+    die Seite.
+    """
+    keys = sorted(
+        (-popularity_counts.get(game_id, 0), -game_id)
+        for (game_id,) in query.with_entities(Game.id)
     )
+    start = bisect_right(keys, (-cursor[0], -cursor[1])) if cursor else offset
+    page_ids = [-game_id for _, game_id in keys[start : start + limit]]
 
-    return start <= now <= end
+    rank = {game_id: i for i, game_id in enumerate(page_ids)}
+    games = query.filter(Game.id.in_(page_ids)).all()
+    games.sort(key=lambda game: rank[game.id])
+    return games
+
+
+def _popularity_counts(db: Session) -> Dict[int, int]:
+    """Ausleihzahlen des aktuellen Events (leer, falls es keins gibt)."""
+    try:
+        event = get_current_event(db)
+    except ValueError:
+        return {}
+    return popularity.counts(db, event.id)
 
 
 @router.get("/", response_model=GamesWithCountResponse)
 def read_all_games(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     limit: int = Query(50, ge=1),
     offset: int = Query(0, ge=0),
@@ -74,30 +260,110 @@ def read_all_games(
             "(z.B. ?complexities=einsteiger&complexities=fortgeschritten)"
         ),
     ),
+    tags: list[str] = Query(
+        None,
+        description=(
+            "Tag-Namen, englisch oder deutsch "
+            "(z.B. ?tags=Strategy&tags=Fantasy)"
+        ),
+    ),
+    tag_mode: str = Query(
+        "all",
+        pattern="^(all|any)$",
+        description="all = Spiel hat alle Tags, any = mindestens einen",
+    ),
     user_id: int = Query(
         None, description="ID des Nutzers, für den my_familiarity geholt werden soll"
     ),
+    after: Optional[str] = Query(
+        None,
+        description=(
+            "Cursor aus `next_cursor` der vorherigen Seite "
+            "(ersetzt offset, Keyset-Pagination über Sortierwert + id)"
+        ),
+    ),
+    sort: str = Query(
+        "name",
+        pattern=SORT_PATTERN,
+        description=(
+            "name (A–Z), rating, playing_time, complexity, year_published, "
+            "popularity (Ausleihen im aktuellen Event) oder recent (neueste zuerst)"
+        ),
+    ),
 ):
-    query = db.query(Game).options(joinedload(Game.tags)).order_by(asc(Game.name))
+    # 🔹 Unveränderter Katalog → 304 nach kurzem Abgleich mit der DB
+    not_modified = conditional_get(request, response, db=db)
+    if not_modified:
+        return not_modified
 
     # 🔹 Automatische Barcode-Erkennung
-    if filter_text and filter_text.isdigit() and 8 <= len(filter_text) <= 13:
-        # Eindeutige EAN → Suche direkt
-        query = query.filter(Game.ean == filter_text)
+    is_ean_lookup = bool(
+        filter_text and filter_text.isdigit() and 8 <= len(filter_text) <= 13
+    )
+    cursor = decode_sort_cursor(after, sort) if after else None
+    popularity_counts = _popularity_counts(db) if sort == "popularity" else None
+
+    catalog = get_catalog(db)
+    match_all_tags = tag_mode == "all"
+    tag_ids = _resolve_tags(db, catalog, tags, match_all_tags)
+    if catalog is not None:
+        # ⚡ Antwort aus dem In-Memory-Katalog, nur Verfügbarkeit wird überlagert
+        available_counts = availability.counts(db)
+        if is_ean_lookup:
+            game = catalog.by_ean.get(filter_text)
+            bits = 1 << catalog.position_by_id[game.id] if game else 0
+        else:
+            bits = catalog.select(
+                availability.bits(catalog, db),
+                filter_text,
+                show_available_only,
+                min_player_count,
+                player_age,
+                show_missing_ean_only,
+                complexities,
+                tag_ids,
+                match_all_tags,
+            )
+        total_games = bits.bit_count()
+
+        if sort != "name":
+            games = catalog.sorted_rows(
+                bits,
+                sort,
+                popularity_counts,
+                0 if cursor else offset,
+                limit,
+                after=cursor,
+            )
+        elif cursor:
+            games = catalog.rows(catalog.bits_after(bits, *cursor), limit=limit)
+        else:
+            games = catalog.rows(bits, offset, limit)
     else:
-        # Normale Filterlogik
-        query = apply_game_filters(
-            query,
+        games, total_games = _query_games_page(
+            db,
+            is_ean_lookup,
+            limit,
+            offset,
+            cursor,
             filter_text,
             show_available_only,
             min_player_count,
             player_age,
             show_missing_ean_only,
             complexities,
+            tag_ids,
+            match_all_tags,
+            sort,
+            popularity_counts,
         )
+        available_counts = {game.id: game.available for game in games}
 
-    total_games = query.count()
-    games = query.offset(offset).limit(limit).all()
+    next_cursor = (
+        encode_cursor(cursor_values(sort, games[-1], popularity_counts))
+        if len(games) == limit
+        else None
+    )
 
     user_familiarity = {}
     if user_id:
@@ -108,37 +374,17 @@ def read_all_games(
         )
         user_familiarity = {uk.game_id: uk.familiarity for uk in user_knowledge}
 
-    game_responses = [
-        GameResponse(
-            id=game.id,
-            bgg_id=game.bgg_id,
-            name=game.name,
-            img_url=game.img_url,
-            available=game.available,
-            quantity=game.quantity,
-            min_players=game.min_players or None,
-            max_players=game.max_players or None,
-            min_playtime=game.min_playtime or None,
-            max_playtime=game.max_playtime or None,
-            ean=game.ean or None,
-            thumbnail_url=game.thumbnail_url or None,
-            player_age=game.player_age or None,
-            complexity=game.complexity or None,
-            complexity_label=game.complexity_label or None,
-            best_playercount=game.best_playercount or None,
-            min_recommended_playercount=game.min_recommended_playercount or None,
-            max_recommended_playercount=game.max_recommended_playercount or None,
-            my_familiarity=user_familiarity.get(game.id),
-            borrows_count=None,
-        )
-        for game in games
-    ]
-
-    return {"games": game_responses, "total": total_games}
+    # ⚡ Vorkodierte JSON-Fragmente statt GameResponse-Objekten + Validierung
+    return json_response(
+        games_page(games, available_counts, total_games, next_cursor, user_familiarity),
+        response,
+    )
 
 
 @router.get("/count")
 def get_games_count(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     filter_text: str = Query(None, description="Filter nach Namen"),
     show_available_only: bool = Query(
@@ -156,10 +402,43 @@ def get_games_count(
             "(z.B. ?complexities=einsteiger&complexities=fortgeschritten)"
         ),
     ),
+    tags: list[str] = Query(
+        None,
+        description=(
+            "Tag-Namen, englisch oder deutsch "
+            "(z.B. ?tags=Strategy&tags=Fantasy)"
+        ),
+    ),
+    tag_mode: str = Query(
+        "all",
+        pattern="^(all|any)$",
+        description="all = Spiel hat alle Tags, any = mindestens einen",
+    ),
 ):
     """
     Gibt die Gesamtanzahl der Spiele basierend auf den aktuellen Filtern zurück.
     """
+    not_modified = conditional_get(request, response, db=db)
+    if not_modified:
+        return not_modified
+
+    catalog = get_catalog(db)
+    match_all_tags = tag_mode == "all"
+    tag_ids = _resolve_tags(db, catalog, tags, match_all_tags)
+    if catalog is not None:
+        bits = catalog.select(
+            availability.bits(catalog, db),
+            filter_text,
+            show_available_only,
+            min_player_count,
+            player_age,
+            show_missing_ean_only,
+            complexities,
+            tag_ids,
+            match_all_tags,
+        )
+        return {"total_count": bits.bit_count()}
+
     query = db.query(Game)
     query = apply_game_filters(
         query,
@@ -169,35 +448,312 @@ def get_games_count(
         player_age,
         show_missing_ean_only,
         complexities,
+        tag_ids,
+        match_all_tags,
+    )
+    cache_key = filter_cache_key(
+        False,
+        filter_text,
+        show_available_only,
+        min_player_count,
+        player_age,
+        show_missing_ean_only,
+        complexities,
+        tag_ids,
+        match_all_tags,
     )
-    total_count = query.count()
+    total_count = total_count_cache.get_or_compute(cache_key, query.count)
 
     return {"total_count": total_count}
 
 
+@router.get("/facets", response_model=GameFacetsResponse)
+def get_game_facets(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    filter_text: str = Query(None, description="Filter nach Namen"),
+    show_available_only: bool = Query(
+        False, description="Nur verfügbare Spiele anzeigen"
+    ),
+    min_player_count: int = Query(0, ge=0, description="Minimale Spieleranzahl"),
+    player_age: int = Query(0, ge=0, description="Minimales Alter der Spieler"),
+    show_missing_ean_only: bool = Query(
+        False, description="Nur Spiele ohne ean anzeigen"
+    ),
+    complexities: list[str] = Query(
+        None,
+        description=(
+            "Liste von Complexity-Labels "
+            "(z.B. ?complexities=einsteiger&complexities=fortgeschritten)"
+        ),
+    ),
+    tags: list[str] = Query(
+        None,
+        description=(
+            "Tag-Namen, englisch oder deutsch "
+            "(z.B. ?tags=Strategy&tags=Fantasy)"
+        ),
+    ),
+    tag_mode: str = Query(
+        "all",
+        pattern="^(all|any)$",
+        description="all = Spiel hat alle Tags, any = mindestens einen",
+    ),
+    max_player_count: int = Query(
+        10, ge=1, le=30, description="Spieleranzahlen 1..N, für die gezählt wird"
+    ),
+):
+    """
+    Liefert in einem Durchlauf die Trefferzahlen für alle Filter-Facetten
+    (Complexity-Labels, Spieleranzahl 1..N, verfügbar, ohne EAN).
+    Tags gelten wie Name und Alter immer, sie sind keine eigene Facette.
+
+    Jede Facette wird mit allen aktiven Filtern außer ihrem eigenen gezählt,
+    `total` entspricht `/games/count` mit denselben Filtern.
+    """
+    not_modified = conditional_get(request, response, db=db)
+    if not_modified:
+        return not_modified
+
+    catalog = get_catalog(db)
+    match_all_tags = tag_mode == "all"
+    tag_ids = _resolve_tags(db, catalog, tags, match_all_tags)
+    filters = (
+        filter_text,
+        show_available_only,
+        min_player_count,
+        player_age,
+        show_missing_ean_only,
+        complexities,
+        tag_ids,
+        match_all_tags,
+    )
+
+    if catalog is not None:
+        return compute_facets_from_catalog(
+            catalog, availability.bits(catalog, db), max_player_count, *filters
+        )
+
+    return compute_facets_sql(db, max_player_count, *filters)
+
+
+@router.get("/suggest", response_model=List[GameSuggestionResponse])
+def suggest_games(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    player_count: int = Query(..., ge=1, description="Anzahl der Mitspielenden"),
+    time_budget: int = Query(
+        None, ge=1, description="Verfügbare Zeit in Minuten (harte Grenze)"
+    ),
+    player_age: int = Query(
+        0, ge=0, description="Alter der jüngsten Person (0 = egal)"
+    ),
+    complexities: list[str] = Query(
+        None,
+        description=(
+            "Bevorzugte Complexity-Labels "
+            "(z.B. ?complexities=Family&complexities=Beginner)"
+        ),
+    ),
+    tags: list[str] = Query(
+        None,
+        description=(
+            "Bevorzugte Tags, englisch oder deutsch "
+            "(z.B. ?tags=Co-op&tags=Kooperativ), gewichtet nach Tag-Priorität"
+        ),
+    ),
+    show_available_only: bool = Query(True, description="Nur verfügbare Spiele"),
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Rangliste "Was können wir jetzt spielen?" über den ganzen Katalog.
+
+    Spieleranzahl, Zeitbudget und Alter sind harte Grenzen; bewertet werden
+    Passung zur besten/empfohlenen Spieleranzahl, Ausnutzung des Zeitbudgets,
+    Complexity- und Tag-Wünsche, Rating und (falls nicht gefiltert) Verfügbarkeit.
+    """
+    not_modified = conditional_get(request, response, db=db)
+    if not_modified:
+        return not_modified
+
+    # Ohne Snapshot (Debugging) wird er für diese Anfrage einmalig geladen
+    catalog = get_catalog(db) or load_catalog_snapshot(db)
+    available_counts = availability.counts(db)
+
+    candidates = catalog.bitmaps.player_count(player_count)
+    if show_available_only:
+        candidates &= availability.bits(catalog, db)
+
+    tag_ids = resolve_tag_ids(tags, catalog.tag_lookup, match_all_tags=False)
+    suggestions = get_suggestion_index(catalog).suggest(
+        candidates,
+        player_count,
+        time_budget=time_budget,
+        player_age=player_age,
+        complexity_bits=(
+            catalog.bitmaps.complexities(complexities) if complexities else None
+        ),
+        tag_weights=tag_weights(tag_ids or [], catalog.tag_priorities),
+        available_counts=None if show_available_only else available_counts,
+        limit=limit,
+    )
+
+    games = catalog.games
+    return json_response(
+        b"[%s]"
+        % b",".join(
+            b'{"score":%s,"game":%s}'
+            % (
+                orjson.dumps(round(score, 4)),
+                game_fragments.game_json(
+                    games[position],
+                    available_counts.get(games[position].id, 0),
+                ),
+            )
+            for score, position in suggestions
+        ),
+        response,
+    )
+
+
+@router.get("/changes", response_model=GameChangesResponse)
+def get_game_changes(
+    db: Session = Depends(get_db),
+    since: int = Query(
+        0, ge=0, description="Zuletzt synchronisierte Revision (0 = alles)"
+    ),
+    limit: int = Query(500, ge=1, le=2000),
+    after: Optional[str] = Query(
+        None, description="Cursor aus `next_cursor` der vorherigen Seite"
+    ),
+):
+    """
+    Delta-Synchronisation für Offline-Kopien des Katalogs.
+
+    Liefert alle seit `since` geänderten Spiele (inkl. Tags und ähnlicher Spiele)
+    und die IDs gelöschter Spiele. `revision` ist beim nächsten Aufruf als
+    `since` zu übergeben, sobald kein `next_cursor` mehr kommt.
+    Die Verfügbarkeit ist nicht Teil des Journals (siehe `/games/`).
+    """
+    # Zuerst lesen: später committete Zeilen kommen beim nächsten Sync erneut
+    revision = current_revision(db)
+
+    query = (
+        db.query(Game)
+        .options(
+            undefer_group("details"),
+            selectinload(Game.tags),
+            selectinload(Game.similar_games),
+        )
+        .order_by(asc(Game.revision), asc(Game.id))
+    )
+    if since:
+        query = query.filter(Game.revision > since)
+    if after:
+        query = apply_keyset(
+            query, (Game.revision, Game.id), decode_cursor(after, expected_length=2)
+        )
+    games = query.limit(limit).all()
+
+    deleted = []
+    if since and not after:
+        deleted = [
+            game_id
+            for (game_id,) in db.query(GameTombstone.game_id)
+            .filter(
+                GameTombstone.revision > since,
+                ~exists().where(Game.id == GameTombstone.game_id),
+            )
+            .distinct()
+        ]
+
+    return {
+        "revision": revision,
+        "games": [
+            {
+                **{column: getattr(game, column) for column in CHANGE_COLUMNS},
+                "tags": game.tags,
+                "similar_games": [
+                    similarity.similar_game_id
+                    for similarity in sorted(
+                        game.similar_games,
+                        key=lambda sim: (-sim.similarity_score, sim.similar_game_id),
+                    )[:6]
+                ],
+            }
+            for game in games
+        ],
+        "deleted": deleted,
+        "next_cursor": (
+            encode_cursor((games[-1].revision, games[-1].id))
+            if len(games) == limit
+            else None
+        ),
+    }
+
+
+@router.get("/export")
+def export_games(
+    export_format: str = Query(
+        "ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson | csv"
+    ),
+):
+    """
+    Streamt den kompletten Katalog (z. B. für Regal-Etiketten oder den Kiosk).
+
+    Die Zeilen werden per serverseitigem Cursor gelesen und sofort gesendet,
+    der Speicherbedarf ist unabhängig von der Katalog-Größe.
+    """
+    if export_format == "csv":
+        body, media_type = export_csv(), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export_ndjson(), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="games.{export_format}"'
+        },
+    )
+
+
 @router.get("/game/{game_id}", response_model=GameResponseWithDetails)
 def read_game(
     game_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     edit_tokens: Optional[list[str]] = Query(None),
     expire_after_minutes: int = Query(15, ge=1),
 ):
-    # Spiel abrufen, mit den zugehörigen Tags, ähnlichen Spielen und PlayerSearches
-    game = (
-        db.query(Game)
-        .options(
-            joinedload(Game.tags),
-            joinedload(Game.similar_games),
-            joinedload(Game.player_searches),  # PlayerSearches direkt laden
-        )
-        .filter(Game.id == game_id)
-        .first()
+    # Gesuche laufen minutenweise ab (is_valid) → Minute gehört mit ins ETag,
+    # ebenso der Seed für die Reihenfolge der ähnlichen Spiele
+    minute = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    not_modified = conditional_get(
+        request,
+        response,
+        partial(catalog_version.of_game, game_id),
+        minute.isoformat(),
+        similar_seed(game_id),
+        db=db,
     )
+    if not_modified:
+        return not_modified
 
-    if not game:
+    # Dynamischer Teil 1: Verfügbarkeit + Revision (Primärschlüssel-Zugriff)
+    row = (
+        db.query(Game.available, Game.revision).filter(Game.id == game_id).first()
+    )
+    if not row:
         create_error(status_code=404, error_code="NO_GAMES_AVAILABLE")
 
-    top_similar_ids = get_top_similar_game_ids(game.similar_games)
+    # Statischer Teil (Tags, Beschreibung, Similarities) aus dem Cache
+    detail = game_details.get(db, game_id, row.revision or 0)
+    if detail is None:
+        create_error(status_code=404, error_code="NO_GAMES_AVAILABLE")
 
     # Heutiges Datum berechnen
     now = datetime.now(timezone.utc)
@@ -205,31 +761,24 @@ def read_game(
     today_end = today_start + timedelta(days=1)
     valid_after = now - timedelta(minutes=expire_after_minutes)
 
-    # PlayerSearches filtern (heute + noch gültig)
-    filtered_player_searches = [
-        search
-        for search in game.player_searches
-        if (search.game_id == game_id and today_start <= search.created_at < today_end)
-    ]
+    # Dynamischer Teil 2: nur die heutigen PlayerSearches (Index game_id, created_at)
+    todays_searches = (
+        db.query(PlayerSearch)
+        .filter(
+            PlayerSearch.game_id == game_id,
+            PlayerSearch.created_at >= today_start,
+            PlayerSearch.created_at < today_end,
+        )
+        .order_by(PlayerSearch.id)
+        .all()
+    )
 
-    # Berechnen der `can_edit`-Flags für jedes gefilterte Gesuch
-    if edit_tokens:
-        for search in filtered_player_searches:
-            search.can_edit = search.edit_token in edit_tokens
-    else:
-        for search in filtered_player_searches:
-            search.can_edit = False
-
-    # Rückgabe der Antwort, einschließlich aller erforderlichen Felder
-    return GameResponseWithDetails(
-        id=game.id,
-        bgg_id=game.bgg_id,
-        name=game.name,
-        description=game.description or None,
-        german_description=game.german_description or None,
-        tags=game.tags,
-        similar_games=top_similar_ids,
-        player_searches=[
+    # `can_edit` nur für Gesuche, deren Token der Client mitschickt
+    edit_tokens = set(edit_tokens or ())
+    player_searches = []
+    for search in todays_searches:
+        can_edit = search.edit_token in edit_tokens
+        player_searches.append(
             PlayerSearchResponse(
                 id=search.id,
                 game_id=search.game_id,
@@ -240,38 +789,28 @@ def read_game(
                 details=search.details or None,
                 created_at=search.created_at,
                 is_valid=search.created_at >= valid_after,
-                can_edit=search.can_edit,
-                edit_token=search.edit_token if search.can_edit else None,
-            )
-            for search in filtered_player_searches
-        ],
-        year_published=game.year_published or None,
-        min_players=game.min_players or None,
-        max_players=game.max_players or None,
-        min_playtime=game.min_playtime or None,
-        max_playtime=game.max_playtime or None,
-        playing_time=game.playing_time or None,
-        rating=game.rating or None,
-        ean=game.ean or None,
-        available=game.available,
-        borrows_count=None,
-        quantity=game.quantity,
-        acquired_from=game.acquired_from or None,
-        inventory_location=game.inventory_location or None,
-        private_comment=game.private_comment or None,
-        img_url=game.img_url or None,
-        thumbnail_url=game.thumbnail_url or None,
-        player_age=game.player_age or None,
-        complexity=game.complexity or None,
-        complexity_label=game.complexity_label or None,
-        best_playercount=game.best_playercount or None,
-        min_recommended_playercount=game.min_recommended_playercount or None,
-        max_recommended_playercount=game.max_recommended_playercount or None,
+                can_edit=can_edit,
+                edit_token=search.edit_token if can_edit else None,
+            ).model_dump(mode="json")
+        )
+
+    return json_response(
+        detail.fragment
+        + b',"available":%d,"borrows_count":null,"similar_games":%s,'
+        b'"player_searches":%s}'
+        % (
+            row.available or 0,
+            orjson.dumps(top_similar_ids(detail, similar_seed(game_id))),
+            orjson.dumps(player_searches),
+        ),
+        response,
     )
 
 
 @router.get("/search", response_model=List[GameSearchResponse])
 def search_games(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     query: str = Query("", min_length=0),
     limit: int = Query(10, ge=1, le=20),
@@ -279,18 +818,42 @@ def search_games(
     """
     Lightweight-Suche für Autocomplete / Spielauswahl bei Mitspielersuche.
     - Wenn query leer ist: alphabetische Spiele (erste X)
-    - Wenn query gesetzt: case-insensitive Suche im Namen
+    - Wenn query gesetzt: indexgestützte Suche im Namen, nach Relevanz sortiert
+      (Namensanfang > Wortanfang > Teilstring > Tippfehler); Umlaute/ß werden
+      gefaltet, sobald der Autocomplete-Index aufgebaut ist
     """
 
-    base_query = db.query(Game)
-
-    # 🔍 Wenn Suchbegriff vorhanden → filtern
-    if query.strip():
-        search_term = f"%{query.lower()}%"
-        base_query = base_query.filter(func.lower(Game.name).like(search_term))
-
-    # 📦 Nur benötigte Felder laden
-    games = base_query.order_by(asc(Game.name)).limit(limit).all()
+    not_modified = conditional_get(request, response, db=db)
+    if not_modified:
+        return not_modified
+
+    search_text = query.strip()
+
+    catalog = get_catalog(db)
+    index = get_autocomplete_index(catalog) if catalog is not None else None
+    # Titel ohne lateinische Buchstaben/Ziffern (z. B. japanische Ausgaben)
+    # bleiben nach `fold()` leer → dann per Teilstring im Katalog
+    if index is not None and fold(search_text):
+        # ⚡ Tippfehlertolerant über den Autocomplete-Index (Katan → Catan)
+        games = index.search(search_text, limit)
+    elif catalog is not None:
+        # ⚡ Direkt aus dem In-Memory-Katalog (Index noch nicht aufgebaut)
+        if search_text:
+            games = catalog.search(search_text, limit)
+        else:
+            games = catalog.games[:limit]
+    elif search_text:
+        # 🔍 Wenn Suchbegriff vorhanden → über das Such-Backend filtern und ranken
+        base_query = db.query(Game).options(project(GameSearchResponse))
+        games = get_search_backend(db).search(base_query, search_text, limit).all()
+    else:
+        games = (
+            db.query(Game)
+            .options(project(GameSearchResponse))
+            .order_by(asc(Game.sort_key), asc(Game.id))
+            .limit(limit)
+            .all()
+        )
 
     return [
         GameSearchResponse(
@@ -321,6 +884,7 @@ def read_borrowed_games(
     # Query: Spieldaten + Summe der Borrows
     borrowed_query = (
         db.query(Game, func.sum(GameBorrow.count).label("total_borrows"))
+        .options(project(GameResponse))
         .join(GameBorrow, Game.id == GameBorrow.game_id)
         .filter(GameBorrow.event_id == event.id)
         .group_by(Game.id)
@@ -366,155 +930,237 @@ def read_borrowed_games(
     return GamesWithCountResponse(games=games, total=total_borrows)
 
 
+@router.get("/borrow-stats/hourly", response_model=List[BorrowHourResponse])
+def read_hourly_borrow_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("helper")),
+    year: Optional[int] = Query(None),
+):
+    """Ausleihen/Rückgaben je Stunde (UTC) aus dem Journal-Rollup."""
+    event = get_current_event(db, year)
+    return [row._mapping for row in hourly_stats(db, event.id)]
+
+
+@router.get("/borrow-stats/games", response_model=List[BorrowGameStatsResponse])
+def read_game_borrow_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("helper")),
+    limit: int = Query(20, ge=1, le=500),
+    year: Optional[int] = Query(None),
+):
+    """Meistgeliehene Spiele mit offenen Ausleihen und mittlerer Ausleihdauer."""
+    event = get_current_event(db, year)
+    return game_stats(db, event.id, limit)
+
+
+@router.get(
+    "/game/{game_id}/ledger", response_model=List[BorrowLedgerEntryResponse]
+)
+def read_game_ledger(
+    game_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("helper")),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Letzte Journaleinträge eines Spiels, neueste zuerst."""
+    return ledger_entries(db, game_id, limit)
+
+
 @router.post("/by-ids", response_model=List[GameResponse])
 def read_games_by_ids(game_ids: List[int], db: Session = Depends(get_db)):
-    games = (
-        db.query(Game)
-        .options(joinedload(Game.tags))
-        .filter(Game.id.in_(game_ids))
-        .all()
-    )
+    catalog = get_catalog(db)
+    if catalog is not None:
+        games = [
+            catalog.by_id[game_id]
+            for game_id in dict.fromkeys(game_ids)
+            if game_id in catalog.by_id
+        ]
+        available_counts = availability.counts(db)
+    else:
+        games = (
+            db.query(Game)
+            .options(project(GameResponse, Game.revision))
+            .filter(Game.id.in_(game_ids))
+            .all()
+        )
+        # Reihenfolge wie angefragt (wie beim Katalog-Pfad)
+        requested_order = {game_id: i for i, game_id in enumerate(game_ids)}
+        games.sort(key=lambda game: requested_order[game.id])
+        available_counts = {game.id: game.available for game in games}
+
     if not games:
         create_error(status_code=404, error_code="NO_GAMES_AVAILABLE")
 
-    # Mapping auf Pydantic-Model
-    game_responses = [
-        GameResponse(
-            id=game.id,
-            bgg_id=game.bgg_id,
-            name=game.name,
-            img_url=game.img_url,
-            available=game.available,
-            quantity=game.quantity,
-            min_players=game.min_players or None,
-            max_players=game.max_players or None,
-            min_playtime=game.min_playtime or None,
-            max_playtime=game.max_playtime or None,
-            ean=game.ean or None,
-            thumbnail_url=game.thumbnail_url or None,
-            player_age=game.player_age or None,
-            complexity=game.complexity or None,
-            complexity_label=game.complexity_label or None,
-            best_playercount=game.best_playercount or None,
-            min_recommended_playercount=game.min_recommended_playercount or None,
-            max_recommended_playercount=game.max_recommended_playercount or None,
-            my_familiarity=None,
-            borrows_count=None,
-        )
-        for game in games
-    ]
-
-    return game_responses
+    return json_response(games_array(games, available_counts))
 
 
 @router.get("/game/by_ean/{ean}", response_model=GameResponse)
-def read_game_by_ean(ean: str, db: Session = Depends(get_db)):
-    game = db.query(Game).options(joinedload(Game.tags)).filter(Game.ean == ean).first()
+def read_game_by_ean(
+    ean: str, request: Request, response: Response, db: Session = Depends(get_db)
+):
+    not_modified = conditional_get(request, response, db=db)
+    if not_modified:
+        return not_modified
+
+    game = db.query(Game).options(project(GameResponse)).filter(Game.ean == ean).first()
     if not game:
         create_error(status_code=404, error_code="GAME_NOT_FOUND")
     return game
 
 
-@router.put("/game/borrow/{game_id}")
-def borrow_game(
-    game_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role("helper")),
-    force_event: bool = Query(
-        False, description="Borrowings auch außerhalb des Events zählen"
-    ),
+def _view_query(default: str):
+    # Default bleibt überall `full`: bestehende Clients der EAN-Endpunkte
+    # erwarten die volle Antwort, die Scanner-App fragt `view=lean` explizit an
+    return Query(
+        default,
+        pattern="^(full|lean)$",
+        description="lean: nur id, name, thumbnail_url, available, quantity, "
+        "action und borrow_count – von der Scanner-App zu senden",
+    )
+
+
+def _idempotency_header():
+    return Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Wiederholte Anfragen mit demselben Key liefern die erste "
+        "Antwort, ohne erneut zu verleihen/zurückzunehmen",
+    )
+
+
+def _idempotent(
+    db: Session, request: Request, user: User, key: Optional[str], handler, body=b""
 ):
-    # 1. Datensatz mit Row-Level-Lock laden
-    game = db.query(Game).filter(Game.id == game_id).with_for_update().first()
-    if game is None:
-        create_error(status_code=404, error_code="GAME_NOT_FOUND")
+    """Führt `handler()` je (Benutzer, Idempotency-Key) höchstens einmal aus."""
+    if key is None:
+        return handler()
+    user_id = user.id
+    fingerprint = request_fingerprint(request, body)
+    replay = idempotency.begin(db, user_id, key, fingerprint)
+    if replay is not None:
+        return replay
+    return idempotency.finish(db, handler())
+
+
+def _commit_with_response(db: Session, content) -> None:
+    """Commit der Handler: Antwort zum Idempotency-Key in derselben Transaktion."""
+    idempotency.store(db, content)
+    db.commit()
 
-    if game.available <= 0:
+
+def _lending_response(
+    db: Session, row, borrow_count: int, view: str = "full", action=None
+) -> dict:
+    """
+    Antwort der Ausleih-Endpunkte: Spalten aus RETURNING, Tags und ähnliche
+    Spiele aus dem Detail-Cache (kein erneutes Laden mit selectinload).
+    `view=lean` kommt ganz ohne weitere Abfrage aus.
+    """
+    if view == "lean":
+        return {
+            "id": row.id,
+            "name": row.name,
+            "thumbnail_url": row.thumbnail_url,
+            "available": row.available,
+            "quantity": row.quantity,
+            "action": action,
+            "borrow_count": borrow_count,
+        }
+
+    detail = game_details.get(db, row.id, row.revision or 0)
+    return {
+        **{field: getattr(row, field) for field in LENDING_FIELDS},
+        "tags": detail.tags if detail else [],
+        "similar_games": detail.similar_ids if detail else [],
+        "borrow_count": borrow_count,  # Event-spezifisch
+    }
+
+
+def _lend(db: Session, condition, force_event: bool, user: User, view: str) -> dict:
+    """Verleiht ein Exemplar und zählt die Ausleihe fürs Event (eine Transaktion)."""
+    # 1. Bedingtes UPDATE ... RETURNING ersetzt SELECT FOR UPDATE + refresh
+    row = take_copy(db, condition, lending_fields(view))
+    if row is None:
+        db.rollback()
+        if load_game_row(db, condition, ("id",)) is None:
+            create_error(status_code=404, error_code="GAME_NOT_FOUND")
         create_error(status_code=400, error_code="NO_COPIES_AVAILABLE")
 
-    # 2. Verfügbarkeit verringern
-    game.available -= 1
+    # 2. Upsert auf (event_id, game_id) bzw. Write-behind (utils/borrow_counter.py)
+    event = get_current_event(db)
+    counted = is_event_active(event) or force_event
+    if counted:
+        count = record_borrows(db, event.id, {row.id: 1})[row.id]
+    else:
+        # Event nicht aktiv → borrow_count fürs Event nicht ändern
+        count = read_borrow_counts(db, event.id, [row.id]).get(row.id, 0)
+    # 3. Journal + Rollups (utils/ledger.py), unabhängig vom Event-Status
+    record_lending(db, event.id, user.id, [(row.id, "borrow")])
+    content = _lending_response(db, row, count, view, "borrow")
+    _commit_with_response(db, content)
+
+    _after_lending(row)
+    if counted:
+        popularity.set(event.id, row.id, count)
+    return content
+
+
+def _give_back(db: Session, condition, user: User, view: str) -> dict:
+    """Nimmt ein Exemplar zurück (Borrow-Zähler bleibt unverändert)."""
+    row = return_copy(db, condition, lending_fields(view))
+    if row is None:
+        db.rollback()
+        if load_game_row(db, condition, ("id",)) is None:
+            create_error(status_code=404, error_code="GAME_NOT_FOUND")
+        create_error(status_code=400, error_code="ALL_COPIES_AVAILABLE")
 
-    # 3. Event-spezifisch Borrowings erhöhen
     event = get_current_event(db)
-    borrow = db.query(GameBorrow).filter_by(game_id=game.id, event_id=event.id).first()
+    count = read_borrow_counts(db, event.id, [row.id]).get(row.id, 0)
+    record_lending(db, event.id, user.id, [(row.id, "return")])
+    content = _lending_response(db, row, count, view, "return")
+    _commit_with_response(db, content)
 
-    if is_event_active(event) or force_event:
-        if borrow:
-            borrow.count += 1
-        else:
-            borrow = GameBorrow(game_id=game.id, event_id=event.id, count=1)
-            db.add(borrow)
+    _after_lending(row)
+    return content
 
-    # Falls kein Event aktiv und force_event=False, borrow bleibt ggf. None
-    db.commit()
-    db.refresh(game)
-    if borrow:
-        db.refresh(borrow)
 
-    # 4. Beziehungen separat nachladen
-    game = (
-        db.query(Game)
-        .options(selectinload(Game.similar_games), selectinload(Game.tags))
-        .filter(Game.id == game_id)
-        .first()
-    )
+def _after_lending(row) -> None:
+    total_count_cache.clear()
+    availability.set(row.id, row.available)
 
-    # 5. Response zusammenbauen – sicher mit borrow_count
-    borrow_count = borrow.count if borrow else 0
 
-    return {
-        **game.__dict__,
-        "tags": game.tags,
-        "similar_games": (
-            [sg.similar_game_id for sg in game.similar_games]
-            if game.similar_games
-            else []
-        ),
-        "borrow_count": borrow_count,
-    }
+@router.put("/game/borrow/{game_id}")
+def borrow_game(
+    game_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("helper")),
+    force_event: bool = Query(
+        False, description="Borrowings auch außerhalb des Events zählen"
+    ),
+    view: str = _view_query("full"),
+    idempotency_key: Optional[str] = _idempotency_header(),
+):
+    def handler():
+        return _lend(db, Game.id == game_id, force_event, current_user, view)
+
+    return _idempotent(db, request, current_user, idempotency_key, handler)
 
 
 @router.put("/game/return/{game_id}")
 def return_game(
     game_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("helper")),
+    view: str = _view_query("full"),
+    idempotency_key: Optional[str] = _idempotency_header(),
 ):
-    # Row-Level-Lock setzen ohne joinedload
-    game = db.query(Game).filter(Game.id == game_id).with_for_update().first()
-    if game is None:
-        create_error(status_code=404, error_code="GAME_NOT_FOUND")
+    def handler():
+        return _give_back(db, Game.id == game_id, current_user, view)
 
-    if game.available >= game.quantity:
-        create_error(status_code=400, error_code="ALL_COPIES_AVAILABLE")
-
-    game.available += 1
-    db.commit()
-    db.refresh(game)
-
-    # Beziehungen separat nachladen
-    game = (
-        db.query(Game)
-        .options(selectinload(Game.similar_games), selectinload(Game.tags))
-        .filter(Game.id == game_id)
-        .first()
-    )
-
-    # Borrow-count für Event abrufen (nicht ändern)
-    event = get_current_event(db)
-    borrow = db.query(GameBorrow).filter_by(game_id=game.id, event_id=event.id).first()
-
-    return {
-        **game.__dict__,
-        "tags": game.tags,
-        "similar_games": (
-            [sg.similar_game_id for sg in game.similar_games]
-            if game.similar_games
-            else []
-        ),
-        "borrow_count": borrow.count if borrow else 0,
-    }
+    return _idempotent(db, request, current_user, idempotency_key, handler)
 
 
 @router.put("/game/add_ean/{game_id}")
@@ -542,7 +1188,10 @@ def add_ean(
         )
     game.ean = request.ean
     db.commit()
-    db.refresh(game)
+    total_count_cache.clear()
+    refresh_all_columns(db, game)
+    # Nur diese Zeile im Snapshot ersetzen statt Komplett-Neuaufbau
+    update_catalog_ean(game.id, game.ean, game.revision)
 
     return game
 
@@ -559,7 +1208,10 @@ def remove_ean(
 
     game.ean = None
     db.commit()
-    db.refresh(game)
+    total_count_cache.clear()
+    refresh_all_columns(db, game)
+    # Nur diese Zeile im Snapshot ersetzen statt Komplett-Neuaufbau
+    update_catalog_ean(game.id, game.ean, game.revision)
 
     return game
 
@@ -567,195 +1219,341 @@ def remove_ean(
 @router.put("/game/borrow_by_ean/{game_ean}")
 def borrow_game_ean(
     game_ean: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("helper")),
     force_event: bool = Query(
         False, description="Borrowings auch außerhalb des Events zählen"
     ),
+    view: str = _view_query("full"),
+    idempotency_key: Optional[str] = _idempotency_header(),
 ):
-    # 1️⃣ Row-Level-Lock auf das Game via EAN
-    game = db.query(Game).filter(Game.ean == game_ean).with_for_update().first()
-    if game is None:
-        create_error(status_code=404, error_code="GAME_NOT_FOUND")
-
-    if game.available <= 0:
-        create_error(status_code=400, error_code="NO_COPIES_AVAILABLE")
+    def handler():
+        return _lend(db, Game.ean == game_ean, force_event, current_user, view)
 
-    # 2️⃣ Verfügbarkeit verringern
-    game.available -= 1
-
-    # 3️⃣ Borrowings für das Event des aktuellen Jahres
-    event = get_current_event(db)
-    borrow = db.query(GameBorrow).filter_by(game_id=game.id, event_id=event.id).first()
-
-    if is_event_active(event) or force_event:
-        if borrow:
-            borrow.count += 1
-        else:
-            borrow = GameBorrow(game_id=game.id, event_id=event.id, count=1)
-            db.add(borrow)
-
-    # Event nicht aktiv → borrow_count fürs Event nicht ändern
-    db.commit()
-    db.refresh(game)
-    if borrow:
-        db.refresh(borrow)
-
-    # 4️⃣ Beziehungen separat nachladen
-    game = (
-        db.query(Game)
-        .options(selectinload(Game.similar_games), selectinload(Game.tags))
-        .filter(Game.ean == game_ean)
-        .first()
-    )
-
-    # 5️⃣ Response sicher zusammenbauen
-    borrow_count = borrow.count if borrow else 0
-
-    return {
-        **game.__dict__,
-        "tags": game.tags,
-        "similar_games": (
-            [sg.similar_game_id for sg in game.similar_games]
-            if game.similar_games
-            else []
-        ),
-        "borrow_count": borrow_count,  # Event-spezifisch
-    }
+    return _idempotent(db, request, current_user, idempotency_key, handler)
 
 
 @router.put("/game/return_by_ean/{game_ean}")
 def return_game_ean(
     game_ean: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("helper")),
+    view: str = _view_query("full"),
+    idempotency_key: Optional[str] = _idempotency_header(),
 ):
-    # 1️⃣ Row-Level-Lock auf das Game via EAN
-    game = db.query(Game).filter(Game.ean == game_ean).with_for_update().first()
-    if game is None:
-        create_error(status_code=404, error_code="GAME_NOT_FOUND")
-
-    if game.available >= game.quantity:
-        create_error(status_code=400, error_code="ALL_COPIES_AVAILABLE")
-
-    # 2️⃣ Verfügbarkeit erhöhen
-    game.available += 1
-    db.commit()
-    db.refresh(game)
+    def handler():
+        return _give_back(db, Game.ean == game_ean, current_user, view)
 
-    # 3️⃣ Borrowings für Event abrufen (nicht ändern)
-    event = get_current_event(db)
-    borrow = db.query(GameBorrow).filter_by(game_id=game.id, event_id=event.id).first()
-
-    # 4️⃣ Beziehungen separat nachladen
-    game = (
-        db.query(Game)
-        .options(selectinload(Game.similar_games), selectinload(Game.tags))
-        .filter(Game.ean == game_ean)
-        .first()
-    )
-
-    return {
-        **game.__dict__,
-        "tags": game.tags,
-        "similar_games": (
-            [sg.similar_game_id for sg in game.similar_games]
-            if game.similar_games
-            else []
-        ),
-        "borrow_count": borrow.count if borrow else 0,  # Event-spezifisch
-    }
+    return _idempotent(db, request, current_user, idempotency_key, handler)
 
 
 @router.put("/game/scan_by_ean/{game_ean}")
 def scan_game_by_ean(
     game_ean: str,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(require_role("helper")),
     force_event: bool = Query(
         False, description="Borrowings auch außerhalb des Events zählen"
     ),
+    view: str = _view_query("full"),
+    idempotency_key: Optional[str] = _idempotency_header(),
 ):
-    # 1️⃣ Row-Level-Lock auf das Game via EAN
-    game = db.query(Game).filter(Game.ean == game_ean).with_for_update().first()
-
-    if game is None:
-        create_error(status_code=404, error_code="GAME_NOT_FOUND")
-
-    event = get_current_event(db)
-
-    borrow = db.query(GameBorrow).filter_by(game_id=game.id, event_id=event.id).first()
-
-    action = "inconclusive"
-
-    # ----------------------------
-    # BORROW (alle verfügbar)
-    # ----------------------------
-    if game.available == game.quantity:
-
-        if game.available <= 0:
-            create_error(status_code=400, error_code="NO_COPIES_AVAILABLE")
-
-        game.available -= 1
+    def handler():
+        condition = Game.ean == game_ean
+
+        # Alle Exemplare da → Ausleihe, keins da → Rückgabe, sonst unklar
+        action, row = scan_copy(db, condition, lending_fields(view))
+        if row is None:
+            db.rollback()
+            row = load_game_row(db, condition, lending_fields(view))
+            if row is None:
+                create_error(status_code=404, error_code="GAME_NOT_FOUND")
+            if row.available == row.quantity:
+                # quantity 0: nichts zu verleihen
+                create_error(status_code=400, error_code="NO_COPIES_AVAILABLE")
+
+        event = get_current_event(db)
+        counted = action == "borrow" and (is_event_active(event) or force_event)
+        if counted:
+            count = record_borrows(db, event.id, {row.id: 1})[row.id]
+        else:
+            count = read_borrow_counts(db, event.id, [row.id]).get(row.id, 0)
+
+        content = {"action": action, **_lending_response(db, row, count, view, action)}
+        if action != "inconclusive":
+            record_lending(db, event.id, current_user.id, [(row.id, action)])
+            _commit_with_response(db, content)
+            _after_lending(row)
+            if counted:
+                popularity.set(event.id, row.id, count)
+        return content
+
+    return _idempotent(db, request, current_user, idempotency_key, handler)
+
+
+def _commit_stock_changes(
+    db: Session,
+    event: EventWindow,
+    user: User,
+    game_ids: Iterable[int],
+    available: Dict[int, int],
+    deltas: Dict[int, int],
+    counted_borrows: Dict[int, int],
+    entries: List[tuple],
+    respond: Callable[[Dict[int, int]], dict],
+) -> dict:
+    """
+    Abschluss der Stapel-Endpunkte in einer Transaktion: `available`
+    (executemany), Ausleihzähler (ein Upsert), Journal und die Antwort
+    `respond(Ausleihzähler aller game_ids)`, danach die Caches.
+    """
+    change_available_many(db, deltas)
+    counts = record_borrows(db, event.id, counted_borrows) if counted_borrows else {}
+    # Zähler der übrigen Spiele (Rückgaben, Fehlschläge) nur lesen
+    counts.update(read_borrow_counts(db, event.id, set(game_ids) - counts.keys()))
+    record_lending(db, event.id, user.id, entries)
+    content = respond(counts)
+    _commit_with_response(db, content)
+
+    if any(deltas.values()):
+        total_count_cache.clear()
+        for game_id, delta in deltas.items():
+            if delta:
+                availability.set(game_id, available[game_id])
+    for game_id in counted_borrows:
+        popularity.set(event.id, game_id, counts[game_id])
+    return content
+
+
+@router.post("/scan_batch", response_model=ScanBatchResponse)
+def scan_batch(
+    batch: ScanBatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("helper")),
+    force_event: bool = Query(
+        False, description="Borrowings auch außerhalb des Events zählen"
+    ),
+    idempotency_key: Optional[str] = _idempotency_header(),
+):
+    """
+    Ganzer Stapel (z. B. Rückgabe zum Feierabend) in einer Transaktion:
+    eine Abfrage für alle EANs, Entscheidung je Scan im Speicher, danach ein
+    executemany für `available` und ein Upsert für die Ausleihzähler.
+    Fehlschläge einzelner Scans brechen den Stapel nicht ab.
+    """
 
-        if is_event_active(event) or force_event:
-            if borrow:
-                borrow.count += 1
-            else:
-                borrow = GameBorrow(
-                    game_id=game.id,
-                    event_id=event.id,
-                    count=1,
+    def handler():
+        rows = lock_games_by_ean(db, {item.ean for item in batch.items})
+
+        # Bestand fortschreiben: dieselbe EAN darf mehrfach im Stapel vorkommen
+        available = {row.id: row.available or 0 for row in rows.values()}
+        deltas: Dict[int, int] = {}
+        borrowed: Dict[int, int] = {}
+        results = []
+        for item in batch.items:
+            row = rows.get(item.ean)
+            if row is None:
+                results.append(
+                    {"ean": item.ean, "action": None, "error_code": "GAME_NOT_FOUND"}
                 )
-                db.add(borrow)
-
-        action = "borrow"
+                continue
 
-    # ----------------------------
-    # RETURN (keine verfügbar)
-    # ----------------------------
-    elif game.available == 0:
-
-        if game.available >= game.quantity:
-            create_error(status_code=400, error_code="ALL_COPIES_AVAILABLE")
+            action, error_code = scan_action(
+                item.action, available[row.id], row.quantity or 0
+            )
+            if action in ("borrow", "return"):
+                delta = -1 if action == "borrow" else 1
+                available[row.id] += delta
+                deltas[row.id] = deltas.get(row.id, 0) + delta
+                if action == "borrow":
+                    borrowed[row.id] = borrowed.get(row.id, 0) + 1
+            results.append(
+                {
+                    "ean": item.ean,
+                    "action": action,
+                    "error_code": error_code,
+                    "game_id": row.id,
+                    "name": row.name,
+                    "thumbnail_url": row.thumbnail_url,
+                    "available": available[row.id],
+                    "quantity": row.quantity,
+                }
+            )
 
-        game.available += 1
+        def respond(counts: Dict[int, int]) -> dict:
+            for result in results:
+                if result["error_code"]:
+                    result["message"] = ERROR_CODES[result["error_code"]]["message"]
+                if "game_id" in result:
+                    result["borrow_count"] = counts.get(result["game_id"], 0)
+            # Über das Modell, damit auch gespeicherte Antworten alle Felder haben
+            return ScanBatchResponse(
+                results=results,
+                borrowed=sum(1 for r in results if r["action"] == "borrow"),
+                returned=sum(1 for r in results if r["action"] == "return"),
+                failed=sum(1 for r in results if r["error_code"]),
+            ).model_dump(mode="json")
+
+        event = get_current_event(db)
+        counted = is_event_active(event) or force_event
+        return _commit_stock_changes(
+            db,
+            event,
+            current_user,
+            {row.id for row in rows.values()},
+            available,
+            deltas,
+            borrowed if counted else {},
+            [
+                (result["game_id"], result["action"])
+                for result in results
+                if result["action"] in ("borrow", "return")
+            ],
+            respond,
+        )
 
-        action = "return"
+    return _idempotent(
+        db,
+        request,
+        current_user,
+        idempotency_key,
+        handler,
+        body=batch.model_dump_json().encode("utf-8"),
+    )
 
-    # ----------------------------
-    # COMMIT nur wenn Änderung
-    # ----------------------------
-    if action != "inconclusive":
-        db.commit()
-        db.refresh(game)
 
-        if borrow:
-            db.refresh(borrow)
+@router.post("/sync_operations", response_model=SyncOperationsResponse)
+def sync_operations(
+    batch: SyncOperationsRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_role("helper")),
+    force_event: bool = Query(
+        False, description="Borrowings auch außerhalb des Events zählen"
+    ),
+    idempotency_key: Optional[str] = _idempotency_header(),
+):
+    """
+    Offline-Warteschlange des Scanners nachspielen: Operationen in der
+    Reihenfolge ihrer Zeitstempel in einer Transaktion anwenden, nicht mehr
+    passende als Konflikt melden. Das Ergebnis jeder op_id wird gespeichert;
+    erneut gesendete Operationen (Antwort eines früheren Syncs verloren)
+    bekommen es wiederholt, auch abgelehnte werden nicht nachträglich angewendet.
+    """
 
-    # ----------------------------
-    # Beziehungen separat nachladen
-    # ----------------------------
-    game = (
-        db.query(Game)
-        .options(
-            selectinload(Game.similar_games),
-            selectinload(Game.tags),
+    def handler():
+        operations = batch.operations
+        now = datetime.now(timezone.utc)
+
+        game_ids = {op.game_id for op in operations if op.game_id is not None}
+        eans = {op.ean for op in operations if op.game_id is None}
+        rows = lock_games(db, or_(Game.id.in_(game_ids), Game.ean.in_(eans)))
+        by_id = {row.id: row for row in rows}
+        by_ean = {row.ean: row for row in rows if row.ean is not None}
+        # Erst nach dem Sperren lesen: ein paralleler Sync derselben Spiele ist
+        # dann committet und seine Ergebnisse sichtbar
+        stored = sync_outcomes(db, current_user.id, {op.op_id for op in operations})
+        latest = latest_entries(db, by_id)
+
+        targets = [
+            by_id.get(op.game_id) if op.game_id is not None else by_ean.get(op.ean)
+            for op in operations
+        ]
+        # Zeitstempel begrenzen: zukünftige (falsch gehende Uhr) auf jetzt,
+        # ältere als der letzte Journaleintrag des Spiels auf diesen – sonst
+        # läge z. B. eine Rückgabe vor der zugehörigen Ausleihe
+        timestamps = []
+        for op, row in zip(operations, targets):
+            timestamp = min(as_utc(op.client_timestamp), now)
+            if row is not None and row.id in latest:
+                timestamp = max(timestamp, latest[row.id])
+            timestamps.append(timestamp)
+
+        event = get_current_event(db)
+        available = {row.id: row.available or 0 for row in rows}
+        deltas: Dict[int, int] = {}
+        counted: Dict[int, int] = {}
+        entries = []
+        outcomes = []
+        results: List[Optional[dict]] = [None] * len(operations)
+        # sorted() ist stabil: gleiche Zeitstempel in Reihenfolge der Warteschlange
+        for index in sorted(range(len(operations)), key=timestamps.__getitem__):
+            op = operations[index]
+            previous = stored.get(op.op_id)
+            if previous is not None:
+                results[index] = {**previous, "op_id": op.op_id, "replayed": True}
+                continue
+            result = results[index] = {"op_id": op.op_id, "status": "conflict"}
+            # Dieselbe op_id weiter hinten in der Warteschlange → Wiederholung
+            stored[op.op_id] = result
+            outcomes.append(result)
+
+            row = targets[index]
+            if row is None:
+                result["error_code"] = "GAME_NOT_FOUND"
+                continue
+            result["game_id"] = row.id
+
+            _, error_code = scan_action(
+                op.action, available[row.id], row.quantity or 0
+            )
+            if error_code:
+                result["error_code"] = error_code
+                continue
+
+            delta = -1 if op.action == "borrow" else 1
+            available[row.id] += delta
+            deltas[row.id] = deltas.get(row.id, 0) + delta
+            # Gezählt wird, wenn das Event zum Zeitpunkt des Scans lief
+            if op.action == "borrow" and (
+                force_event or event.is_active(timestamps[index])
+            ):
+                counted[row.id] = counted.get(row.id, 0) + 1
+            entries.append((row.id, op.action, timestamps[index], op.op_id))
+            result["status"] = "applied"
+
+        record_sync_outcomes(db, current_user.id, outcomes, now)
+        # Gespeicherte Ergebnisse können auf inzwischen gelöschte Spiele zeigen
+        affected = sorted({r["game_id"] for r in results if r.get("game_id") in by_id})
+
+        def respond(counts: Dict[int, int]) -> dict:
+            for result in results:
+                if result.get("error_code"):
+                    result["message"] = ERROR_CODES[result["error_code"]]["message"]
+            return SyncOperationsResponse(
+                results=results,
+                games=[
+                    {
+                        "game_id": game_id,
+                        "available": available[game_id],
+                        "quantity": by_id[game_id].quantity or 0,
+                        "borrow_count": counts.get(game_id, 0),
+                    }
+                    for game_id in affected
+                ],
+            ).model_dump(mode="json")
+
+        return _commit_stock_changes(
+            db,
+            event,
+            current_user,
+            affected,
+            available,
+            deltas,
+            counted,
+            entries,
+            respond,
         )
-        .filter(Game.ean == game_ean)
-        .first()
-    )
-
-    borrow_count = borrow.count if borrow else 0
 
-    return {
-        "action": action,
-        **game.__dict__,
-        "tags": game.tags,
-        "similar_games": (
-            [sg.similar_game_id for sg in game.similar_games]
-            if game.similar_games
-            else []
-        ),
-        "borrow_count": borrow_count,
-    }
+    return _idempotent(
+        db,
+        request,
+        current_user,
+        idempotency_key,
+        handler,
+        body=batch.model_dump_json().encode("utf-8"),
+    )
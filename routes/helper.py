@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session, joinedload
 from database import get_db
 from utils.errors import create_error
+from utils.etag import catalog_version
 from collections import defaultdict
 from models import (
     UserGameKnowledge,
@@ -45,6 +46,7 @@ def update_game_familiarity(
         db.add(record)
 
     db.commit()
+    catalog_version.bump(game_id)  # my_familiarity in den Listen-ETags
     db.refresh(record)  # Das UserGameKnowledge-Objekt wird aktualisiert
 
     # Das Spiel-Objekt ebenfalls aktualisieren
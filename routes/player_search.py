@@ -12,6 +12,7 @@ from models import (
 )
 from database import get_db
 from utils.errors import create_error
+from utils.etag import catalog_version
 from fastapi import Query
 
 router = APIRouter()
@@ -285,6 +286,7 @@ def create_player_search(request: PlayerSearchCreate, db: Session = Depends(get_
 
     db.add(new_search)
     db.commit()
+    catalog_version.bump(new_search.game_id)
     db.refresh(new_search)
 
     return {
@@ -358,6 +360,7 @@ def update_player_search(
             detailed_message="target_type must be one of: game, complexity, free",
         )
 
+    previous_game_id = search.game_id
     search.game_id = game_id
     search.target_type = target_type
     search.target_complexity_label = target_complexity_label
@@ -369,6 +372,7 @@ def update_player_search(
     search.edit_token = request.edit_token
 
     db.commit()
+    catalog_version.bump(previous_game_id, game_id)
     db.refresh(search)
 
     return search
@@ -387,7 +391,9 @@ def delete_player_search(
     if search.edit_token != edit_token:
         create_error(status_code=403, error_code="INVALID_PAYER_SEARCH_TOKEN")
 
+    game_id = search.game_id
     db.delete(search)
     db.commit()
+    catalog_version.bump(game_id)
 
     return {"message": "Player search deleted successfully"}
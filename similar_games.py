@@ -1,12 +1,13 @@
 from models import Game, GameSimilarity
 from database import SessionLocal
-from random import shuffle
+from utils.revisions import mark_games_changed
+from random import Random, shuffle
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 
 def get_top_similar_game_ids(
-    similar_games: List[GameSimilarity], limit: int = 6
+    similar_games: List[GameSimilarity], limit: int = 6, seed: Optional[str] = None
 ) -> List[int]:
     """
     Liefert die IDs der `limit` ähnlichsten Spiele basierend auf similarity_score,
@@ -15,23 +16,31 @@ def get_top_similar_game_ids(
     Args:
         similar_games (List[GameSimilarity]): Liste von GameSimilarity-Objekten.
         limit (int): Maximale Anzahl der zurückgegebenen IDs.
+        seed (str, optional): Gleicher Seed → gleiche Reihenfolge (cachebar).
 
     Returns:
         List[int]: Liste der IDs der ähnlichsten Spiele (randomisiert).
     """
-    # 1) Sortiere nach similarity_score DESC
+    # 1) Sortiere nach similarity_score DESC (bei Gleichstand nach ID)
     sorted_games = sorted(
-        similar_games, key=lambda sg: sg.similarity_score, reverse=True
+        similar_games, key=lambda sg: (-sg.similarity_score, sg.similar_game_id)
     )
 
-    # 2) Nimm die Top-Einträge (limit)
-    top_games = sorted_games[:limit]
+    # 2) Nimm die Top-Einträge (limit) und extrahiere die IDs
+    top_ids = [sg.similar_game_id for sg in sorted_games[:limit]]
 
-    # 3) Shuffle das Ergebnis, damit die Rückgabe-Reihenfolge zufällig ist
-    shuffle(top_games)
+    # 3) Mischen, damit die Rückgabe-Reihenfolge zufällig ist
+    return shuffle_similar_ids(top_ids, seed)
 
-    # 4) Extrahiere die IDs und gib sie zurück
-    return [sg.similar_game_id for sg in top_games]
+
+def shuffle_similar_ids(game_ids: List[int], seed: Optional[str] = None) -> List[int]:
+    """Mischt die IDs – mit `seed` deterministisch, sonst zufällig."""
+    game_ids = list(game_ids)
+    if seed is None:
+        shuffle(game_ids)
+    else:
+        Random(seed).shuffle(game_ids)
+    return game_ids
 
 
 # ------------------------------------------------------------------------------
@@ -176,6 +185,8 @@ def update_similar_games(max_similar_games: int = 10) -> int:
                 session.add(new_sim)
                 created_count += 1
 
+        # Alle Similarity-Listen wurden neu aufgebaut → jedes Spiel gilt als geändert
+        mark_games_changed(session)
         session.commit()
         logger.info("   -> Fertig! Ähnlichkeiten erfolgreich aktualisiert.")
         logger.info(f"5) Anzahl neu erstellter Similarities: {created_count}")
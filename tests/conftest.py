@@ -0,0 +1,113 @@
+import itertools
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# Eigene SQLite-Datenbank für die Tests – vor dem Import der App setzen
+_DB_DIR = tempfile.mkdtemp(prefix="spieleausleihe-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("BGG_API_TOKEN", "test")
+os.environ.setdefault("SECRET_KEY", "test")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from auth import create_access_token  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+from main import app  # noqa: E402
+from models import Event, Game, User  # noqa: E402
+from utils.catalog import availability, invalidate_catalog  # noqa: E402
+from utils.etag import catalog_version  # noqa: E402
+from utils.events import event_calendar  # noqa: E402
+from utils.game_details import game_details  # noqa: E402
+from utils.idempotency import idempotency  # noqa: E402
+from utils.pagination import total_count_cache  # noqa: E402
+from utils.popularity import popularity  # noqa: E402
+from utils.serialization import game_fragments  # noqa: E402
+
+
+def reset_caches():
+    """Prozesslokale Caches leeren (IDs wiederholen sich zwischen den Tests)."""
+    invalidate_catalog()
+    availability.invalidate()
+    catalog_version.bump()
+    event_calendar.invalidate()
+    game_details.clear()
+    game_fragments.clear()
+    idempotency._entries.clear()
+    popularity.invalidate()
+    total_count_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def database():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    reset_caches()
+    yield
+    reset_caches()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def event(db):
+    """Laufendes Event des aktuellen Jahres."""
+    now = datetime.utcnow()
+    event = Event(
+        name="Test",
+        start_date=now - timedelta(days=1),
+        end_date=now + timedelta(days=1),
+        year=now.year,
+    )
+    db.add(event)
+    db.commit()
+    return event
+
+
+@pytest.fixture
+def helper(db):
+    user = User(
+        username="helper",
+        email="helper@example.org",
+        hashed_password="-",
+        role="helper",
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth(helper):
+    token = create_access_token(data={"sub": helper.username, "role": helper.role})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def make_game(db):
+    bgg_ids = itertools.count(1)
+
+    def make_game(name="Azul", quantity=1, available=None, ean=None):
+        game = Game(
+            bgg_id=next(bgg_ids),
+            name=name,
+            sort_key=name.lower(),
+            quantity=quantity,
+            available=quantity if available is None else available,
+            ean=ean,
+        )
+        db.add(game)
+        db.commit()
+        return game
+
+    return make_game
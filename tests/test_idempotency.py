@@ -0,0 +1,134 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import routes.games
+from main import app
+from models import Game, IdempotencyKey
+from utils.idempotency import idempotency
+
+
+def with_key(auth, key):
+    return {**auth, "Idempotency-Key": key}
+
+
+def available(db, game_id):
+    db.expire_all()
+    return db.get(Game, game_id).available
+
+
+@pytest.mark.usefixtures("event")
+@pytest.mark.parametrize("from_memory", [True, False])
+def test_repeated_key_replays_stored_response(
+    client, auth, db, make_game, from_memory
+):
+    game = make_game(quantity=3)
+    url = f"/games/game/borrow/{game.id}"
+
+    first = client.put(url, headers=with_key(auth, "scan-1"))
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    if not from_memory:
+        # Anderer Worker: nur die Tabelle kennt den Key
+        idempotency._entries.clear()
+
+    second = client.put(url, headers=with_key(auth, "scan-1"))
+
+    assert second.status_code == 200
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.content == first.content
+    assert available(db, game.id) == 2
+
+
+@pytest.mark.usefixtures("event")
+def test_new_key_executes_again(client, auth, db, make_game):
+    game = make_game(quantity=3)
+    url = f"/games/game/borrow/{game.id}"
+
+    client.put(url, headers=with_key(auth, "scan-1"))
+    client.put(url, headers=with_key(auth, "scan-2"))
+
+    assert available(db, game.id) == 1
+
+
+@pytest.mark.usefixtures("event")
+@pytest.mark.parametrize("from_memory", [True, False])
+def test_key_reused_for_other_request_is_rejected(
+    client, auth, db, make_game, from_memory
+):
+    game = make_game(quantity=3)
+    other = make_game(name="Brass", quantity=3)
+    client.put(f"/games/game/borrow/{game.id}", headers=with_key(auth, "scan-1"))
+    if not from_memory:
+        idempotency._entries.clear()
+
+    response = client.put(
+        f"/games/game/borrow/{other.id}", headers=with_key(auth, "scan-1")
+    )
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["error_code"] == "IDEMPOTENCY_KEY_REUSED"
+    assert available(db, game.id) == 2
+    assert available(db, other.id) == 3
+
+
+@pytest.mark.usefixtures("event")
+def test_key_reused_with_other_body_is_rejected(client, auth, db, make_game):
+    make_game(quantity=3, ean="4001")
+    make_game(name="Brass", quantity=3, ean="4002")
+    headers = with_key(auth, "batch-1")
+
+    response = client.post(
+        "/games/scan_batch",
+        headers=headers,
+        json={"items": [{"ean": "4001", "action": "borrow"}]},
+    )
+    assert response.status_code == 200
+
+    response = client.post(
+        "/games/scan_batch",
+        headers=headers,
+        json={"items": [{"ean": "4002", "action": "borrow"}]},
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"]["error_code"] == "IDEMPOTENCY_KEY_REUSED"
+
+
+@pytest.mark.usefixtures("event")
+def test_response_is_committed_with_the_change(db, auth, make_game, monkeypatch):
+    game = make_game(quantity=3)
+    url = f"/games/game/borrow/{game.id}"
+    client = TestClient(app, raise_server_exceptions=False)
+
+    # Worker stirbt nach dem Commit, bevor er die Antwort ausliefern kann
+    def crash(row):
+        raise RuntimeError("worker died")
+
+    monkeypatch.setattr(routes.games, "_after_lending", crash)
+    assert client.put(url, headers=with_key(auth, "scan-1")).status_code == 500
+    monkeypatch.undo()
+
+    # Die Wiederholung findet Änderung *und* Antwort – kein 409, keine 2. Ausleihe
+    response = client.put(url, headers=with_key(auth, "scan-1"))
+
+    assert response.status_code == 200
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert response.json()["available"] == 2
+    assert available(db, game.id) == 2
+
+
+@pytest.mark.usefixtures("event")
+def test_failed_request_releases_key(client, auth, db, make_game):
+    game = make_game(quantity=1, available=0)
+    url = f"/games/game/borrow/{game.id}"
+
+    response = client.put(url, headers=with_key(auth, "scan-1"))
+    assert response.status_code == 400
+    assert db.query(IdempotencyKey).count() == 0
+
+    # Nach einer Rückgabe (anderer Key) führt die Wiederholung die Ausleihe aus
+    client.put(f"/games/game/return/{game.id}", headers=auth)
+    response = client.put(url, headers=with_key(auth, "scan-1"))
+
+    assert response.status_code == 200
+    assert "Idempotent-Replayed" not in response.headers
+    assert available(db, game.id) == 0
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import Event, Game, GameBorrow
+
+
+def borrow(client, auth, game_id, **params):
+    return client.put(f"/games/game/borrow/{game_id}", headers=auth, params=params)
+
+
+def give_back(client, auth, game_id):
+    return client.put(f"/games/game/return/{game_id}", headers=auth)
+
+
+def stock(db, game_id):
+    db.expire_all()
+    game = db.get(Game, game_id)
+    return game.available, game.quantity
+
+
+def borrow_count(db, event, game_id):
+    db.expire_all()
+    row = db.query(GameBorrow).filter_by(event_id=event.id, game_id=game_id).first()
+    return None if row is None else row.count
+
+
+@pytest.mark.usefixtures("event")
+def test_borrow_and_return_update_available(client, auth, db, make_game):
+    game = make_game(quantity=2)
+
+    response = borrow(client, auth, game.id)
+    assert response.status_code == 200
+    assert response.json()["available"] == 1
+    assert stock(db, game.id) == (1, 2)
+
+    response = give_back(client, auth, game.id)
+    assert response.status_code == 200
+    assert response.json()["available"] == 2
+    assert stock(db, game.id) == (2, 2)
+
+
+def test_borrow_without_copies_is_rejected(client, auth, db, event, make_game):
+    game = make_game(quantity=1, available=0)
+
+    response = borrow(client, auth, game.id)
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["error_code"] == "NO_COPIES_AVAILABLE"
+    # Bedingtes UPDATE greift nicht → weder Bestand noch Zähler verändert
+    assert stock(db, game.id) == (0, 1)
+    assert borrow_count(db, event, game.id) is None
+
+
+@pytest.mark.usefixtures("event")
+def test_return_with_all_copies_available_is_rejected(client, auth, db, make_game):
+    game = make_game(quantity=2)
+
+    response = give_back(client, auth, game.id)
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["error_code"] == "ALL_COPIES_AVAILABLE"
+    assert stock(db, game.id) == (2, 2)
+
+
+@pytest.mark.usefixtures("event")
+def test_last_copy_can_be_borrowed_exactly_once(client, auth, db, make_game):
+    game = make_game(quantity=1)
+
+    assert borrow(client, auth, game.id).status_code == 200
+    assert borrow(client, auth, game.id).status_code == 400
+    assert stock(db, game.id) == (0, 1)
+
+
+@pytest.mark.usefixtures("event")
+@pytest.mark.parametrize("path", ["borrow", "return"])
+def test_unknown_game_is_not_found(client, auth, path):
+    response = client.put(f"/games/game/{path}/4711", headers=auth)
+
+    assert response.status_code == 404
+    assert response.json()["detail"]["error_code"] == "GAME_NOT_FOUND"
+
+
+@pytest.mark.usefixtures("event")
+@pytest.mark.parametrize(
+    "path, error_code",
+    [("borrow", "NO_COPIES_AVAILABLE"), ("return", "ALL_COPIES_AVAILABLE")],
+)
+def test_unknown_ean_is_not_found(client, auth, make_game, path, error_code):
+    make_game(quantity=1, available=0 if path == "borrow" else 1, ean="4001")
+
+    response = client.put(f"/games/game/{path}_by_ean/4002", headers=auth)
+    assert response.status_code == 404
+    assert response.json()["detail"]["error_code"] == "GAME_NOT_FOUND"
+
+    response = client.put(f"/games/game/{path}_by_ean/4001", headers=auth)
+    assert response.status_code == 400
+    assert response.json()["detail"]["error_code"] == error_code
+
+
+def test_borrow_count_upsert(client, auth, db, event, make_game):
+    game = make_game(quantity=3)
+
+    # Erste Ausleihe legt die Zeile an, weitere zählen hoch
+    response = borrow(client, auth, game.id)
+    assert response.json()["borrow_count"] == 1
+    assert borrow_count(db, event, game.id) == 1
+
+    response = borrow(client, auth, game.id)
+    assert response.json()["borrow_count"] == 2
+    assert borrow_count(db, event, game.id) == 2
+    assert db.query(GameBorrow).filter_by(game_id=game.id).count() == 1
+
+    # Rückgaben ändern den Zähler nicht
+    response = give_back(client, auth, game.id)
+    assert response.json()["borrow_count"] == 2
+    assert borrow_count(db, event, game.id) == 2
+
+
+def test_borrow_outside_event_counts_only_when_forced(client, auth, db, make_game):
+    now = datetime.utcnow()
+    event = Event(
+        name="Vorbei",
+        start_date=now - timedelta(days=3),
+        end_date=now - timedelta(days=2),
+        year=now.year,
+    )
+    db.add(event)
+    db.commit()
+    game = make_game(quantity=3)
+
+    response = borrow(client, auth, game.id)
+    assert response.json()["borrow_count"] == 0
+    assert borrow_count(db, event, game.id) is None
+
+    response = borrow(client, auth, game.id, force_event=True)
+    assert response.json()["borrow_count"] == 1
+    assert borrow_count(db, event, game.id) == 1
+    assert stock(db, game.id) == (1, 3)
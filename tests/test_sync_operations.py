@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from models import BorrowEvent, Game
+from utils.events import as_utc
+
+
+def op(op_id, action, game_id=None, ean=None, at=None):
+    at = at or datetime.now(timezone.utc)
+    return {
+        "op_id": op_id,
+        "action": action,
+        "game_id": game_id,
+        "ean": ean,
+        "client_timestamp": at.isoformat(),
+    }
+
+
+def sync(client, auth, *operations):
+    response = client.post(
+        "/games/sync_operations", headers=auth, json={"operations": operations}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def available(db, game_id):
+    db.expire_all()
+    return db.get(Game, game_id).available
+
+
+def journal(db, game_id):
+    db.expire_all()
+    return (
+        db.query(BorrowEvent)
+        .filter_by(game_id=game_id)
+        .order_by(BorrowEvent.created_at, BorrowEvent.id)
+        .all()
+    )
+
+
+@pytest.mark.usefixtures("event")
+def test_resent_operation_is_replayed(client, auth, db, make_game):
+    game = make_game(quantity=3)
+    borrow = op("op-1", "borrow", game_id=game.id)
+
+    first = sync(client, auth, borrow)
+    # Antwort verloren, Scanner sendet die Warteschlange erneut
+    second = sync(client, auth, borrow)
+
+    assert first["results"][0]["status"] == "applied"
+    assert first["results"][0]["replayed"] is False
+    assert second["results"][0]["status"] == "applied"
+    assert second["results"][0]["replayed"] is True
+    assert second["games"][0]["available"] == 2
+    assert available(db, game.id) == 2
+    assert len(journal(db, game.id)) == 1
+
+
+@pytest.mark.usefixtures("event")
+def test_duplicate_op_id_in_one_batch_applies_once(client, auth, db, make_game):
+    game = make_game(quantity=3)
+    borrow = op("op-1", "borrow", game_id=game.id)
+
+    body = sync(client, auth, borrow, borrow)
+
+    assert [r["replayed"] for r in body["results"]] == [False, True]
+    assert available(db, game.id) == 2
+
+
+@pytest.mark.usefixtures("event")
+def test_rejected_operation_stays_rejected(client, auth, db, make_game):
+    game = make_game(quantity=1, available=0)
+    borrow = op("op-1", "borrow", game_id=game.id)
+
+    first = sync(client, auth, borrow)
+    assert first["results"][0]["status"] == "conflict"
+    assert first["results"][0]["error_code"] == "NO_COPIES_AVAILABLE"
+
+    # Inzwischen zurückgegeben – die alte Operation wird trotzdem nicht nachgeholt
+    client.put(f"/games/game/return/{game.id}", headers=auth)
+    second = sync(client, auth, borrow)
+
+    assert second["results"][0]["status"] == "conflict"
+    assert second["results"][0]["error_code"] == "NO_COPIES_AVAILABLE"
+    assert second["results"][0]["replayed"] is True
+    assert available(db, game.id) == 1
+
+
+@pytest.mark.usefixtures("event")
+def test_partial_failures_do_not_abort_the_batch(client, auth, db, make_game):
+    azul = make_game(quantity=2, ean="4001")
+    brass = make_game(name="Brass", quantity=1, available=0)
+    start = datetime.now(timezone.utc) - timedelta(minutes=10)
+
+    body = sync(
+        client,
+        auth,
+        op("op-1", "borrow", ean="4001", at=start),
+        op("op-2", "borrow", ean="9999", at=start + timedelta(minutes=1)),
+        op("op-3", "borrow", game_id=brass.id, at=start + timedelta(minutes=2)),
+        op("op-4", "borrow", game_id=azul.id, at=start + timedelta(minutes=3)),
+        op("op-5", "borrow", game_id=azul.id, at=start + timedelta(minutes=4)),
+    )
+
+    results = {r["op_id"]: r for r in body["results"]}
+    assert [r["op_id"] for r in body["results"]] == [f"op-{i}" for i in range(1, 6)]
+    assert results["op-1"]["status"] == "applied"
+    assert results["op-2"]["error_code"] == "GAME_NOT_FOUND"
+    assert results["op-2"]["game_id"] is None
+    assert results["op-3"]["error_code"] == "NO_COPIES_AVAILABLE"
+    assert results["op-4"]["status"] == "applied"
+    assert results["op-5"]["status"] == "conflict"
+    assert results["op-5"]["error_code"] == "NO_COPIES_AVAILABLE"
+    assert available(db, azul.id) == 0
+    assert available(db, brass.id) == 0
+    games = {g["game_id"]: g for g in body["games"]}
+    assert games[azul.id]["available"] == 0
+    assert games[azul.id]["borrow_count"] == 2
+
+
+@pytest.mark.usefixtures("event")
+def test_operations_apply_in_timestamp_order(client, auth, db, make_game):
+    game = make_game(quantity=1)
+    start = datetime.now(timezone.utc) - timedelta(minutes=10)
+
+    # Rückgabe steht in der Warteschlange vor der Ausleihe, ist aber später
+    body = sync(
+        client,
+        auth,
+        op("op-2", "return", game_id=game.id, at=start + timedelta(minutes=5)),
+        op("op-1", "borrow", game_id=game.id, at=start),
+    )
+
+    assert [r["status"] for r in body["results"]] == ["applied", "applied"]
+    assert [entry.action for entry in journal(db, game.id)] == ["borrow", "return"]
+    assert available(db, game.id) == 1
+
+
+def test_backdated_return_is_clamped_to_latest_entry(
+    client, auth, db, event, make_game
+):
+    game = make_game(quantity=1)
+    response = client.put(f"/games/game/borrow/{game.id}", headers=auth)
+    assert response.status_code == 200
+    borrowed_at = as_utc(journal(db, game.id)[0].created_at)
+
+    # Uhr des Scanners geht eine Stunde nach
+    sync(
+        client,
+        auth,
+        op("op-1", "return", game_id=game.id, at=borrowed_at - timedelta(hours=1)),
+    )
+
+    borrow, give_back = journal(db, game.id)
+    assert give_back.action == "return"
+    assert as_utc(give_back.created_at) == borrowed_at
+    stats = client.get("/games/borrow-stats/games", headers=auth).json()
+    assert stats[0]["game_id"] == game.id
+    assert stats[0]["out_now"] == 0
+    assert stats[0]["avg_minutes_out"] == 0
+
+
+@pytest.mark.usefixtures("event")
+def test_future_timestamp_is_clamped_to_now(client, auth, db, make_game):
+    game = make_game(quantity=1)
+    before = datetime.now(timezone.utc)
+
+    sync(
+        client,
+        auth,
+        op("op-1", "borrow", game_id=game.id, at=before + timedelta(days=1)),
+    )
+
+    (entry,) = journal(db, game.id)
+    assert before <= as_utc(entry.created_at) <= datetime.now(timezone.utc)
@@ -0,0 +1,242 @@
+import copy
+import heapq
+from bisect import bisect_right
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from utils.etag import catalog_version
+from utils.text import fold, fold_variants, levenshtein, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+def max_typos(word: str) -> int:
+    """Erlaubte Tippfehler je Wortlänge (kurze Wörter müssen exakt passen)."""
+    if len(word) >= 5:
+        return 2
+    if len(word) >= 4:
+        return 1
+    return 0
+
+
+class _TrieNode:
+    __slots__ = ("children", "positions")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Alle Katalogpositionen mit einem Token, das mit diesem Präfix beginnt
+        self.positions: Set[int] = set()
+
+
+class PrefixTrie:
+    """Präfixbaum über Namens-Tokens → Katalogpositionen."""
+
+    def __init__(self):
+        self._root = _TrieNode()
+
+    def add(self, token: str, position: int) -> None:
+        node = self._root
+        for char in token:
+            node = node.children.setdefault(char, _TrieNode())
+            node.positions.add(position)
+
+    def prefix(self, prefix: str) -> Set[int]:
+        node = self._root
+        for char in prefix:
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        return node.positions
+
+
+class NGramIndex:
+    """
+    Bigramm-Index über die Tokens für die Tippfehler-Suche.
+
+    Jede Änderung zerstört höchstens zwei (gepolsterte) Bigramme, eine
+    Vertauschung benachbarter Buchstaben höchstens drei; Kandidaten
+    müssen daher genug Bigramme mit dem Suchwort teilen und werden erst dann
+    mit der begrenzten Editierdistanz geprüft.
+    """
+
+    def __init__(self):
+        self._tokens_by_gram: Dict[str, List[str]] = {}
+
+    @staticmethod
+    def grams(word: str) -> List[str]:
+        padded = f"^{word}$"
+        return [padded[i : i + 2] for i in range(len(padded) - 1)]
+
+    def add(self, token: str) -> None:
+        for gram in set(self.grams(token)):
+            self._tokens_by_gram.setdefault(gram, []).append(token)
+
+    def search(self, word: str, max_distance: int) -> List[Tuple[str, int]]:
+        grams = set(self.grams(word))
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for token in self._tokens_by_gram.get(gram, ()):
+                shared[token] = shared.get(token, 0) + 1
+
+        min_shared = len(grams) - 3 * max_distance
+        matches = []
+        for token, count in shared.items():
+            if count < min_shared:
+                continue
+            distance = levenshtein(word, token, max_distance)
+            if distance <= max_distance:
+                matches.append((token, distance))
+        return matches
+
+
+class AutocompleteIndex:
+    """
+    Tippfehlertolerante Namenssuche über einen Katalog-Snapshot.
+
+    Ranking: Namensanfang > alle Wörter als Wortanfang > Teilstring
+    > Treffer mit Tippfehlern (nach Distanz), danach Katalogreihenfolge.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._names: List[Tuple[str, ...]] = []
+        self._trie = PrefixTrie()
+        self._ngrams = NGramIndex()
+        self._token_positions: Dict[str, Set[int]] = {}
+        # Alle Namen in einem String → Teilstringsuche per str.find statt Schleife
+        haystack: List[str] = []
+        self._offsets: List[int] = []
+        self._offset_positions: List[int] = []
+        offset = 0
+
+        for position, game in enumerate(catalog.games):
+            # Alternative Titel (z. B. deutsche Ausgaben) zählen wie der Hauptname
+            titles = (game.name, *game.alternate_names)
+            names = tuple(sorted(set().union(*map(fold_variants, titles))))
+            self._names.append(names)
+            for name in names:
+                haystack.append(name)
+                self._offsets.append(offset)
+                self._offset_positions.append(position)
+                offset += len(name) + 1
+                for token in tokenize(name):
+                    self._trie.add(token, position)
+                    if token not in self._token_positions:
+                        self._token_positions[token] = set()
+                        self._ngrams.add(token)
+                    self._token_positions[token].add(position)
+        self._haystack = "\n".join(haystack)
+
+    def _substring_positions(self, query: str) -> Set[int]:
+        positions = set()
+        start = self._haystack.find(query)
+        while start != -1:
+            entry = bisect_right(self._offsets, start) - 1
+            positions.add(self._offset_positions[entry])
+            start = self._haystack.find(query, start + 1)
+        return positions
+
+    def _word_matches(self, word: str) -> Dict[int, int]:
+        """Katalogposition → kleinste Distanz für ein Suchwort."""
+        matches = dict.fromkeys(self._trie.prefix(word), 0)
+        typos = max_typos(word)
+        if typos:
+            for token, distance in self._ngrams.search(word, typos):
+                for position in self._token_positions[token]:
+                    if distance < matches.get(position, typos + 1):
+                        matches[position] = distance
+        return matches
+
+    def search(self, search_text: str, limit: int) -> List:
+        query = fold(search_text)
+        words = tokenize(query)
+        if not words:
+            return []
+
+        # Jedes Suchwort muss (ggf. mit Tippfehlern) in einem Namens-Token vorkommen
+        per_word = [self._word_matches(word) for word in words]
+        distances = per_word[0]
+        for matches in per_word[1:]:
+            distances = {
+                position: distance + matches[position]
+                for position, distance in distances.items()
+                if position in matches
+            }
+
+        substring = self._substring_positions(query)
+
+        ranked = []
+        for position in distances.keys() | substring:
+            names = self._names[position]
+            distance = distances.get(position)
+            if any(name.startswith(query) for name in names):
+                tier = 0
+            elif distance == 0:
+                tier = 1
+            elif position in substring:
+                tier = 2
+            else:
+                tier = 3
+            ranked.append((tier, distance or 0, position))
+
+        games = self.catalog.games
+        return [games[position] for _, _, position in heapq.nsmallest(limit, ranked)]
+
+
+_index: Optional[AutocompleteIndex] = None
+_pending = None
+_lock = threading.Lock()
+
+
+def _build(catalog) -> None:
+    global _index
+    try:
+        index = AutocompleteIndex(catalog)
+    except Exception:
+        logger.exception("Autocomplete-Index konnte nicht gebaut werden")
+        return
+    with _lock:
+        # Nur übernehmen, wenn inzwischen kein neuerer Snapshot angefordert wurde
+        if _pending is not catalog:
+            return
+        _index = index
+    # Suchergebnisse ändern sich (Tippfehlertoleranz) → alte ETags verwerfen
+    catalog_version.bump()
+
+
+def schedule_build(catalog) -> None:
+    """Baut den Index für `catalog` im Hintergrund (nach jedem Snapshot-Neubau)."""
+    global _pending
+    with _lock:
+        _pending = catalog
+    threading.Thread(
+        target=_build, args=(catalog,), name="autocomplete-index", daemon=True
+    ).start()
+
+
+def retarget_index(old_catalog, new_catalog) -> None:
+    """
+    Übernimmt den Index für einen Snapshot mit unveränderten Namen und
+    Positionen (z. B. nur EAN geändert); ein laufender Aufbau wird neu gestartet.
+    """
+    global _index, _pending
+    with _lock:
+        index = _index
+        if index is not None and index.catalog is old_catalog:
+            index = copy.copy(index)
+            index.catalog = new_catalog
+            _index = index
+            if _pending is old_catalog:
+                _pending = new_catalog
+            return
+        rebuild = _pending is old_catalog
+    if rebuild:
+        schedule_build(new_catalog)
+
+
+def get_autocomplete_index(catalog) -> Optional[AutocompleteIndex]:
+    """Index zum Snapshot `catalog`, oder `None`, solange er noch nicht fertig ist."""
+    index = _index
+    if index is not None and index.catalog is catalog:
+        return index
+    return None
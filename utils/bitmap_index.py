@@ -0,0 +1,159 @@
+import copy
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Spieleranzahlen oberhalb dieser Grenze bekommen kein eigenes Bitset
+# (BGG kennt Spiele mit max_players = 99+, die wenigen Anfragen dort werden gescannt)
+MAX_INDEXED_PLAYER_COUNT = 30
+
+# Bitpositionen je Byte-Wert für das schnelle Aufzählen gesetzter Bits
+_BYTE_POSITIONS = tuple(
+    tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)
+)
+
+
+def iter_positions(bits: int) -> Iterator[int]:
+    """Liefert die Positionen aller gesetzten Bits aufsteigend."""
+    if bits <= 0:
+        return
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for byte_index, value in enumerate(data):
+        if value:
+            base = byte_index * 8
+            for bit in _BYTE_POSITIONS[value]:
+                yield base + bit
+
+
+def bits_from_positions(positions: Iterable[int]) -> int:
+    """Baut ein Bitset aus Positionen (über ein Byte-Array statt n Shifts)."""
+    buffer = bytearray()
+    for position in positions:
+        byte_index = position >> 3
+        if byte_index >= len(buffer):
+            buffer.extend(bytes(byte_index - len(buffer) + 1))
+        buffer[byte_index] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class BitmapIndex:
+    """
+    Bitsets über die Positionen des Katalog-Snapshots (Bit i = `games[i]`).
+
+    Jede Filterkombination ist damit eine Handvoll AND-Operationen auf
+    Python-Integern, die Trefferzahl ein `int.bit_count()`.
+    """
+
+    __slots__ = (
+        "all",
+        "missing_ean",
+        "by_player_count",
+        "ages",
+        "age_at_least",
+        "by_complexity",
+        "by_tag",
+        "_games",
+    )
+
+    def __init__(self, games: Sequence, tag_ids_by_position: Sequence[Iterable[int]]):
+        self._games = games
+        self.all = (1 << len(games)) - 1
+
+        missing_ean: List[int] = []
+        by_player_count: List[List[int]] = [
+            [] for _ in range(MAX_INDEXED_PLAYER_COUNT + 1)
+        ]
+        by_age: Dict[int, List[int]] = {}
+        by_complexity: Dict[str, List[int]] = {}
+        by_tag: Dict[int, List[int]] = {}
+
+        for position, game in enumerate(games):
+            if game.ean is None:
+                missing_ean.append(position)
+            if game.min_players is not None and game.max_players is not None:
+                lowest = max(game.min_players, 1)
+                highest = min(game.max_players, MAX_INDEXED_PLAYER_COUNT)
+                for n in range(lowest, highest + 1):
+                    by_player_count[n].append(position)
+            if game.player_age is not None:
+                by_age.setdefault(game.player_age, []).append(position)
+            if game.complexity_label:
+                by_complexity.setdefault(game.complexity_label, []).append(position)
+            for tag_id in tag_ids_by_position[position]:
+                by_tag.setdefault(tag_id, []).append(position)
+
+        self.missing_ean = bits_from_positions(missing_ean)
+        self.by_player_count = [bits_from_positions(p) for p in by_player_count]
+        self.by_complexity = {
+            label: bits_from_positions(p) for label, p in by_complexity.items()
+        }
+        self.by_tag = {tag_id: bits_from_positions(p) for tag_id, p in by_tag.items()}
+
+        # Kumulierte Bitsets: age_at_least[i] = alle Spiele mit player_age >= ages[i]
+        self.ages = sorted(by_age)
+        self.age_at_least: List[int] = [0] * len(self.ages)
+        cumulative = 0
+        for i in range(len(self.ages) - 1, -1, -1):
+            cumulative |= bits_from_positions(by_age[self.ages[i]])
+            self.age_at_least[i] = cumulative
+
+    def with_missing_ean(self, games: Sequence, position: int, missing: bool):
+        """Kopie für den Snapshot `games` mit geändertem `missing_ean`-Bit."""
+        clone = copy.copy(self)
+        clone._games = games
+        if missing:
+            clone.missing_ean = self.missing_ean | 1 << position
+        else:
+            clone.missing_ean = self.missing_ean & ~(1 << position)
+        return clone
+
+    def player_count(self, player_count: int) -> int:
+        """Spiele mit min_players <= player_count <= max_players."""
+        if player_count <= 0:
+            return self.all
+        if player_count <= MAX_INDEXED_PLAYER_COUNT:
+            return self.by_player_count[player_count]
+        return bits_from_positions(
+            position
+            for position, game in enumerate(self._games)
+            if game.min_players is not None
+            and game.max_players is not None
+            and game.min_players <= player_count <= game.max_players
+        )
+
+    def player_age(self, player_age: int) -> int:
+        """Spiele mit player_age >= `player_age`."""
+        if player_age <= 0:
+            return self.all
+        i = bisect_left(self.ages, player_age)
+        return self.age_at_least[i] if i < len(self.ages) else 0
+
+    def complexities(self, labels: Optional[Iterable[str]]) -> int:
+        if not labels:
+            return self.all
+        bits = 0
+        for label in set(labels):
+            bits |= self.by_complexity.get(label, 0)
+        return bits
+
+    def tags(self, tag_ids: Iterable[int], match_all: bool = True) -> int:
+        """Spiele mit allen (`match_all`) bzw. mindestens einem der Tags."""
+        tag_ids = list(tag_ids)
+        if not tag_ids:
+            return self.all
+        if match_all:
+            bits = self.all
+            for tag_id in tag_ids:
+                bits &= self.by_tag.get(tag_id, 0)
+            return bits
+        bits = 0
+        for tag_id in tag_ids:
+            bits |= self.by_tag.get(tag_id, 0)
+        return bits
+
+    def available(self, availability: Dict[int, int]) -> int:
+        """Bitset der aktuell verfügbaren Spiele (aus dem Verfügbarkeits-Overlay)."""
+        return bits_from_positions(
+            position
+            for position, game in enumerate(self._games)
+            if availability.get(game.id, 0) > 0
+        )
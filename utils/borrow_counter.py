@@ -0,0 +1,159 @@
+import logging
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from utils.inventory import borrow_counts, count_borrows
+
+logger = logging.getLogger(__name__)
+
+# Write-behind für game_borrows: Ausleihen im Speicher sammeln und gebündelt
+# schreiben, statt pro Ausleihe die Zählerzeile zu sperren (Default: aus)
+BORROW_WRITE_BEHIND = os.getenv("BORROW_WRITE_BEHIND", "0") == "1"
+BORROW_FLUSH_SECONDS = float(os.getenv("BORROW_FLUSH_SECONDS", "5"))
+
+_SESSION_KEY = "borrow_increments"
+
+
+class BorrowCounterBuffer:
+    """
+    Noch nicht geschriebene Ausleihen je (event_id, game_id).
+
+    Ein Hintergrund-Thread schreibt sie alle `flush_seconds` per Upsert nach
+    `game_borrows` (und einmal beim Herunterfahren). Die Änderung von
+    `available` bleibt davon unberührt in der Transaktion der Ausleihe.
+    """
+
+    def __init__(self, flush_seconds: float):
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[Tuple[int, int], int] = {}
+        # Gerade geschrieben, aber noch nicht committet – zählt für Leser weiter
+        self._in_flight: Dict[Tuple[int, int], int] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, increments: Dict[Tuple[int, int], int]) -> None:
+        with self._lock:
+            for key, count in increments.items():
+                self._pending[key] = self._pending.get(key, 0) + count
+
+    def pending(self, event_id: int, game_ids: Iterable[int]) -> Dict[int, int]:
+        with self._lock:
+            pending, in_flight = self._pending, self._in_flight
+        return {
+            game_id: pending.get((event_id, game_id), 0)
+            + in_flight.get((event_id, game_id), 0)
+            for game_id in game_ids
+        }
+
+    def flush(self) -> int:
+        """Schreibt alle gesammelten Ausleihen; liefert die Anzahl der Zeilen."""
+        with self._lock:
+            if self._in_flight or not self._pending:
+                # Ein Flush läuft noch → der nächste Takt übernimmt den Rest
+                return 0
+            pending, self._pending = self._pending, {}
+            self._in_flight = pending
+
+        by_event: Dict[int, Dict[int, int]] = {}
+        for (event_id, game_id), count in pending.items():
+            by_event.setdefault(event_id, {})[game_id] = count
+
+        db = SessionLocal()
+        try:
+            for event_id, increments in by_event.items():
+                count_borrows(db, event_id, increments)
+            db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Ausleihzähler konnten nicht geschrieben werden")
+            # Zurücklegen (vor neueren Ausleihen) → nächster Versuch im nächsten Takt
+            with self._lock:
+                for key, count in self._pending.items():
+                    pending[key] = pending.get(key, 0) + count
+                self._pending, self._in_flight = pending, {}
+            return 0
+        finally:
+            db.close()
+        # Erst nach dem Commit stecken die Ausleihen in game_borrows
+        with self._lock:
+            self._in_flight = {}
+        return len(pending)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="borrow-counter-flush", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Beendet den Thread und schreibt den Rest (Shutdown)."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+borrow_buffer = BorrowCounterBuffer(BORROW_FLUSH_SECONDS)
+
+
+def record_borrows(
+    db: Session, event_id: int, increments: Dict[int, int]
+) -> Dict[int, int]:
+    """
+    Zählt Ausleihen fürs Event und liefert die neuen Zählerstände je Spiel-ID.
+
+    Ohne Write-behind direkt per Upsert in der laufenden Transaktion. Mit
+    Write-behind werden sie erst nach dem Commit in den Puffer übernommen
+    (Rollback → verworfen); der Rückgabewert ist dann DB-Stand + Puffer.
+    """
+    if not BORROW_WRITE_BEHIND:
+        return count_borrows(db, event_id, increments)
+
+    staged = db.info.setdefault(_SESSION_KEY, {})
+    for game_id, count in increments.items():
+        staged[(event_id, game_id)] = staged.get((event_id, game_id), 0) + count
+
+    stored = borrow_counts(db, event_id, increments)
+    pending = borrow_buffer.pending(event_id, increments)
+    return {
+        game_id: stored.get(game_id, 0)
+        + pending[game_id]
+        + staged[(event_id, game_id)]
+        for game_id in increments
+    }
+
+
+def read_borrow_counts(
+    db: Session, event_id: int, game_ids: Iterable[int]
+) -> Dict[int, int]:
+    """Zählerstände ohne Änderung (Rückgaben), inkl. noch ungeschriebener."""
+    game_ids = list(game_ids)
+    counts = borrow_counts(db, event_id, game_ids)
+    if BORROW_WRITE_BEHIND:
+        for game_id, count in borrow_buffer.pending(event_id, game_ids).items():
+            counts[game_id] = counts.get(game_id, 0) + count
+    return counts
+
+
+@event.listens_for(Session, "after_commit")
+def _buffer_committed_borrows(session: Session) -> None:
+    staged = session.info.pop(_SESSION_KEY, None)
+    if staged:
+        borrow_buffer.add(staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_borrows(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
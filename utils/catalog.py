@@ -0,0 +1,544 @@
+import copy
+import os
+import threading
+import time
+from bisect import bisect_right
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import asc
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Game, GameName, Tag, game_tags
+from utils.filters import load_tag_lookup
+from utils.sorting import SORT_OPTIONS, sort_value
+from utils.bitmap_index import BitmapIndex, bits_from_positions, iter_positions
+from utils.autocomplete import retarget_index, schedule_build
+from utils.etag import catalog_version
+from utils.revisions import current_revision, current_revisions
+
+# Snapshot per Umgebungsvariable abschaltbar (z. B. für Debugging gegen die DB)
+CATALOG_SNAPSHOT_ENABLED = os.getenv("CATALOG_SNAPSHOT", "1") != "0"
+# Sicherheitsnetz für Änderungen außerhalb dieses Prozesses (z. B. direkt in der DB)
+CATALOG_SNAPSHOT_MAX_AGE = float(os.getenv("CATALOG_SNAPSHOT_MAX_AGE", "300"))
+# Verfügbarkeit ändert sich laufend → kurzes Intervall für den Abgleich mit der DB
+CATALOG_AVAILABILITY_TTL = float(os.getenv("CATALOG_AVAILABILITY_TTL", "5"))
+
+# Katalog-Spalten ohne `available` und ohne Beschreibungs-/Kommentar-Blobs
+CATALOG_FIELDS = (
+    "id",
+    "bgg_id",
+    "name",
+    "sort_key",
+    "year_published",
+    "min_players",
+    "max_players",
+    "min_playtime",
+    "max_playtime",
+    "playing_time",
+    "rating",
+    "ean",
+    "quantity",
+    "img_url",
+    "thumbnail_url",
+    "player_age",
+    "complexity",
+    "complexity_label",
+    "best_playercount",
+    "min_recommended_playercount",
+    "max_recommended_playercount",
+    "revision",
+)
+
+
+class CatalogGame:
+    """Kompakte, unveränderliche Katalogzeile (Attributnamen wie `Game`)."""
+
+    __slots__ = CATALOG_FIELDS + (
+        "name_lower",
+        "tag_ids",
+        "alternate_names",
+        "search_lower",
+    )
+
+    def __init__(
+        self,
+        row,
+        tag_ids: Tuple[int, ...] = (),
+        alternate_names: Tuple[str, ...] = (),
+    ):
+        for field, value in zip(CATALOG_FIELDS, row):
+            object.__setattr__(self, field, value)
+        object.__setattr__(self, "name_lower", self.name.lower())
+        object.__setattr__(self, "tag_ids", tag_ids)
+        object.__setattr__(self, "alternate_names", alternate_names)
+        # Haupt- und alternative Titel, eine Zeile je Titel (Teilstringsuche)
+        object.__setattr__(
+            self,
+            "search_lower",
+            "\n".join((self.name, *alternate_names)).lower(),
+        )
+
+    def __setattr__(self, key, value):
+        raise AttributeError("CatalogGame ist unveränderlich")
+
+    def replace(self, **changes) -> "CatalogGame":
+        """Kopie mit geänderten Feldern (abgeleitete Felder bleiben unverändert)."""
+        clone = object.__new__(CatalogGame)
+        for field in self.__slots__:
+            object.__setattr__(clone, field, changes.get(field, getattr(self, field)))
+        return clone
+
+
+class CatalogSnapshot:
+    """
+    Prozesslokaler, unveränderlicher Schnappschuss der Katalog-Metadaten.
+
+    `games` ist bereits nach (sort_key, id) sortiert (Reihenfolge der Datenbank).
+    Filter werden über den `BitmapIndex` ausgewertet: Bit i steht für `games[i]`,
+    Ergebnisse sind damit automatisch sortiert.
+    """
+
+    __slots__ = (
+        "games",
+        "by_id",
+        "by_ean",
+        "position_by_id",
+        "bitmaps",
+        "tag_lookup",
+        "tag_priorities",
+        "revision",
+        "built_at",
+        "_name_bits",
+        "_orders",
+    )
+
+    def __init__(
+        self,
+        games: Iterable[CatalogGame],
+        tag_lookup: Optional[Dict[str, int]] = None,
+        tag_priorities: Optional[Dict[int, int]] = None,
+        revision: int = 0,
+    ):
+        self.games: Tuple[CatalogGame, ...] = tuple(games)
+        self.by_id: Dict[int, CatalogGame] = {g.id: g for g in self.games}
+        self.by_ean: Dict[str, CatalogGame] = {g.ean: g for g in self.games if g.ean}
+        self.position_by_id: Dict[int, int] = {
+            g.id: pos for pos, g in enumerate(self.games)
+        }
+        self.bitmaps = BitmapIndex(self.games, [g.tag_ids for g in self.games])
+        # Tag-Name (englisch/deutsch, lowercase) → Tag-ID
+        self.tag_lookup: Dict[str, int] = tag_lookup or {}
+        # Tag-ID → Priorität (Gewichtung in /games/suggest)
+        self.tag_priorities: Dict[int, int] = tag_priorities or {}
+        # Katalog-Revision beim Laden (Abgleich mit der DB, siehe unten)
+        self.revision = revision
+        self.built_at = time.monotonic()
+        self._name_bits: Dict[str, int] = {}
+        # Sortierung → (Positionen, aufsteigende Vergleichsschlüssel)
+        self._orders: Dict[str, tuple] = {}
+
+    def with_ean(self, game_id: int, ean: Optional[str], revision: int):
+        """
+        Kopie mit geänderter EAN eines Spiels (Copy-on-write wie
+        `AvailabilityOverlay.set`, laufende Leser behalten ihren Stand).
+        Reihenfolge, Sortierungen und alle Filter außer `missing_ean` bleiben
+        gültig und werden geteilt.
+        """
+        position = self.position_by_id[game_id]
+        old = self.games[position]
+        game = old.replace(ean=ean, revision=revision)
+
+        clone = copy.copy(self)
+        games = list(self.games)
+        games[position] = game
+        clone.games = tuple(games)
+        clone.by_id = {**self.by_id, game_id: game}
+        clone.by_ean = dict(self.by_ean)
+        if old.ean and clone.by_ean.get(old.ean) is old:
+            del clone.by_ean[old.ean]
+        if ean:
+            clone.by_ean[ean] = game
+        clone.bitmaps = self.bitmaps.with_missing_ean(
+            clone.games, position, ean is None
+        )
+        # Nur bei lückenloser Folge aktuell – sonst lädt der nächste Abgleich neu
+        if self.revision == revision - 1:
+            clone.revision = revision
+        return clone
+
+    def name_bits(self, filter_text: Optional[str]) -> int:
+        """
+        Bitset der Spiele, deren Name oder alternativer Titel `filter_text`
+        enthält (case-insensitive).
+        """
+        if not filter_text:
+            return self.bitmaps.all
+        needle = filter_text.lower()
+        bits = self._name_bits.get(needle)
+        if bits is None:
+            if "\n" in needle:
+                # Zeilenumbruch trennt die Titel in `search_lower`
+                bits = 0
+            else:
+                bits = bits_from_positions(
+                    pos
+                    for pos, g in enumerate(self.games)
+                    if needle in g.search_lower
+                )
+            # Beim Blättern kommt derselbe Suchtext mehrfach → kleiner Cache
+            if len(self._name_bits) >= 256:
+                self._name_bits.clear()
+            self._name_bits[needle] = bits
+        return bits
+
+    def select(
+        self,
+        available_bits: int,
+        filter_text: Optional[str] = None,
+        show_available_only: bool = False,
+        min_player_count: int = 0,
+        player_age: int = 0,
+        show_missing_ean_only: bool = False,
+        complexities: Optional[List[str]] = None,
+        tag_ids: Optional[List[int]] = None,
+        match_all_tags: bool = True,
+    ) -> int:
+        """In-Memory-Gegenstück zu `apply_game_filters` (gleiche Semantik)."""
+        bits = self.name_bits(filter_text)
+        if show_available_only:
+            bits &= available_bits
+        if min_player_count > 0:
+            bits &= self.bitmaps.player_count(min_player_count)
+        if player_age > 0:
+            bits &= self.bitmaps.player_age(player_age)
+        if show_missing_ean_only:
+            bits &= self.bitmaps.missing_ean
+        if complexities:
+            bits &= self.bitmaps.complexities(complexities)
+        if tag_ids is not None:
+            bits &= self.tag_bits(tag_ids, match_all_tags)
+        return bits
+
+    def tag_bits(
+        self, tag_ids: Optional[List[int]], match_all_tags: bool = True
+    ) -> int:
+        """Bitset zum Tag-Filter (`resolve_tag_ids`: None = alle, [] = keine)."""
+        if tag_ids is None:
+            return self.bitmaps.all
+        if not tag_ids:
+            return 0
+        return self.bitmaps.tags(tag_ids, match_all_tags)
+
+    def rows(
+        self, bits: int, offset: int = 0, limit: Optional[int] = None
+    ) -> List[CatalogGame]:
+        """Materialisiert die Zeilen eines Bitsets (in Katalogreihenfolge)."""
+        stop = None if limit is None else offset + limit
+        return [self.games[pos] for pos in islice(iter_positions(bits), offset, stop)]
+
+    def _order(
+        self, sort: str, popularity: Optional[Dict[int, int]] = None
+    ) -> Tuple[List[int], List[tuple], Optional[Dict[int, int]]]:
+        option = SORT_OPTIONS[sort]
+        cached = self._orders.get(sort)
+        # Ausleihzahlen ändern sich laufend → Reihenfolge pro Stand neu
+        if cached is not None and cached[2] is popularity:
+            return cached
+
+        sign = -1 if option.descending else 1
+        keyed = sorted(
+            (
+                (sign * sort_value(option, g, popularity), sign * g.id),
+                position,
+            )
+            for position, g in enumerate(self.games)
+        )
+        cached = (
+            [position for _, position in keyed],
+            [key for key, _ in keyed],
+            popularity if option.field is None else None,
+        )
+        self._orders[sort] = cached
+        return cached
+
+    def sorted_rows(
+        self,
+        bits: int,
+        sort: str,
+        popularity: Optional[Dict[int, int]] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        after: Optional[list] = None,
+    ) -> List[CatalogGame]:
+        """
+        Zeilen eines Bitsets in der Reihenfolge von `sort` (siehe utils/sorting.py),
+        optional hinter dem Cursor `after` = [Sortierwert, id] fortgesetzt.
+        """
+        positions, keys, _ = self._order(sort, popularity)
+        start = 0
+        if after:
+            sign = -1 if SORT_OPTIONS[sort].descending else 1
+            start = bisect_right(keys, (sign * after[0], sign * after[1]))
+
+        matches = (
+            position
+            for position in islice(positions, start, None)
+            if bits >> position & 1
+        )
+        stop = None if limit is None else offset + limit
+        return [self.games[position] for position in islice(matches, offset, stop)]
+
+    def bits_after(self, bits: int, last_key: str, last_id: int) -> int:
+        """Keyset-Fortsetzung: nur Zeilen hinter (last_key, last_id) behalten."""
+        position = self.position_by_id.get(last_id)
+        if position is None or self.games[position].sort_key != last_key:
+            # Cursor-Zeile existiert nicht mehr → über die Sortierwerte weitersuchen
+            position = -1
+            for pos, g in enumerate(self.games):
+                if (g.sort_key, g.id) > (last_key, last_id):
+                    break
+                position = pos
+        return bits >> (position + 1) << (position + 1)
+
+    def search(self, search_text: str, limit: int) -> List[CatalogGame]:
+        """Teilstring-Suche mit Ranking: Namensanfang > Wortanfang > Teilstring."""
+        needle = search_text.lower()
+        ranked = []
+        for pos in iter_positions(self.name_bits(search_text)):
+            g = self.games[pos]
+            if g.search_lower.startswith(needle) or f"\n{needle}" in g.search_lower:
+                rank = 0
+            elif f" {needle}" in g.search_lower:
+                rank = 1
+            else:
+                rank = 2
+            ranked.append((rank, pos, g))
+        ranked.sort(key=lambda entry: entry[:2])
+        return [g for _, _, g in ranked[:limit]]
+
+
+def load_catalog_snapshot(db: Session) -> CatalogSnapshot:
+    """Lädt alle Katalogzeilen (nur benötigte Spalten) in einen neuen Snapshot."""
+    # Vor den Daten lesen: ändert sich dazwischen etwas, ist die Revision zu alt
+    # und der Snapshot wird beim nächsten Abgleich erneut geladen
+    revision = current_revision(db)
+    columns = [getattr(Game, field) for field in CATALOG_FIELDS]
+    rows = db.query(*columns).order_by(asc(Game.sort_key), asc(Game.id)).all()
+
+    tag_ids_by_game: Dict[int, List[int]] = {}
+    for game_id, tag_id in db.query(game_tags.c.game_id, game_tags.c.tag_id):
+        tag_ids_by_game.setdefault(game_id, []).append(tag_id)
+
+    names_by_game: Dict[int, List[str]] = {}
+    for game_id, name in db.query(GameName.game_id, GameName.name).order_by(
+        GameName.id
+    ):
+        names_by_game.setdefault(game_id, []).append(name)
+
+    return CatalogSnapshot(
+        (
+            CatalogGame(
+                row,
+                tuple(sorted(tag_ids_by_game.get(row.id, ()))),
+                tuple(names_by_game.get(row.id, ())),
+            )
+            for row in rows
+        ),
+        load_tag_lookup(db),
+        {
+            tag_id: priority or 0
+            for tag_id, priority in db.query(Tag.id, Tag.priority).filter(
+                Tag.is_active.is_(True)
+            )
+        },
+        revision,
+    )
+
+
+class AvailabilityOverlay:
+    """
+    Aktuelle `available`-Werte je Spiel-ID.
+
+    Ausleihen/Rückgaben dieses Prozesses werden sofort über `set()` eingetragen,
+    ansonsten wird nach `ttl_seconds` mit einer schmalen Abfrage
+    (`SELECT id, available`) abgeglichen.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._counts: Dict[int, int] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        # (Snapshot, counts, Bitset der verfügbaren Spiele)
+        self._bits: Optional[Tuple[CatalogSnapshot, Dict[int, int], int]] = None
+
+    def counts(self, db: Session) -> Dict[int, int]:
+        if time.monotonic() >= self._expires_at:
+            rows = db.query(Game.id, Game.available).all()
+            counts = {game_id: available or 0 for game_id, available in rows}
+            with self._lock:
+                if self._counts and counts != self._counts:
+                    # Änderung von außerhalb dieses Prozesses → ETags ungültig
+                    catalog_version.bump()
+                self._counts = counts
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return self._counts
+
+    def bits(self, catalog: CatalogSnapshot, db: Session) -> int:
+        """Bitset der verfügbaren Spiele, passend zu den Positionen von `catalog`."""
+        counts = self.counts(db)
+        cached = self._bits
+        if cached is not None and cached[0] is catalog and cached[1] is counts:
+            return cached[2]
+        bits = catalog.bitmaps.available(counts)
+        with self._lock:
+            if self._counts is counts:
+                self._bits = (catalog, counts, bits)
+        return bits
+
+    def set(self, game_id: int, available: int) -> None:
+        with self._lock:
+            # Kopie statt In-Place-Änderung: laufende Leser behalten einen
+            # konsistenten Stand
+            counts = dict(self._counts)
+            counts[game_id] = available
+            self._counts = counts
+            catalog_version.bump(game_id)
+
+            # Bitset inkrementell nachziehen statt neu aufzubauen
+            if self._bits is not None:
+                catalog, _, bits = self._bits
+                position = catalog.position_by_id.get(game_id)
+                if position is not None:
+                    if available > 0:
+                        bits |= 1 << position
+                    else:
+                        bits &= ~(1 << position)
+                self._bits = (catalog, counts, bits)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+        catalog_version.bump()
+
+
+availability = AvailabilityOverlay(CATALOG_AVAILABILITY_TTL)
+
+_snapshot: Optional[CatalogSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_catalog(db: Session) -> Optional[CatalogSnapshot]:
+    """
+    Liefert den aktuellen Katalog-Snapshot und baut ihn bei Bedarf (erster Aufruf,
+    Invalidierung, Ablauf von CATALOG_SNAPSHOT_MAX_AGE) mit der übergebenen
+    Session neu auf. `None`, wenn der Snapshot deaktiviert ist.
+    """
+    global _snapshot
+
+    if not CATALOG_SNAPSHOT_ENABLED:
+        return None
+
+    snapshot = _snapshot
+    if (
+        snapshot is not None
+        and time.monotonic() - snapshot.built_at < CATALOG_SNAPSHOT_MAX_AGE
+    ):
+        return snapshot
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if (
+            snapshot is None
+            or time.monotonic() - snapshot.built_at >= CATALOG_SNAPSHOT_MAX_AGE
+        ):
+            if snapshot is not None:
+                # Abgelaufen: evtl. extern geänderte Daten → ETags ungültig
+                catalog_version.bump()
+            snapshot = load_catalog_snapshot(db)
+            _snapshot = snapshot
+            schedule_build(snapshot)
+    return snapshot
+
+
+def invalidate_catalog() -> None:
+    """Verwirft den Snapshot; der nächste Lesezugriff baut ihn neu auf."""
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+    availability.invalidate()
+
+
+def update_catalog_ean(game_id: int, ean: Optional[str], revision: int) -> None:
+    """
+    EAN-Änderung eines Spiels (Scan-Station) in den Snapshot übernehmen, statt
+    ihn samt Autocomplete-Index komplett neu aufzubauen.
+    """
+    global _snapshot, _seen_revision
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if snapshot is not None:
+            if game_id in snapshot.position_by_id:
+                _snapshot = snapshot.with_ean(game_id, ean, revision)
+                retarget_index(snapshot, _snapshot)
+            else:
+                _snapshot = None
+    if _seen_revision == revision - 1:
+        # Eigene Änderung, keine fremde dazwischen → kein voller Bump nötig
+        _seen_revision = revision
+    catalog_version.bump(game_id)
+
+
+def rebuild_catalog() -> None:
+    """Baut den Snapshot sofort neu auf (nach Importen aufrufen)."""
+    global _snapshot
+
+    if not CATALOG_SNAPSHOT_ENABLED:
+        availability.invalidate()
+        return
+
+    db = SessionLocal()
+    try:
+        snapshot = load_catalog_snapshot(db)
+    finally:
+        db.close()
+
+    with _snapshot_lock:
+        _snapshot = snapshot
+    schedule_build(snapshot)
+    availability.invalidate()
+
+
+_seen_revision: Optional[int] = None
+_seen_user_data_revision: Optional[int] = None
+
+
+@catalog_version.watch
+def _refresh_catalog_version(db: Session) -> None:
+    """
+    Vor jedem ETag-Vergleich: Katalog- und Benutzerdaten-Revision aus der DB
+    (ein Zugriff per Primärschlüssel, erkennt Änderungen anderer Worker
+    sofort), Ablauf des Snapshots und der TTL-Abgleich der Verfügbarkeit –
+    jeweils mit `bump()`.
+    """
+    global _seen_revision, _seen_user_data_revision, _snapshot
+    revision, user_data_revision = current_revisions(db)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.revision != revision:
+        # Änderung eines anderen Workers/Skripts: Snapshot neu laden, bevor die
+        # neue Version (und damit der neue ETag) mit alten Daten ausgeliefert wird
+        with _snapshot_lock:
+            if _snapshot is snapshot:
+                _snapshot = None
+    get_catalog(db)
+    if _seen_revision is not None and revision != _seen_revision:
+        catalog_version.bump()
+    # Familiarity/Spielergesuche (auch anderer Worker) stecken in Listen und Details
+    if (
+        _seen_user_data_revision is not None
+        and user_data_revision != _seen_user_data_revision
+    ):
+        catalog_version.bump()
+    _seen_revision = revision
+    _seen_user_data_revision = user_data_revision
+    availability.counts(db)
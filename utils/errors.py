@@ -30,6 +30,14 @@ ERROR_CODES = {
         "message": "Ungültiger Token für Mitspieler-Gesuch."
     },
     "INVALID_CURRENT_PASSWORD": {"message": "Ungültiges aktuelles Passwort."},
+    "INVALID_CURSOR": {"message": "Ungültiger Cursor für die Seitennavigation."},
+    "EVENT_NOT_FOUND": {"message": "Für dieses Jahr gibt es kein Event."},
+    "IDEMPOTENCY_KEY_REUSED": {
+        "message": "Der Idempotency-Key wurde bereits für eine andere Anfrage benutzt."
+    },
+    "IDEMPOTENCY_IN_PROGRESS": {
+        "message": "Die Anfrage mit diesem Idempotency-Key wird noch verarbeitet."
+    },
 }
 
 
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional, Union
+from fastapi import Request, Response
+
+# Pro Prozessstart neu → nach einem Neustart (Zähler wieder 0) passt kein altes ETag
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+
+class CatalogVersion:
+    """
+    Monoton steigender Versionszähler des Katalogs (prozesslokal).
+
+    `bump()` ohne Argumente gilt für den ganzen Katalog (z. B. Importe),
+    `bump(game_id, ...)` zusätzlich für einzelne Spiele, sodass die
+    Detail-ETags anderer Spiele gültig bleiben.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+        self._full = 0
+        self._games: Dict[int, int] = {}
+        # Abgleich mit der DB vor jedem ETag-Vergleich (siehe `watch`)
+        self._sources: List[Callable] = []
+
+    def bump(self, *game_ids: Optional[int]) -> int:
+        with self._lock:
+            self.value += 1
+            if game_ids:
+                for game_id in game_ids:
+                    if game_id is not None:
+                        self._games[game_id] = self.value
+            else:
+                self._full = self.value
+                self._games.clear()
+            return self.value
+
+    def watch(self, source: Callable) -> Callable:
+        """
+        Registriert `source(db)`, das Änderungen anderer Prozesse/Worker erkennt
+        und dann `bump()` aufruft (z. B. Verfügbarkeits-Abgleich in utils/catalog.py).
+        """
+        self._sources.append(source)
+        return source
+
+    def refresh(self, db) -> None:
+        for source in self._sources:
+            source(db)
+
+    def of_game(self, game_id: int) -> int:
+        """Version, ab der sich die Daten dieses einen Spiels zuletzt geändert haben."""
+        return self._games.get(game_id, self._full)
+
+
+catalog_version = CatalogVersion()
+
+
+def make_etag(request: Request, version: int, *extra) -> str:
+    """Starkes ETag aus Version, Pfad und (sortierten) Query-Parametern."""
+    params = sorted(request.query_params.multi_items())
+    key = repr((request.url.path, params, extra))
+    digest = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    return f'"{_BOOT_ID}-{version}-{digest}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Schwache Vergleiche (W/"...") wie in RFC 9110 für If-None-Match erlaubt
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    version: Union[int, Callable[[], int], None] = None,
+    *extra,
+    db=None,
+) -> Optional[Response]:
+    """
+    Setzt das ETag auf `response` und liefert eine leere 304-Antwort, wenn der
+    Client dieselbe Version bereits hat (dann muss die Route nichts mehr laden).
+
+    Mit `db` wird die Version vorher mit der DB abgeglichen, sonst bekämen
+    Clients bei mehreren Workern dauerhaft 304 auf veraltete Daten. `version`
+    darf daher auch eine Funktion sein, die erst nach dem Abgleich gelesen wird.
+    """
+    if db is not None:
+        catalog_version.refresh(db)
+    if callable(version):
+        version = version()
+    etag = make_etag(
+        request, catalog_version.value if version is None else version, *extra
+    )
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import Event
+
+# Events ändern sich selten (direkt in der DB) → kurzer Abgleich genügt
+EVENT_CACHE_TTL = float(os.getenv("EVENT_CACHE_TTL", "60"))
+
+
+def as_utc(value: datetime) -> datetime:
+    # Naive Datetimes in der DB gelten als UTC
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class EventWindow(NamedTuple):
+    """Unveränderliche Kopie einer Event-Zeile mit vorberechnetem Zeitfenster."""
+
+    id: int
+    name: str
+    year: int
+    start_date: datetime
+    end_date: datetime
+
+    def is_active(self, now: Optional[datetime] = None) -> bool:
+        return self.start_date <= (now or datetime.now(timezone.utc)) <= self.end_date
+
+
+class EventCalendar:
+    """
+    Prozesslokaler Event-Kalender (Jahr → Event), spart die Event-Abfrage bei
+    jeder Ausleihe/Rückgabe. Wird nach `ttl_seconds`, bei Schreibzugriffen auf
+    `events` über eine Session dieses Prozesses und per Admin-Endpunkt neu geladen.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._by_year: Dict[int, EventWindow] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, year: int) -> Optional[EventWindow]:
+        if time.monotonic() >= self._expires_at:
+            by_year: Dict[int, EventWindow] = {}
+            rows = db.query(
+                Event.id, Event.name, Event.year, Event.start_date, Event.end_date
+            ).order_by(Event.id)
+            for row in rows:
+                # Wie bisher `.first()`: pro Jahr zählt das erste Event
+                by_year.setdefault(
+                    row.year,
+                    EventWindow(
+                        row.id,
+                        row.name,
+                        row.year,
+                        as_utc(row.start_date),
+                        as_utc(row.end_date),
+                    ),
+                )
+            with self._lock:
+                self._by_year = by_year
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return self._by_year.get(year)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+
+event_calendar = EventCalendar(EVENT_CACHE_TTL)
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_event_calendar(session: Session, flush_context) -> None:
+    if any(
+        isinstance(obj, Event)
+        for objects in (session.new, session.dirty, session.deleted)
+        for obj in objects
+    ):
+        event_calendar.invalidate()
@@ -0,0 +1,81 @@
+import csv
+import io
+from typing import Iterator
+import orjson
+from sqlalchemy import asc, select
+from database import SessionLocal
+from models import Game
+
+# Spalten des Exports (Etiketten-Druck, Offline-Kiosk)
+EXPORT_FIELDS = (
+    "id",
+    "bgg_id",
+    "name",
+    "ean",
+    "year_published",
+    "min_players",
+    "max_players",
+    "min_playtime",
+    "max_playtime",
+    "playing_time",
+    "player_age",
+    "complexity",
+    "complexity_label",
+    "best_playercount",
+    "min_recommended_playercount",
+    "max_recommended_playercount",
+    "rating",
+    "quantity",
+    "available",
+    "img_url",
+    "thumbnail_url",
+)
+
+# Zeilen pro Fetch vom serverseitigen Cursor bzw. pro gesendetem CSV-Block
+EXPORT_BATCH_SIZE = 500
+
+
+def _iter_rows() -> Iterator[tuple]:
+    """
+    Liest alle Spiele über einen serverseitigen Cursor (`yield_per`).
+
+    Eigene Session: der Generator läuft erst nach dem Ende der Route, wenn die
+    `get_db`-Session schon geschlossen ist.
+    """
+    db = SessionLocal()
+    try:
+        statement = (
+            select(*(getattr(Game, field) for field in EXPORT_FIELDS))
+            .order_by(asc(Game.sort_key), asc(Game.id))
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        for row in db.execute(statement):
+            yield tuple(row)
+    finally:
+        db.close()
+
+
+def export_ndjson() -> Iterator[bytes]:
+    """Eine JSON-Zeile pro Spiel."""
+    for row in _iter_rows():
+        yield orjson.dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n"
+
+
+def export_csv() -> Iterator[bytes]:
+    """CSV mit Kopfzeile, blockweise kodiert."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    # Kopfzeile sofort senden, der Client sieht direkt eine Antwort
+    yield buffer.getvalue().encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+
+    for count, row in enumerate(_iter_rows(), 1):
+        writer.writerow(row)
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional
+from sqlalchemy import and_, case, func, true
+from sqlalchemy.orm import Session
+from models import Game
+from utils.catalog import CatalogSnapshot
+from utils.filters import COMPLEXITY_MAPPING, game_filter_conditions
+from utils.search import get_search_backend
+
+
+def _empty_facets(max_player_count: int) -> Dict:
+    return {
+        "total": 0,
+        "complexities": {category["label"]: 0 for category in COMPLEXITY_MAPPING},
+        "player_counts": {n: 0 for n in range(1, max_player_count + 1)},
+        "available": 0,
+        "missing_ean": 0,
+    }
+
+
+def compute_facets_from_catalog(
+    catalog: CatalogSnapshot,
+    available_bits: int,
+    max_player_count: int,
+    filter_text: Optional[str] = None,
+    show_available_only: bool = False,
+    min_player_count: int = 0,
+    player_age: int = 0,
+    show_missing_ean_only: bool = False,
+    complexities: Optional[List[str]] = None,
+    tag_ids: Optional[List[int]] = None,
+    match_all_tags: bool = True,
+) -> Dict:
+    """
+    Zählt alle Facetten über den Bitmap-Index des Katalogs (AND + popcount).
+
+    Jede Facette wird mit allen aktiven Filtern *außer* ihrem eigenen gezählt,
+    d. h. sie zeigt, wie viele Spiele das Umschalten dieses Filters ergeben würde.
+    """
+    bitmaps = catalog.bitmaps
+    facets = _empty_facets(max_player_count)
+
+    # Name, Alter und Tags sind keine Facetten → gelten immer
+    base = (
+        catalog.name_bits(filter_text)
+        & bitmaps.player_age(player_age)
+        & catalog.tag_bits(tag_ids, match_all_tags)
+    )
+    dimensions = {
+        "available": available_bits if show_available_only else bitmaps.all,
+        "player_count": bitmaps.player_count(min_player_count),
+        "missing_ean": bitmaps.missing_ean if show_missing_ean_only else bitmaps.all,
+        "complexity": bitmaps.complexities(complexities),
+    }
+
+    def all_except(dimension: Optional[str]) -> int:
+        bits = base
+        for key, dimension_bits in dimensions.items():
+            if key != dimension:
+                bits &= dimension_bits
+        return bits
+
+    facets["total"] = all_except(None).bit_count()
+
+    without_complexity = all_except("complexity")
+    for label in facets["complexities"]:
+        label_bits = bitmaps.by_complexity.get(label, 0)
+        facets["complexities"][label] = (without_complexity & label_bits).bit_count()
+
+    without_player_count = all_except("player_count")
+    for n in facets["player_counts"]:
+        player_bits = bitmaps.player_count(n)
+        facets["player_counts"][n] = (without_player_count & player_bits).bit_count()
+
+    facets["available"] = (all_except("available") & available_bits).bit_count()
+    facets["missing_ean"] = (
+        all_except("missing_ean") & bitmaps.missing_ean
+    ).bit_count()
+    return facets
+
+
+def compute_facets_sql(
+    db: Session,
+    max_player_count: int,
+    filter_text: Optional[str] = None,
+    show_available_only: bool = False,
+    min_player_count: int = 0,
+    player_age: int = 0,
+    show_missing_ean_only: bool = False,
+    complexities: Optional[List[str]] = None,
+    tag_ids: Optional[List[int]] = None,
+    match_all_tags: bool = True,
+) -> Dict:
+    """
+    Datenbank-Variante: eine einzige Abfrage mit bedingten Summen
+    (SUM(CASE WHEN ...)) statt einer COUNT-Abfrage pro Facette.
+    """
+    conditions = game_filter_conditions(
+        show_available_only,
+        min_player_count,
+        player_age,
+        show_missing_ean_only,
+        complexities,
+        tag_ids,
+        match_all_tags,
+    )
+
+    def all_except(dimension: Optional[str], *extra):
+        clauses = [c for key, c in conditions.items() if key != dimension]
+        return and_(true(), *clauses, *extra)
+
+    def count_where(clause):
+        return func.coalesce(func.sum(case((clause, 1), else_=0)), 0)
+
+    columns = [count_where(all_except(None)).label("total")]
+    labels = [category["label"] for category in COMPLEXITY_MAPPING]
+    for i, label in enumerate(labels):
+        columns.append(
+            count_where(
+                all_except("complexity", Game.complexity_label == label)
+            ).label(f"complexity_{i}")
+        )
+    for n in range(1, max_player_count + 1):
+        columns.append(
+            count_where(
+                all_except(
+                    "player_count", Game.min_players <= n, Game.max_players >= n
+                )
+            ).label(f"players_{n}")
+        )
+    columns.append(count_where(all_except("available", Game.available > 0)))
+    columns.append(count_where(all_except("missing_ean", Game.ean.is_(None))))
+
+    query = db.query(*columns).select_from(Game)
+    if filter_text:
+        query = get_search_backend(db).filter(query, filter_text)
+    row = query.one()
+
+    values = list(row)
+    facets = _empty_facets(max_player_count)
+    facets["total"] = values[0]
+    offset = 1
+    for i, label in enumerate(labels):
+        facets["complexities"][label] = values[offset + i]
+    offset += len(labels)
+    for n in range(1, max_player_count + 1):
+        facets["player_counts"][n] = values[offset + n - 1]
+    offset += max_player_count
+    facets["available"] = values[offset]
+    facets["missing_ean"] = values[offset + 1]
+    return facets
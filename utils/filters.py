@@ -1,7 +1,8 @@
-from sqlalchemy import and_
-from typing import List, Optional
-from sqlalchemy.orm import Query
-from models import Game
+from sqlalchemy import and_, distinct, false, func, select, ColumnElement
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Query, Session
+from models import Game, Tag, game_tags
+from utils.search import get_search_backend
 
 # 🔹 Mapping für Complexity-Kategorien
 COMPLEXITY_MAPPING = [
@@ -37,6 +38,8 @@ def apply_game_filters(
     player_age: int = 0,
     show_missing_ean_only: bool = False,
     complexities: Optional[List[str]] = None,
+    tag_ids: Optional[List[int]] = None,
+    match_all_tags: bool = True,
 ) -> Query:
     """
     Applies various filters to the database query.
@@ -50,38 +53,113 @@ def apply_game_filters(
         show_missing_ean_only (bool): If True, only games without an EAN are shown.
         complexities (Optional[List[str]]): List of complexity labels
             (e.g., ["Beginner", "Expert"]).
+        tag_ids (Optional[List[int]]): Tag IDs from `resolve_tag_ids`
+            (None = no tag filter, [] = nothing matches).
+        match_all_tags (bool): True → game needs all tags, False → any of them.
 
     Returns:
         Query: The filtered query.
     """
 
-    # 🔹 Filter by name
+    # 🔹 Filter by name (pg_trgm / FTS5 index if available, ILIKE otherwise)
     if filter_text:
-        query = query.filter(Game.name.ilike(f"%{filter_text}%"))
+        query = get_search_backend(query.session).filter(query, filter_text)
+
+    conditions = game_filter_conditions(
+        show_available_only,
+        min_player_count,
+        player_age,
+        show_missing_ean_only,
+        complexities,
+        tag_ids,
+        match_all_tags,
+    )
+    if conditions:
+        query = query.filter(*conditions.values())
+
+    return query
+
+
+def game_filter_conditions(
+    show_available_only: bool = False,
+    min_player_count: int = 0,
+    player_age: int = 0,
+    show_missing_ean_only: bool = False,
+    complexities: Optional[List[str]] = None,
+    tag_ids: Optional[List[int]] = None,
+    match_all_tags: bool = True,
+) -> Dict[str, ColumnElement]:
+    """
+    Returns the SQL conditions of the active filters (without the name filter),
+    keyed by filter dimension ("available", "player_count", "player_age",
+    "missing_ean", "complexity", "tags").
+    """
+    conditions = {}
 
     # 🔹 Show only available games
     if show_available_only:
-        query = query.filter(Game.available > 0)
+        conditions["available"] = Game.available > 0
 
     # 🔹 Filter by player count
     if min_player_count > 0:
-        query = query.filter(
-            and_(
-                Game.max_players >= min_player_count,
-                Game.min_players <= min_player_count,
-            )
+        conditions["player_count"] = and_(
+            Game.max_players >= min_player_count,
+            Game.min_players <= min_player_count,
         )
 
     # 🔹 Filter by player age
     if player_age > 0:
-        query = query.filter(Game.player_age >= player_age)
+        conditions["player_age"] = Game.player_age >= player_age
 
     # 🔹 Show only games without EAN
     if show_missing_ean_only:
-        query = query.filter(Game.ean.is_(None))
+        conditions["missing_ean"] = Game.ean.is_(None)
 
     # 🔹 Apply Complexity Filter
     if complexities:
-        query = query.filter(Game.complexity_label.in_(complexities))
+        conditions["complexity"] = Game.complexity_label.in_(complexities)
+
+    # 🔹 Filter by tags (one semi-join instead of an EXISTS per tag)
+    if tag_ids is not None:
+        if not tag_ids:
+            conditions["tags"] = false()
+        else:
+            tagged = select(game_tags.c.game_id).where(game_tags.c.tag_id.in_(tag_ids))
+            if match_all_tags and len(tag_ids) > 1:
+                tagged = tagged.group_by(game_tags.c.game_id).having(
+                    func.count(distinct(game_tags.c.tag_id)) == len(tag_ids)
+                )
+            conditions["tags"] = Game.id.in_(tagged)
+
+    return conditions
+
+
+def load_tag_lookup(db: Session) -> Dict[str, int]:
+    """Tag name (English or German, lowercase) → tag ID of all active tags."""
+    lookup = {}
+    rows = db.query(Tag.id, Tag.normalized_tag, Tag.german_normalized_tag).filter(
+        Tag.is_active.is_(True)
+    )
+    for tag_id, name, german_name in rows:
+        lookup[name.lower()] = tag_id
+        lookup[german_name.lower()] = tag_id
+    return lookup
+
+
+def resolve_tag_ids(
+    tag_names: Optional[List[str]],
+    tag_lookup: Dict[str, int],
+    match_all_tags: bool = True,
+) -> Optional[List[int]]:
+    """
+    Resolves tag names to sorted tag IDs.
 
-    return query
+    Returns None if no tag filter is requested and [] if no game can match
+    (unknown tag with AND semantics, or only unknown tags with OR semantics).
+    """
+    if not tag_names:
+        return None
+    resolved = [tag_lookup.get(name.strip().lower()) for name in tag_names]
+    if match_all_tags and None in resolved:
+        return []
+    return sorted({tag_id for tag_id in resolved if tag_id is not None})
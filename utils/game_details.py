@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+import orjson
+from sqlalchemy.orm import Session, selectinload, undefer_group
+from models import Game, TagResponse
+from similar_games import shuffle_similar_ids
+
+# Reihenfolge der ähnlichen Spiele wechselt in diesem Takt (Sekunden)
+SIMILAR_ROTATION_SECONDS = int(os.getenv("SIMILAR_ROTATION_SECONDS", "3600"))
+
+# Felder in `read_game`, die per `or None` normalisiert werden
+_OR_NONE_FIELDS = (
+    "description",
+    "german_description",
+    "year_published",
+    "min_players",
+    "max_players",
+    "min_playtime",
+    "max_playtime",
+    "playing_time",
+    "rating",
+    "ean",
+    "acquired_from",
+    "inventory_location",
+    "private_comment",
+    "img_url",
+    "thumbnail_url",
+    "player_age",
+    "complexity",
+    "complexity_label",
+    "best_playercount",
+    "min_recommended_playercount",
+    "max_recommended_playercount",
+)
+
+
+def similar_seed(game_id: int, now: Optional[float] = None) -> str:
+    """Seed für die Reihenfolge der ähnlichen Spiele (rotiert stündlich)."""
+    bucket = int((now or time.time()) // SIMILAR_ROTATION_SECONDS)
+    return f"{game_id}:{bucket}"
+
+
+class GameDetail(NamedTuple):
+    revision: int
+    # GameResponseWithDetails ohne dynamische Felder, JSON ohne schließende Klammer
+    fragment: bytes
+    # Top-Similarities nach Score (Reihenfolge wird pro Seed gemischt)
+    similar_ids: List[int]
+    # TagResponse-Dicts (für Antworten, die nicht aus dem Fragment entstehen)
+    tags: List[Dict]
+
+
+def _build_detail(game: Game) -> GameDetail:
+    tags = [
+        TagResponse.model_validate(tag).model_dump(mode="json") for tag in game.tags
+    ]
+    static = {
+        "id": game.id,
+        "bgg_id": game.bgg_id,
+        "name": game.name,
+        "quantity": game.quantity,
+        "tags": tags,
+    }
+    for field in _OR_NONE_FIELDS:
+        static[field] = getattr(game, field) or None
+
+    # Gemischt wird erst beim Ausliefern (Seed rotiert), hier nur nach Score
+    ranked = sorted(
+        game.similar_games, key=lambda sg: (-sg.similarity_score, sg.similar_game_id)
+    )
+    return GameDetail(
+        revision=game.revision or 0,
+        fragment=orjson.dumps(static)[:-1],
+        similar_ids=[sg.similar_game_id for sg in ranked],
+        tags=tags,
+    )
+
+
+class GameDetailCache:
+    """
+    Statischer Teil der Detailansicht je Spiel.
+
+    Gültig, solange die Revision des Spiels gleich ist (Importe, EAN-Änderungen
+    und neu berechnete Similarities erhöhen sie, siehe utils/revisions.py).
+    """
+
+    def __init__(self, max_entries: int = 5000):
+        self.max_entries = max_entries
+        self._entries: Dict[int, GameDetail] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, game_id: int, revision: int) -> Optional[GameDetail]:
+        entry = self._entries.get(game_id)
+        if entry is not None and entry.revision == revision:
+            return entry
+
+        game = (
+            db.query(Game)
+            .options(
+                undefer_group("details"),
+                selectinload(Game.tags),
+                selectinload(Game.similar_games),
+            )
+            .filter(Game.id == game_id)
+            .first()
+        )
+        if game is None:
+            return None
+
+        entry = _build_detail(game)
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[game_id] = entry
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+game_details = GameDetailCache()
+
+
+def top_similar_ids(entry: GameDetail, seed: str, limit: int = 6) -> List[int]:
+    """Top-`limit` ähnliche Spiele, gemischt mit festem Seed (cachebar)."""
+    return shuffle_similar_ids(entry.similar_ids[:limit], seed)
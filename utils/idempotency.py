@@ -0,0 +1,163 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+import orjson
+from fastapi import Request, Response
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import IdempotencyKey
+from utils.errors import create_error
+
+# Gespeicherte Antworten gelten so lange, danach werden die Keys gelöscht
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+# Abgelaufene Keys nach jeder n-ten gespeicherten Antwort löschen
+_CLEANUP_EVERY = 500
+
+_keys = IdempotencyKey.__table__
+
+
+def request_fingerprint(request: Request, body: bytes = b"") -> str:
+    digest = hashlib.sha256(
+        f"{request.method} {request.url.path}?{request.url.query}".encode("utf-8")
+    )
+    digest.update(body)
+    return digest.hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Antworten bereits ausgeführter Ausleihen je (user_id, Idempotency-Key).
+
+    LRU im Speicher für Wiederholungen ohne DB-Zugriff, Tabelle
+    `idempotency_keys` für mehrere Worker: Key und Antwort werden in derselben
+    Transaktion wie die Änderung geschrieben (`begin` → `store` → commit des
+    Handlers), es gibt also keine committete Änderung ohne Antwort. Ein
+    paralleler Versuch mit demselben Key wartet am Unique-Index und bekommt
+    danach die gespeicherte Antwort.
+    """
+
+    def __init__(self, max_entries: int, ttl_hours: float):
+        self.max_entries = max_entries
+        self.ttl = timedelta(hours=ttl_hours)
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[str, bytes]]" = (
+            OrderedDict()
+        )
+        self._stored = 0
+        self._lock = threading.Lock()
+
+    def _remember(self, cache_key: Tuple[int, str], entry: Tuple[str, bytes]) -> None:
+        with self._lock:
+            self._entries[cache_key] = entry
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _replay(fingerprint: str, entry: Tuple[str, Optional[bytes]]) -> Response:
+        stored_fingerprint, body = entry
+        if stored_fingerprint != fingerprint:
+            create_error(status_code=422, error_code="IDEMPOTENCY_KEY_REUSED")
+        if body is None:
+            create_error(status_code=409, error_code="IDEMPOTENCY_IN_PROGRESS")
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    def begin(
+        self, db: Session, user_id: int, key: str, fingerprint: str
+    ) -> Optional[Response]:
+        """
+        Reserviert den Key in der laufenden Transaktion (wird mit der Änderung
+        committet oder verworfen). Schon benutzt → gespeicherte Antwort.
+        """
+        db.info.pop("idempotency_response", None)
+        cache_key = (user_id, key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                self._entries.move_to_end(cache_key)
+        if entry is not None:
+            return self._replay(fingerprint, entry)
+
+        try:
+            db.execute(
+                insert(_keys).values(
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    created_at=datetime.now(timezone.utc),
+                )
+            )
+        except IntegrityError:
+            db.rollback()
+            row = db.execute(
+                select(_keys.c.fingerprint, _keys.c.response).where(
+                    _keys.c.user_id == user_id, _keys.c.key == key
+                )
+            ).first()
+            if row is None:
+                create_error(status_code=409, error_code="IDEMPOTENCY_IN_PROGRESS")
+            if row.response is not None:
+                self._remember(cache_key, (row.fingerprint, row.response))
+            return self._replay(fingerprint, (row.fingerprint, row.response))
+        db.info["idempotency_key"] = (user_id, key, fingerprint)
+        return None
+
+    def store(self, db: Session, content) -> None:
+        """
+        Schreibt die Antwort in der laufenden Transaktion zum reservierten Key;
+        Handler rufen das direkt vor ihrem commit auf. Ohne Key: nichts zu tun.
+        """
+        pending = db.info.get("idempotency_key")
+        if pending is None:
+            return
+        user_id, key, fingerprint = pending
+        body = orjson.dumps(content)
+        stored = db.execute(
+            update(_keys)
+            .where(_keys.c.user_id == user_id, _keys.c.key == key)
+            .values(response=body)
+        ).rowcount
+        if not stored:
+            # Reservierung durch ein rollback() im Handler verworfen
+            db.execute(
+                insert(_keys).values(
+                    user_id=user_id,
+                    key=key,
+                    fingerprint=fingerprint,
+                    response=body,
+                    created_at=datetime.now(timezone.utc),
+                )
+            )
+        db.info["idempotency_response"] = body
+
+        self._stored += 1
+        if self._stored % _CLEANUP_EVERY == 0:
+            db.execute(
+                delete(_keys).where(
+                    _keys.c.created_at < datetime.now(timezone.utc) - self.ttl
+                )
+            )
+
+    def finish(self, db: Session, content) -> Response:
+        """Nach dem Handler: committete Antwort merken und ausliefern."""
+        user_id, key, fingerprint = db.info.pop("idempotency_key")
+        body = db.info.pop("idempotency_response", None)
+        if body is None:
+            # Nichts committet (z. B. unklarer Scan) → Reservierung verwerfen
+            db.rollback()
+            body = orjson.dumps(content)
+            return Response(content=body, media_type="application/json")
+        self._remember((user_id, key), (fingerprint, body))
+        return Response(content=body, media_type="application/json")
+
+
+idempotency = IdempotencyStore(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_HOURS)
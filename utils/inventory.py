@@ -0,0 +1,227 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import ColumnElement, Row, and_, bindparam, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from models import Game, GameBorrow
+
+# Ausleihe/Rückgabe als je ein bedingtes UPDATE ... RETURNING statt
+# SELECT ... FOR UPDATE + ORM-Flush + refresh (ein Roundtrip statt mehrerer)
+
+_games = Game.__table__
+_borrows = GameBorrow.__table__
+
+# Spalten der vollen Antwort (GameResponseWithDetails ohne die zurückgestellten
+# Beschreibungen/Kommentare und ohne interne Spalten wie sort_key)
+LENDING_FIELDS = (
+    "id",
+    "bgg_id",
+    "name",
+    "year_published",
+    "min_players",
+    "max_players",
+    "min_playtime",
+    "max_playtime",
+    "playing_time",
+    "rating",
+    "ean",
+    "available",
+    "quantity",
+    "acquired_from",
+    "inventory_location",
+    "img_url",
+    "thumbnail_url",
+    "player_age",
+    "complexity",
+    "complexity_label",
+    "best_playercount",
+    "min_recommended_playercount",
+    "max_recommended_playercount",
+)
+# Zusätzlich nur für den Detail-Cache (Revision), nicht für die Antwort
+_LENDING_COLUMNS = LENDING_FIELDS + ("revision",)
+# `view=lean` (Handscanner): nur diese Spalten aus RETURNING
+LEAN_FIELDS = ("id", "name", "thumbnail_url", "available", "quantity")
+# Stapel-Endpunkte brauchen nur Bestand und Anzeigename
+_BATCH_FIELDS = ("id", "ean", "name", "thumbnail_url", "available", "quantity")
+
+
+def lending_fields(view: str) -> Sequence[str]:
+    """Spalten, die eine Ausleihe für die gewünschte Antwortform zurückliefert."""
+    return LEAN_FIELDS if view == "lean" else _LENDING_COLUMNS
+
+
+def _columns(fields: Sequence[str]) -> List:
+    return [_games.c[field] for field in fields]
+
+
+def _change_available(
+    db: Session,
+    condition: ColumnElement,
+    guard: ColumnElement,
+    delta: int,
+    fields: Sequence[str],
+) -> Optional[Row]:
+    return db.execute(
+        update(_games)
+        .where(condition, guard)
+        .values(available=_games.c.available + delta)
+        .returning(*_columns(fields))
+    ).first()
+
+
+def take_copy(
+    db: Session, condition: ColumnElement, fields: Sequence[str] = _LENDING_COLUMNS
+) -> Optional[Row]:
+    """Ein Exemplar verleihen; `None`, wenn kein Spiel passt oder keins da ist."""
+    return _change_available(db, condition, _games.c.available > 0, -1, fields)
+
+
+def return_copy(
+    db: Session, condition: ColumnElement, fields: Sequence[str] = _LENDING_COLUMNS
+) -> Optional[Row]:
+    """Ein Exemplar zurücknehmen; `None`, wenn kein Spiel passt oder alle da sind."""
+    return _change_available(
+        db, condition, _games.c.available < _games.c.quantity, 1, fields
+    )
+
+
+def scan_copy(
+    db: Session, condition: ColumnElement, fields: Sequence[str] = _LENDING_COLUMNS
+) -> Tuple[str, Optional[Row]]:
+    """
+    Scan an der Ausleihe: alle Exemplare da → verleihen, keins da → zurücknehmen.
+    Liefert ("borrow" | "return" | "inconclusive", Zeile nach der Änderung).
+    """
+    row = _change_available(
+        db,
+        condition,
+        and_(_games.c.available == _games.c.quantity, _games.c.available > 0),
+        -1,
+        fields,
+    )
+    if row is not None:
+        return "borrow", row
+    row = _change_available(
+        db,
+        condition,
+        and_(_games.c.available == 0, _games.c.available < _games.c.quantity),
+        1,
+        fields,
+    )
+    if row is not None:
+        return "return", row
+    return "inconclusive", None
+
+
+def load_game_row(
+    db: Session, condition: ColumnElement, fields: Sequence[str] = _LENDING_COLUMNS
+) -> Optional[Row]:
+    """Aktuelle Zeile ohne Änderung (Fehlerfälle, unklarer Scan)."""
+    return db.execute(select(*_columns(fields)).where(condition)).first()
+
+
+def dialect_insert(db: Session):
+    """insert() mit ON CONFLICT-Unterstützung für die verbundene Datenbank."""
+    dialect = db.get_bind().dialect.name
+    return postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+
+def borrow_counts(
+    db: Session, event_id: int, game_ids: Iterable[int]
+) -> Dict[int, int]:
+    game_ids = list(game_ids)
+    if not game_ids:
+        return {}
+    rows = db.execute(
+        select(_borrows.c.game_id, _borrows.c.count).where(
+            _borrows.c.event_id == event_id, _borrows.c.game_id.in_(game_ids)
+        )
+    )
+    return {game_id: count or 0 for game_id, count in rows}
+
+
+# 🔹 Stapel-Scan (POST /games/scan_batch): eine Abfrage, eine Transaktion
+
+
+def lock_games(db: Session, condition: ColumnElement) -> List[Row]:
+    """
+    Spielzeilen gesperrt mit FOR UPDATE in id-Reihenfolge – parallele Stapel
+    sperren in derselben Reihenfolge und können sich nicht gegenseitig
+    blockieren. (SQLite ignoriert FOR UPDATE, dort serialisiert die Datenbank
+    Schreibzugriffe ohnehin.)
+    """
+    return db.execute(
+        select(*_columns(_BATCH_FIELDS))
+        .where(condition)
+        .order_by(_games.c.id)
+        .with_for_update()
+    ).all()
+
+
+def lock_games_by_ean(db: Session, eans: Iterable[str]) -> Dict[str, Row]:
+    """Alle Spiele zu den EANs in einer Abfrage (`ean IN (...)`), gesperrt."""
+    return {row.ean: row for row in lock_games(db, _games.c.ean.in_(list(eans)))}
+
+
+def scan_action(
+    requested: str, available: int, quantity: int
+) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Entscheidung für einen Scan aus dem Stapel anhand des aktuellen Bestands
+    ("auto" wie `scan_copy`). Liefert (Aktion, None) oder (None, Fehlercode).
+    """
+    if requested == "borrow":
+        if available > 0:
+            return "borrow", None
+        return None, "NO_COPIES_AVAILABLE"
+    if requested == "return":
+        if available < quantity:
+            return "return", None
+        return None, "ALL_COPIES_AVAILABLE"
+    if available == quantity:
+        if available > 0:
+            return "borrow", None
+        return None, "NO_COPIES_AVAILABLE"
+    if available == 0:
+        return "return", None
+    return "inconclusive", None
+
+
+def change_available_many(db: Session, deltas: Dict[int, int]) -> None:
+    """`available` mehrerer (bereits gesperrter) Spiele in einem executemany."""
+    params = [
+        {"game_id": game_id, "delta": delta}
+        for game_id, delta in sorted(deltas.items())
+        if delta
+    ]
+    if not params:
+        return
+    db.execute(
+        update(_games)
+        .where(_games.c.id == bindparam("game_id"))
+        .values(available=_games.c.available + bindparam("delta")),
+        params,
+    )
+
+
+def count_borrows(
+    db: Session, event_id: int, increments: Dict[int, int]
+) -> Dict[int, int]:
+    """
+    Ausleihen fürs Event zählen, alle Spiele in einem Upsert: INSERT ... VALUES
+    (...), (...) ON CONFLICT (event_id, game_id) DO UPDATE SET count = count +
+    excluded.count RETURNING game_id, count.
+    """
+    if not increments:
+        return {}
+    statement = dialect_insert(db)(_borrows).values(
+        [
+            {"game_id": game_id, "event_id": event_id, "count": count}
+            for game_id, count in sorted(increments.items())
+        ]
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[_borrows.c.event_id, _borrows.c.game_id],
+        set_={"count": _borrows.c.count + statement.excluded.count},
+    ).returning(_borrows.c.game_id, _borrows.c.count)
+    return {game_id: count or 0 for game_id, count in db.execute(statement)}
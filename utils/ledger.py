@@ -0,0 +1,306 @@
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from sqlalchemy import case, delete, desc, func, select, text
+from sqlalchemy.orm import Session
+from models import (
+    BorrowEvent,
+    BorrowGameStat,
+    BorrowHourlyStat,
+    Game,
+    SyncOperationOutcome,
+)
+from utils.events import as_utc
+from utils.inventory import dialect_insert
+
+# Ausleih-Journal (borrow_events) + Rollups je Stunde und je Spiel. Alles in
+# der Transaktion der Ausleihe, je Tabelle ein Statement (auch für Stapel) –
+# die Rollups sind damit nie hinter dem Journal zurück
+
+_events = BorrowEvent.__table__
+_hourly = BorrowHourlyStat.__table__
+_games = BorrowGameStat.__table__
+_outcomes = SyncOperationOutcome.__table__
+
+# (event_id, Stunde) → [Ausleihen, Rückgaben]
+HourDeltas = Dict[Tuple[int, datetime], List[int]]
+# (event_id, game_id) → [Ausleihen, Rückgaben, Summe Ausleih-Zeitstempel,
+# Summe Rückgabe-Zeitstempel]
+GameDeltas = Dict[Tuple[int, int], List[int]]
+
+
+class LedgerEntry(NamedTuple):
+    game_id: int
+    action: str  # "borrow" | "return"
+    # Zeitpunkt der Aktion (Offline-Sync: Zeitstempel des Scanners), sonst jetzt
+    created_at: Optional[datetime] = None
+    # Operations-ID des Scanners (Offline-Sync), eindeutig je Benutzer
+    op_id: Optional[str] = None
+
+
+def _rollup_deltas(
+    event_id: int, entries: Iterable[Tuple[str, datetime, int]]
+) -> Tuple[HourDeltas, GameDeltas]:
+    """Rollup-Änderungen für (action, Zeitpunkt, game_id)-Tripel."""
+    hours: HourDeltas = {}
+    games: GameDeltas = {}
+    for action, at, game_id in entries:
+        hour = hours.setdefault(
+            (event_id, at.replace(minute=0, second=0, microsecond=0)), [0, 0]
+        )
+        game = games.setdefault((event_id, game_id), [0, 0, 0, 0])
+        slot = 0 if action == "borrow" else 1
+        hour[slot] += 1
+        game[slot] += 1
+        game[slot + 2] += int(at.timestamp())
+    return hours, games
+
+
+def _write_rollups(db: Session, hours: HourDeltas, games: GameDeltas) -> None:
+    """
+    Je Tabelle ein Upsert, der die Änderungen aufaddiert. Sperrreihenfolge:
+    Stunden, dann Spiele nach (event_id, game_id).
+    """
+    insert = dialect_insert(db)
+    if hours:
+        statement = insert(_hourly).values(
+            [
+                {
+                    "event_id": event_id,
+                    "hour": hour,
+                    "borrows": borrows,
+                    "returns": returns,
+                }
+                for (event_id, hour), (borrows, returns) in sorted(hours.items())
+            ]
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[_hourly.c.event_id, _hourly.c.hour],
+                set_={
+                    "borrows": _hourly.c.borrows + statement.excluded.borrows,
+                    "returns": _hourly.c.returns + statement.excluded.returns,
+                },
+            )
+        )
+
+    if games:
+        statement = insert(_games).values(
+            [
+                {
+                    "event_id": event_id,
+                    "game_id": game_id,
+                    "borrows": borrows,
+                    "returns": returns,
+                    "borrowed_seconds": borrowed_seconds,
+                    "returned_seconds": returned_seconds,
+                }
+                for (event_id, game_id), (
+                    borrows,
+                    returns,
+                    borrowed_seconds,
+                    returned_seconds,
+                ) in sorted(games.items())
+            ]
+        )
+        excluded = statement.excluded
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[_games.c.event_id, _games.c.game_id],
+                set_={
+                    "borrows": _games.c.borrows + excluded.borrows,
+                    "returns": _games.c.returns + excluded.returns,
+                    "borrowed_seconds": _games.c.borrowed_seconds
+                    + excluded.borrowed_seconds,
+                    "returned_seconds": _games.c.returned_seconds
+                    + excluded.returned_seconds,
+                },
+            )
+        )
+
+
+def record_lending(
+    db: Session,
+    event_id: int,
+    user_id: Optional[int],
+    entries: Sequence[Tuple],
+    now: Optional[datetime] = None,
+) -> None:
+    """
+    Schreibt Journalzeilen für `LedgerEntry`-Tupel (mindestens game_id, action)
+    und zieht die Rollups inkrementell per Upsert nach. Aufrufer rufen das
+    direkt vor dem Commit auf, damit die Rollup-Zeilen nur kurz gesperrt sind.
+    """
+    if not entries:
+        return
+    now = now or datetime.now(timezone.utc)
+    entries = [LedgerEntry(*entry) for entry in entries]
+
+    db.execute(
+        _events.insert(),
+        [
+            {
+                "game_id": entry.game_id,
+                "event_id": event_id,
+                "user_id": user_id,
+                "action": entry.action,
+                "created_at": entry.created_at or now,
+                "op_id": entry.op_id,
+            }
+            for entry in entries
+        ],
+    )
+
+    hours, games = _rollup_deltas(
+        event_id,
+        ((entry.action, entry.created_at or now, entry.game_id) for entry in entries),
+    )
+    _write_rollups(db, hours, games)
+
+
+def rebuild_rollups(db: Session, event_id: int) -> int:
+    """
+    Baut die Rollups eines Events in der laufenden Transaktion aus dem Journal
+    neu auf (z. B. für Ausleihen aus der Zeit vor den Rollups). Liefert die
+    Anzahl der Journalzeilen.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        # Wartet auf laufende Ausleihen und hält neue bis zum Commit an: sonst
+        # fehlten sie im gelesenen Journal oder würden doppelt gezählt
+        db.execute(
+            text(
+                "LOCK TABLE borrow_stats_hourly, borrow_stats_games "
+                "IN EXCLUSIVE MODE"
+            )
+        )
+    db.execute(delete(_hourly).where(_hourly.c.event_id == event_id))
+    db.execute(delete(_games).where(_games.c.event_id == event_id))
+    rows = db.execute(
+        select(_events.c.action, _events.c.created_at, _events.c.game_id).where(
+            _events.c.event_id == event_id
+        )
+    ).all()
+    hours, games = _rollup_deltas(
+        event_id,
+        ((action, as_utc(at), game_id) for action, at, game_id in rows),
+    )
+    _write_rollups(db, hours, games)
+    return len(rows)
+
+
+def sync_outcomes(db: Session, user_id: int, op_ids: Iterable[str]) -> Dict[str, Dict]:
+    """Gespeicherte Ergebnisse früherer Offline-Operationen je op_id."""
+    op_ids = list(op_ids)
+    if not op_ids:
+        return {}
+    rows = db.execute(
+        select(
+            _outcomes.c.op_id,
+            _outcomes.c.status,
+            _outcomes.c.game_id,
+            _outcomes.c.error_code,
+        ).where(_outcomes.c.user_id == user_id, _outcomes.c.op_id.in_(op_ids))
+    )
+    return {row.op_id: dict(row._mapping) for row in rows}
+
+
+def record_sync_outcomes(
+    db: Session, user_id: int, outcomes: Sequence[Dict], now: Optional[datetime] = None
+) -> None:
+    """Ergebnisse (op_id, status, game_id, error_code) in einem executemany."""
+    if not outcomes:
+        return
+    now = now or datetime.now(timezone.utc)
+    db.execute(
+        _outcomes.insert(),
+        [
+            {
+                "user_id": user_id,
+                "op_id": outcome["op_id"],
+                "status": outcome["status"],
+                "game_id": outcome.get("game_id"),
+                "error_code": outcome.get("error_code"),
+                "created_at": now,
+            }
+            for outcome in outcomes
+        ],
+    )
+
+
+def latest_entries(db: Session, game_ids: Iterable[int]) -> Dict[int, datetime]:
+    """Zeitpunkt des jüngsten Journaleintrags je Spiel-ID."""
+    game_ids = list(game_ids)
+    if not game_ids:
+        return {}
+    rows = db.execute(
+        select(_events.c.game_id, func.max(_events.c.created_at))
+        .where(_events.c.game_id.in_(game_ids))
+        .group_by(_events.c.game_id)
+    )
+    return {game_id: as_utc(at) for game_id, at in rows if at is not None}
+
+
+def hourly_stats(db: Session, event_id: int) -> List:
+    return db.execute(
+        select(_hourly.c.hour, _hourly.c.borrows, _hourly.c.returns)
+        .where(_hourly.c.event_id == event_id)
+        .order_by(_hourly.c.hour)
+    ).all()
+
+
+def game_stats(db: Session, event_id: int, limit: int) -> List[Dict]:
+    """Meistgeliehene Spiele mit aktuell offenen Ausleihen und Ausleihdauer."""
+    rows = db.execute(
+        select(*_games.c, Game.name)
+        .join(Game, Game.id == _games.c.game_id)
+        .where(_games.c.event_id == event_id)
+        .order_by(desc(_games.c.borrows), _games.c.game_id)
+        .limit(limit)
+    )
+    now = int(time.time())
+    stats = []
+    for row in rows:
+        out_now = row.borrows - row.returns
+        avg_minutes_out = None
+        # Mehr Rückgaben als Ausleihen: Ausleihen vor Einführung des Journals
+        if row.borrows and out_now >= 0:
+            seconds_out = (
+                row.returned_seconds + out_now * now - row.borrowed_seconds
+            )
+            avg_minutes_out = round(seconds_out / row.borrows / 60, 1)
+        stats.append(
+            {
+                "game_id": row.game_id,
+                "name": row.name,
+                "borrows": row.borrows,
+                "returns": row.returns,
+                "out_now": max(out_now, 0),
+                "avg_minutes_out": avg_minutes_out,
+            }
+        )
+    return stats
+
+
+def ledger_entries(db: Session, game_id: int, limit: int) -> List[BorrowEvent]:
+    return (
+        db.query(BorrowEvent)
+        .filter(BorrowEvent.game_id == game_id)
+        .order_by(desc(BorrowEvent.created_at), desc(BorrowEvent.id))
+        .limit(limit)
+        .all()
+    )
+
+
+def open_loans(db: Session, event_id: int) -> Dict[int, int]:
+    """
+    Laut Journal noch ausgeliehene Exemplare je Spiel-ID (für Korrekturen).
+    Direkt aus borrow_events, unabhängig von den Rollups.
+    """
+    out = func.sum(case((_events.c.action == "borrow", 1), else_=-1))
+    rows = db.execute(
+        select(_events.c.game_id, out)
+        .where(_events.c.event_id == event_id)
+        .group_by(_events.c.game_id)
+        .having(out > 0)
+    )
+    return {game_id: count for game_id, count in rows}
@@ -0,0 +1,94 @@
+import base64
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+from utils.errors import create_error
+
+
+# 🔹 Cursor-Token (opak für den Client, intern die Sortierwerte der letzten Zeile)
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Kodiert die Sortierwerte der letzten Zeile als URL-sicheres Token."""
+    raw = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, expected_length: int) -> List[Any]:
+    """Dekodiert ein Cursor-Token. Ungültige Tokens führen zu einem 400-Fehler."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        values = None
+
+    if not isinstance(values, list) or len(values) != expected_length:
+        create_error(status_code=400, error_code="INVALID_CURSOR")
+
+    return values
+
+
+def apply_keyset(
+    query: Query,
+    columns: Sequence[Any],
+    values: Sequence[Any],
+    descending: bool = False,
+) -> Query:
+    """
+    Setzt die Abfrage hinter der durch `values` beschriebenen Zeile fort.
+
+    Die Spalten müssen exakt der ORDER BY-Reihenfolge entsprechen (alle in
+    derselben Richtung), damit der Vergleich über den zusammengesetzten Index
+    laufen kann.
+    """
+    if descending:
+        return query.filter(tuple_(*columns) < tuple_(*values))
+    return query.filter(tuple_(*columns) > tuple_(*values))
+
+
+# 🔹 Cache für Gesamtanzahlen pro Filterkombination
+class TotalCountCache:
+    """
+    Merkt sich die Gesamtanzahl pro Filterkombination, damit beim Blättern nicht
+    jede Seite ein eigenes COUNT(*) auslöst.
+
+    Einträge verfallen nach `ttl_seconds` und werden bei Schreibvorgängen
+    (Ausleihe, Rückgabe, Import, EAN-Änderungen) über `clear()` verworfen.
+    """
+
+    def __init__(self, ttl_seconds: float = 60.0, max_entries: int = 512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[1] > now:
+                return entry[0]
+
+        total = compute()
+
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[key] = (total, now + self.ttl_seconds)
+        return total
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+total_count_cache = TotalCountCache()
+
+
+def filter_cache_key(*parts: Optional[Any]) -> tuple:
+    """Baut einen hashbaren Schlüssel aus den Filterparametern (Listen sortiert)."""
+    return tuple(
+        tuple(sorted(part)) if isinstance(part, (list, tuple, set)) else part
+        for part in parts
+    )
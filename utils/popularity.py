@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from typing import Dict, Optional
+from sqlalchemy.orm import Session
+from models import GameBorrow
+from utils.etag import catalog_version
+
+# Abgleich mit game_borrows für Änderungen außerhalb dieses Prozesses
+POPULARITY_TTL = float(os.getenv("POPULARITY_TTL", "60"))
+
+
+class PopularityCache:
+    """
+    Ausleihzahlen des laufenden Events je Spiel-ID (`game_borrows.count`).
+
+    Grundlage für `sort=popularity`: eine schmale Abfrage pro Event und TTL statt
+    eines JOINs auf game_borrows pro Anfrage. Ausleihen dieses Prozesses werden
+    über `set()` sofort eingetragen.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._event_id: Optional[int] = None
+        self._counts: Dict[int, int] = {}
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def counts(self, db: Session, event_id: int) -> Dict[int, int]:
+        if event_id != self._event_id or time.monotonic() >= self._expires_at:
+            rows = db.query(GameBorrow.game_id, GameBorrow.count).filter(
+                GameBorrow.event_id == event_id
+            )
+            counts = {}
+            for game_id, count in rows:
+                counts[game_id] = counts.get(game_id, 0) + (count or 0)
+            with self._lock:
+                if event_id == self._event_id and counts != self._counts:
+                    # Änderung von außerhalb → sortierte Listen im Client veraltet
+                    catalog_version.bump()
+                self._event_id = event_id
+                self._counts = counts
+                self._expires_at = time.monotonic() + self.ttl_seconds
+        return self._counts
+
+    def set(self, event_id: int, game_id: int, count: int) -> None:
+        with self._lock:
+            if event_id != self._event_id:
+                return
+            # Kopie: laufende Sortierungen behalten einen konsistenten Stand
+            counts = dict(self._counts)
+            counts[game_id] = count
+            self._counts = counts
+        catalog_version.bump(game_id)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+
+popularity = PopularityCache(POPULARITY_TTL)
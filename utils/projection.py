@@ -0,0 +1,29 @@
+from typing import List, Type
+from pydantic import BaseModel
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy.orm.interfaces import LoaderOption
+from models import Game
+
+
+def model_columns(model: Type[BaseModel]) -> List:
+    """Alle `Game`-Spalten, die das Response-Model tatsächlich ausgibt."""
+    column_keys = {attr.key for attr in Game.__mapper__.column_attrs}
+    return [
+        getattr(Game, field) for field in model.model_fields if field in column_keys
+    ]
+
+
+def project(model: Type[BaseModel], *extra_columns) -> LoaderOption:
+    """
+    Loader-Option, die nur die Spalten des Response-Models (plus `extra_columns`)
+    lädt, z. B. `db.query(Game).options(project(GameResponse))`.
+    """
+    return load_only(*model_columns(model), *extra_columns)
+
+
+def refresh_all_columns(db: Session, game: Game) -> None:
+    """
+    Lädt ein Spiel inklusive der standardmäßig zurückgestellten Detail-Spalten
+    (Gruppe "details") in einer einzigen Abfrage neu.
+    """
+    db.refresh(game, [attr.key for attr in Game.__mapper__.column_attrs])
@@ -0,0 +1,188 @@
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Iterable, Optional, Tuple
+from sqlalchemy import event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from models import (
+    CatalogRevision,
+    Game,
+    GameSimilarity,
+    GameTombstone,
+    PlayerSearch,
+    UserGameKnowledge,
+)
+
+# Änderungen an diesen Game-Attributen erzeugen keine neue Katalog-Revision
+# (Verfügbarkeit ändert sich laufend und wird separat ausgeliefert)
+UNTRACKED_GAME_ATTRIBUTES = {
+    "available",
+    "revision",
+    "updated_at",
+    "user_knowledge",
+    "player_searches",
+    "borrows",
+    "similarities_from",
+    "similarities_to",
+}
+
+_SESSION_KEY = "catalog_revision"
+_USER_DATA_SESSION_KEY = "user_data_revision"
+
+# Zeilen im Zähler: Katalog (Delta-Sync) und Benutzerdaten (Familiarity,
+# Spielergesuche – stecken nur in den ETags, nicht im Delta-Sync)
+CATALOG_REVISION_ID = 1
+USER_DATA_REVISION_ID = 2
+
+_revision_table = CatalogRevision.__table__
+
+
+def current_revision(db: Session) -> int:
+    value = db.execute(
+        select(_revision_table.c.value).where(
+            _revision_table.c.id == CATALOG_REVISION_ID
+        )
+    ).scalar()
+    return value or 0
+
+
+def current_revisions(db: Session) -> Tuple[int, int]:
+    """(Katalog-Revision, Benutzerdaten-Revision) in einer Abfrage."""
+    values = dict(
+        db.execute(
+            select(_revision_table.c.id, _revision_table.c.value).where(
+                _revision_table.c.id.in_((CATALOG_REVISION_ID, USER_DATA_REVISION_ID))
+            )
+        ).all()
+    )
+    return (
+        values.get(CATALOG_REVISION_ID) or 0,
+        values.get(USER_DATA_REVISION_ID) or 0,
+    )
+
+
+def _increment(db: Session, counter_id: int) -> int:
+    connection = db.connection()
+    revision = connection.execute(
+        update(_revision_table)
+        .where(_revision_table.c.id == counter_id)
+        .values(value=_revision_table.c.value + 1)
+        .returning(_revision_table.c.value)
+    ).scalar()
+    if revision is None:
+        revision = 1
+        connection.execute(
+            insert(_revision_table).values(id=counter_id, value=revision)
+        )
+    return revision
+
+
+def next_revision(db: Session) -> int:
+    """
+    Vergibt die Revision für die laufende Transaktion (einmal pro Transaktion).
+
+    Das UPDATE sperrt die Zählerzeile bis zum Commit, d. h. Katalog-Änderungen
+    werden in Revisionsreihenfolge sichtbar und ein Client mit `since=<rev>`
+    verpasst keine später committete kleinere Revision.
+    """
+    revision = db.info.get(_SESSION_KEY)
+    if revision is not None:
+        return revision
+
+    revision = _increment(db, CATALOG_REVISION_ID)
+    db.info[_SESSION_KEY] = revision
+    return revision
+
+
+def touch_user_data(db: Session) -> None:
+    """
+    Erhöht die Benutzerdaten-Revision (einmal pro Transaktion), damit auch
+    andere Worker die ETags von Listen und Details verwerfen.
+    """
+    if db.info.get(_USER_DATA_SESSION_KEY):
+        return
+    _increment(db, USER_DATA_REVISION_ID)
+    db.info[_USER_DATA_SESSION_KEY] = True
+
+
+def mark_games_changed(db: Session, game_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Setzt die Revision für Spiele, deren Daten per Bulk-Statement geändert wurden
+    (z. B. neu berechnete Similarities). Ohne `game_ids`: alle Spiele.
+    """
+    statement = update(Game.__table__)
+    if game_ids is not None:
+        game_ids = [game_id for game_id in game_ids if game_id is not None]
+        if not game_ids:
+            return
+        statement = statement.where(Game.__table__.c.id.in_(game_ids))
+    db.connection().execute(
+        statement.values(
+            revision=next_revision(db), updated_at=datetime.now(timezone.utc)
+        )
+    )
+
+
+def mark_referencing_games_changed(db: Session, game_id: int) -> None:
+    """Vor dem Löschen eines Spiels: Spiele, deren Similarities darauf zeigen."""
+    mark_games_changed(
+        db,
+        [
+            row.game_id
+            for row in db.query(GameSimilarity.game_id).filter(
+                GameSimilarity.similar_game_id == game_id
+            )
+        ],
+    )
+
+
+def _has_catalog_changes(game: Game) -> bool:
+    state = inspect(game)
+    return any(
+        attr.history.has_changes()
+        for attr in state.attrs
+        if attr.key not in UNTRACKED_GAME_ATTRIBUTES
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_catalog_revision(session: Session, flush_context, instances) -> None:
+    changed_games = [obj for obj in session.new if isinstance(obj, Game)]
+    changed_games += [
+        obj
+        for obj in session.dirty
+        if isinstance(obj, Game) and _has_catalog_changes(obj)
+    ]
+    deleted_games = [obj for obj in session.deleted if isinstance(obj, Game)]
+    similarity_game_ids = {
+        obj.game_id
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, GameSimilarity) and obj.game_id is not None
+    }
+    if any(
+        isinstance(obj, (UserGameKnowledge, PlayerSearch))
+        for obj in chain(session.new, session.dirty, session.deleted)
+    ):
+        touch_user_data(session)
+    if not (changed_games or deleted_games or similarity_game_ids):
+        return
+
+    revision = next_revision(session)
+    now = datetime.now(timezone.utc)
+    for game in changed_games:
+        game.revision = revision
+        game.updated_at = now
+    for game in deleted_games:
+        session.add(
+            GameTombstone(game_id=game.id, bgg_id=game.bgg_id, revision=revision)
+        )
+    # Similarities gehören zum Spiel → dessen Revision mitziehen
+    similarity_game_ids -= {game.id for game in changed_games + deleted_games}
+    if similarity_game_ids:
+        mark_games_changed(session, similarity_game_ids)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _reset_catalog_revision(session: Session) -> None:
+    session.info.pop(_SESSION_KEY, None)
+    session.info.pop(_USER_DATA_SESSION_KEY, None)
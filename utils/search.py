@@ -0,0 +1,139 @@
+import threading
+from typing import Dict
+from sqlalchemy import case, func, or_, select, text
+from sqlalchemy.orm import Query, Session
+from models import Game, GameName
+
+# Trigramm-Indizes (pg_trgm / FTS5 trigram) greifen erst ab drei Zeichen
+MIN_TRIGRAM_LENGTH = 3
+
+
+def escape_like(value: str) -> str:
+    """Maskiert LIKE-Platzhalter, damit `%` oder `_` im Suchtext wörtlich zählen."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class LikeSearchBackend:
+    """
+    Fallback ohne Volltext-Index: case-insensitive Teilstring-Suche per ILIKE.
+
+    Relevanz: Treffer am Namensanfang > Treffer am Wortanfang > sonstige Treffer.
+    Alternative Titel (game_names) zählen wie der Hauptname; per IN-Subquery,
+    damit jedes Spiel nur einmal im Ergebnis steht.
+    """
+
+    name = "like"
+
+    @staticmethod
+    def matches(pattern: str):
+        alternate = select(GameName.game_id).where(
+            GameName.name.ilike(pattern, escape="\\")
+        )
+        return or_(Game.name.ilike(pattern, escape="\\"), Game.id.in_(alternate))
+
+    def filter(self, query: Query, search_text: str) -> Query:
+        return query.filter(self.matches(f"%{escape_like(search_text)}%"))
+
+    def relevance(self, search_text: str):
+        escaped = escape_like(search_text)
+        return case(
+            (self.matches(f"{escaped}%"), 0),
+            (self.matches(f"% {escaped}%"), 1),
+            else_=2,
+        )
+
+    def search(self, query: Query, search_text: str, limit: int) -> Query:
+        return (
+            self.filter(query, search_text)
+            .order_by(self.relevance(search_text), Game.sort_key, Game.id)
+            .limit(limit)
+        )
+
+
+class TrigramSearchBackend(LikeSearchBackend):
+    """
+    PostgreSQL mit pg_trgm: ILIKE '%text%' läuft über die GIN-Indizes
+    `ix_games_name_trgm` / `ix_game_names_name_trgm`, innerhalb einer
+    Relevanzstufe wird nach Trigramm-Ähnlichkeit sortiert.
+    """
+
+    name = "pg_trgm"
+
+    def search(self, query: Query, search_text: str, limit: int) -> Query:
+        return (
+            self.filter(query, search_text)
+            .order_by(
+                self.relevance(search_text),
+                func.similarity(Game.name, search_text).desc(),
+                Game.sort_key,
+                Game.id,
+            )
+            .limit(limit)
+        )
+
+
+class Fts5SearchBackend(LikeSearchBackend):
+    """
+    SQLite mit FTS5-Schattentabelle `games_fts` (Tokenizer `trigram`).
+    Die Tabelle wird per Trigger mit `games` synchron gehalten; alternative
+    Titel (wenige Zeilen je Spiel) werden per LIKE ergänzt.
+    """
+
+    name = "fts5"
+
+    def filter(self, query: Query, search_text: str) -> Query:
+        if len(search_text) < MIN_TRIGRAM_LENGTH:
+            return super().filter(query, search_text)
+
+        # Als Phrase quoten, damit FTS-Operatoren im Suchtext keine Wirkung haben
+        phrase = '"' + search_text.replace('"', '""') + '"'
+        matching_ids = text(
+            "SELECT rowid FROM games_fts WHERE games_fts MATCH :phrase"
+        ).bindparams(phrase=phrase)
+        alternate = select(GameName.game_id).where(
+            GameName.name.ilike(f"%{escape_like(search_text)}%", escape="\\")
+        )
+        return query.filter(
+            or_(Game.id.in_(matching_ids), Game.id.in_(alternate))
+        )
+
+
+_backends: Dict[object, LikeSearchBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def _detect_backend(bind) -> LikeSearchBackend:
+    dialect = bind.dialect.name
+    with bind.connect() as connection:
+        if dialect == "postgresql":
+            installed = connection.execute(
+                text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            ).first()
+            if installed:
+                return TrigramSearchBackend()
+        elif dialect == "sqlite":
+            fts_table = connection.execute(
+                text(
+                    "SELECT 1 FROM sqlite_master "
+                    "WHERE type = 'table' AND name = 'games_fts'"
+                )
+            ).first()
+            if fts_table:
+                return Fts5SearchBackend()
+    return LikeSearchBackend()
+
+
+def get_search_backend(db: Session) -> LikeSearchBackend:
+    """
+    Liefert das Such-Backend für die Datenbank der Session.
+    Die Erkennung (Extension / Schattentabelle vorhanden?) passiert einmal pro Engine.
+    """
+    bind = db.get_bind()
+    backend = _backends.get(bind)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(bind)
+            if backend is None:
+                backend = _detect_backend(bind)
+                _backends[bind] = backend
+    return backend
@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+import orjson
+from fastapi import Response
+
+# Felder, die in `to_game_response` per `or None` normalisiert werden
+_OR_NONE_FIELDS = (
+    "min_players",
+    "max_players",
+    "min_playtime",
+    "max_playtime",
+    "ean",
+    "thumbnail_url",
+    "player_age",
+    "complexity",
+    "complexity_label",
+    "best_playercount",
+    "min_recommended_playercount",
+    "max_recommended_playercount",
+)
+
+
+def _static_game_fields(game) -> Dict:
+    """Unveränderliche Felder einer GameResponse (alles außer Verfügbarkeit & Co.)."""
+    fields = {
+        "id": game.id,
+        "bgg_id": game.bgg_id,
+        "name": game.name,
+        "img_url": game.img_url,
+        "quantity": game.quantity,
+    }
+    for field in _OR_NONE_FIELDS:
+        fields[field] = getattr(game, field) or None
+    return fields
+
+
+class GameFragmentCache:
+    """
+    Vorkodierte JSON-Fragmente je Spiel, Schlüssel (id, revision).
+
+    Ein Fragment ist das GameResponse-Objekt ohne schließende Klammer; die
+    dynamischen Felder (available, my_familiarity) werden pro Anfrage angehängt.
+    """
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._fragments: Dict[Tuple[int, int], bytes] = {}
+        self._lock = threading.Lock()
+
+    def fragment(self, game) -> bytes:
+        key = (game.id, getattr(game, "revision", 0) or 0)
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            fragment = orjson.dumps(_static_game_fields(game))[:-1]
+            with self._lock:
+                # Alte Revisionen bleiben liegen → bei Überlauf einfach neu anfangen
+                if len(self._fragments) >= self.max_entries:
+                    self._fragments.clear()
+                self._fragments[key] = fragment
+        return fragment
+
+    def game_json(
+        self, game, available: int, my_familiarity: Optional[int] = None
+    ) -> bytes:
+        return b'%s,"available":%d,"borrows_count":null,"my_familiarity":%s}' % (
+            self.fragment(game),
+            available or 0,
+            b"null" if my_familiarity is None else b"%d" % my_familiarity,
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
+
+
+game_fragments = GameFragmentCache()
+
+
+def json_response(content: bytes, response: Optional[Response] = None) -> Response:
+    """
+    Antwort aus fertig kodiertem JSON. Header der injizierten `response`
+    (z. B. ETag aus `conditional_get`) werden übernommen – FastAPI mischt sie
+    nicht in selbst erzeugte Responses.
+    """
+    headers = dict(response.headers) if response is not None else None
+    if headers:
+        headers.pop("content-length", None)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def games_array(
+    games: Iterable,
+    available_counts: Dict[int, int],
+    familiarity: Optional[Dict[int, int]] = None,
+) -> bytes:
+    """JSON-Array von GameResponse-Objekten aus den vorkodierten Fragmenten."""
+    familiarity = familiarity or {}
+    return b"[%s]" % b",".join(
+        game_fragments.game_json(
+            game, available_counts.get(game.id, 0), familiarity.get(game.id)
+        )
+        for game in games
+    )
+
+
+def games_page(
+    games: Iterable,
+    available_counts: Dict[int, int],
+    total: int,
+    next_cursor: Optional[str],
+    familiarity: Optional[Dict[int, int]] = None,
+) -> bytes:
+    """Kodiert eine GamesWithCountResponse ohne Pydantic-Umweg."""
+    return b'{"games":%s,"total":%d,"next_cursor":%s}' % (
+        games_array(games, available_counts, familiarity),
+        total,
+        orjson.dumps(next_cursor),
+    )
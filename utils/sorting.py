@@ -0,0 +1,82 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+from sqlalchemy import ColumnElement, func, literal_column
+from sqlalchemy.orm import Query
+from models import Game
+from utils.errors import create_error
+from utils.pagination import apply_keyset, decode_cursor
+
+
+class SortOption(NamedTuple):
+    # Game-Attribut; None = Ausleihen im laufenden Event (popularity)
+    field: Optional[str]
+    descending: bool
+    # Ersatzwert für NULL, so gewählt, dass solche Spiele immer am Ende stehen
+    missing: Any = 0
+
+
+# 🔹 Sortierungen neben dem Standard "name" (Reihenfolge: Wert, dann id)
+SORT_OPTIONS: Dict[str, SortOption] = {
+    "rating": SortOption("rating", True),
+    "playing_time": SortOption("playing_time", False, 99999),
+    "complexity": SortOption("complexity", False, 99.0),
+    "year_published": SortOption("year_published", True),
+    "popularity": SortOption(None, True),
+    # Neueste Importe zuerst (ids werden fortlaufend vergeben)
+    "recent": SortOption("id", True),
+}
+
+SORT_PATTERN = "^(%s)$" % "|".join(("name",) + tuple(SORT_OPTIONS))
+
+
+def sort_expression(option: SortOption) -> ColumnElement:
+    """
+    SQL-Ausdruck des Sortierwerts. Muss exakt den Ausdrucksindizes aus
+    `Game.__table_args__` entsprechen (Literal statt Bind-Parameter).
+    """
+    column = getattr(Game, option.field)
+    if option.field == "id":
+        return column
+    return func.coalesce(column, literal_column(repr(option.missing)))
+
+
+def sort_value(
+    option: SortOption, game, popularity: Optional[Dict[int, int]] = None
+) -> Any:
+    """Python-Gegenstück zu `sort_expression` für Katalogzeilen."""
+    if option.field is None:
+        return (popularity or {}).get(game.id, 0)
+    value = getattr(game, option.field)
+    return option.missing if value is None else value
+
+
+def cursor_values(
+    sort: str, game, popularity: Optional[Dict[int, int]] = None
+) -> List[Any]:
+    """Sortierwerte der letzten Zeile einer Seite (Inhalt von `next_cursor`)."""
+    if sort == "name":
+        return [game.sort_key, game.id]
+    return [sort_value(SORT_OPTIONS[sort], game, popularity), game.id]
+
+
+def apply_sort(query: Query, option: SortOption, cursor: Optional[list]) -> Query:
+    """ORDER BY (Wert, id) in Sortierrichtung, optional hinter `cursor` fortgesetzt."""
+    columns = (sort_expression(option), Game.id)
+    if cursor:
+        query = apply_keyset(query, columns, cursor, option.descending)
+    if option.descending:
+        return query.order_by(*(column.desc() for column in columns))
+    return query.order_by(*columns)
+
+
+def decode_sort_cursor(token: str, sort: str) -> List[Any]:
+    """Wie `decode_cursor`, prüft zusätzlich die Typen der Sortierwerte."""
+    values = decode_cursor(token, expected_length=2)
+    if sort == "name":
+        valid = isinstance(values[0], str)
+    else:
+        valid = isinstance(values[0], (int, float)) and not isinstance(
+            values[0], bool
+        )
+    if not valid or not isinstance(values[1], int) or isinstance(values[1], bool):
+        create_error(status_code=400, error_code="INVALID_CURSOR")
+    return values
@@ -0,0 +1,146 @@
+import heapq
+import threading
+from typing import Dict, List, Optional, Tuple
+from utils.bitmap_index import iter_positions
+
+# Gewichte der Teilbewertungen (jeweils 0..1); nicht angefragte Kriterien fallen
+# aus Summe und Normierung heraus
+SUGGEST_WEIGHTS = {
+    "players": 3.0,
+    "time": 2.0,
+    "complexity": 2.0,
+    "tags": 2.5,
+    "rating": 1.5,
+    "available": 1.0,
+}
+
+
+class SuggestionIndex:
+    """
+    Spaltenweise Kopie der Katalogwerte für `/games/suggest`.
+
+    Eine Liste je Merkmal (Index = Katalogposition) statt Attributzugriffen auf
+    `CatalogGame` → eine Bewertung über den ganzen Katalog bleibt im
+    Millisekundenbereich.
+    """
+
+    def __init__(self, catalog):
+        games = catalog.games
+        self.catalog = catalog
+        self.best = [g.best_playercount for g in games]
+        self.recommended_min = [g.min_recommended_playercount for g in games]
+        self.recommended_max = [g.max_recommended_playercount for g in games]
+        self.playing_time = [g.playing_time or g.max_playtime for g in games]
+        self.player_age = [g.player_age or 0 for g in games]
+        self.rating = [min(max(g.rating or 0.0, 0.0), 10.0) / 10.0 for g in games]
+        self.tag_ids = [g.tag_ids for g in games]
+        self.ids = [g.id for g in games]
+
+    def suggest(
+        self,
+        candidates: int,
+        player_count: int,
+        time_budget: Optional[int] = None,
+        player_age: int = 0,
+        complexity_bits: Optional[int] = None,
+        tag_weights: Optional[Dict[int, float]] = None,
+        available_counts: Optional[Dict[int, int]] = None,
+        limit: int = 20,
+    ) -> List[Tuple[float, int]]:
+        """
+        Bewertet alle Spiele in `candidates` (Bitset, Spieleranzahl ist dort
+        bereits als harte Grenze eingerechnet) und liefert die besten `limit`
+        als (score, Katalogposition).
+
+        Harte Grenzen: Spielzeit <= `time_budget`, Mindestalter <= `player_age`.
+        """
+        weights = SUGGEST_WEIGHTS
+        total_weight = weights["players"] + weights["rating"]
+        if time_budget:
+            total_weight += weights["time"]
+        if complexity_bits is not None:
+            total_weight += weights["complexity"]
+        tag_total = sum(tag_weights.values()) if tag_weights else 0.0
+        if tag_total:
+            total_weight += weights["tags"]
+        if available_counts is not None:
+            total_weight += weights["available"]
+
+        best = self.best
+        recommended_min = self.recommended_min
+        recommended_max = self.recommended_max
+        playing_time = self.playing_time
+        ages = self.player_age
+        rating = self.rating
+        tag_ids = self.tag_ids
+        ids = self.ids
+
+        ranked = []
+        for position in iter_positions(candidates):
+            if player_age and ages[position] > player_age:
+                continue
+            minutes = playing_time[position]
+            if time_budget and minutes and minutes > time_budget:
+                continue
+
+            # Spieleranzahl: beste > empfohlen > nur laut Schachtel spielbar
+            if best[position] == player_count:
+                score = weights["players"]
+            elif recommended_min[position] is None:
+                score = weights["players"] * 0.5
+            elif recommended_min[position] <= player_count <= (
+                recommended_max[position] or recommended_min[position]
+            ):
+                score = weights["players"] * 0.75
+            else:
+                score = weights["players"] * 0.35
+
+            # Spielzeit: je besser das Budget ausgenutzt wird, desto besser
+            if time_budget:
+                if minutes:
+                    score += weights["time"] * (0.5 + 0.5 * minutes / time_budget)
+                else:
+                    score += weights["time"] * 0.25
+
+            if complexity_bits is not None and complexity_bits >> position & 1:
+                score += weights["complexity"]
+
+            if tag_total:
+                matched = sum(
+                    tag_weights.get(tag_id, 0.0) for tag_id in tag_ids[position]
+                )
+                score += weights["tags"] * matched / tag_total
+
+            if available_counts is not None and available_counts.get(ids[position], 0):
+                score += weights["available"]
+
+            score += weights["rating"] * rating[position]
+            ranked.append((score / total_weight, rating[position], -position))
+
+        return [
+            (score, -negative_position)
+            for score, _, negative_position in heapq.nlargest(limit, ranked)
+        ]
+
+
+_index: Optional[SuggestionIndex] = None
+_lock = threading.Lock()
+
+
+def get_suggestion_index(catalog) -> SuggestionIndex:
+    """Index zum Snapshot `catalog` (wird beim ersten Aufruf je Snapshot gebaut)."""
+    global _index
+    index = _index
+    if index is not None and index.catalog is catalog:
+        return index
+    index = SuggestionIndex(catalog)
+    with _lock:
+        _index = index
+    return index
+
+
+def tag_weights(tag_ids: List[int], tag_priorities: Dict[int, int]) -> Dict[int, float]:
+    """Gewicht je Wunsch-Tag: 1 + Priorität des Tags (negative zählen als 0)."""
+    return {
+        tag_id: 1.0 + max(tag_priorities.get(tag_id, 0), 0) for tag_id in tag_ids
+    }
@@ -0,0 +1,88 @@
+import re
+import unicodedata
+from typing import List, Optional, Set
+
+# Deutsche Umschrift, damit "Muehle" und "Mühle" auf dasselbe Token fallen
+_GERMAN_TRANSLITERATION = str.maketrans(
+    {"ä": "ae", "ö": "oe", "ü": "ue", "Ä": "ae", "Ö": "oe", "Ü": "ue"}
+)
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def fold(text: Optional[str]) -> str:
+    """
+    Normalisiert Text für Vergleiche: Kleinschreibung, ß → ss,
+    Umlaute/Akzente → Grundbuchstabe, Satzzeichen → Leerzeichen.
+    """
+    if not text:
+        return ""
+    folded = _strip_accents(text.casefold())
+    return " ".join(_NON_ALNUM.sub(" ", folded).split())
+
+
+# Führende Artikel, die beim Sortieren übersprungen werden ("Die Crew" → "crew")
+LEADING_ARTICLES = frozenset({"der", "die", "das", "the", "a", "an"})
+
+
+def name_sort_key(name: Optional[str], strip_articles: bool = True) -> str:
+    """
+    Sortierschlüssel für Spielnamen (Spalte `games.sort_key`): `fold()`, also
+    Umlaute wie der Grundbuchstabe (DIN 5007-1), optional ohne führenden Artikel.
+
+    Vorberechnet statt Collation → gleiche Reihenfolge auf SQLite und Postgres,
+    und der Index (sort_key, id) bleibt nutzbar.
+    """
+    key = fold(name)
+    if strip_articles:
+        article, _, rest = key.partition(" ")
+        if rest and article in LEADING_ARTICLES:
+            return rest
+    return key
+
+
+def fold_variants(text: Optional[str]) -> Set[str]:
+    """`fold()` plus Variante mit deutscher Umschrift (ä → ae, ...)."""
+    variants = {fold(text)}
+    if text:
+        variants.add(fold(text.translate(_GERMAN_TRANSLITERATION)))
+    return variants
+
+
+def tokenize(folded: str) -> List[str]:
+    return folded.split()
+
+
+def levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Editierdistanz mit Abbruch: liefert `max_distance + 1`, sobald die
+    Distanz sicher größer als `max_distance` ist. Vertauschte Nachbarbuchstaben
+    ("scyhte" → "scythe") zählen als ein Fehler (optimal string alignment).
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) < len(b):
+        a, b = b, a
+
+    before_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b),
+            )
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        # Eine Vertauschung in der nächsten Zeile greift noch auf `previous` zurück
+        if min(current) > max_distance and min(previous) >= max_distance:
+            return max_distance + 1
+        before_previous, previous = previous, current
+    return min(previous[-1], max_distance + 1)